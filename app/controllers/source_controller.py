@@ -1,14 +1,28 @@
 from __future__ import annotations
 
 import re
+from concurrent.futures import Future
 from typing import Optional, Dict, Any
 from PySide6.QtCore import QObject, Signal, QThread, QMetaObject, Qt
 
-from pymodbus.client import ModbusSerialClient, ModbusTcpClient
+from pymodbus.client import ModbusSerialClient
 
+from app import db
+from app.telemetry import WRITER as TELEMETRY
 from app.state.store import AppStore
-from app.modbus.connection_service import ConnectionService
+from app.modbus.connection_service import (
+    ConnectionService, DEFAULT_POLL_GROUPS, AdaptivePolicy, PRIO_SAFETY, PRIO_WRITE, PRIO_READ,
+)
 from app.modbus.driver import SourceDriver
+from app.modbus.client_pool import POOL
+from app.modbus.client_factory import NETWORK_CONN_TYPES
+from app.modbus.fleet import FleetPoller, FleetSource
+from app.modbus.process_poller import BusProcessPool, BusSpec
+from app.modbus.rs485_bus import Rs485Bus
+from app.modbus.rtt import TimeoutTuner
+from app.modbus.lean_rtu import LeanRtuClient
+from app.modbus.registry import HoldingRegs, Setpoints
+from app.modbus.setpoint_writer import SetpointWriter
 import inspect
 
 
@@ -55,12 +69,64 @@ def _parse_bool(val) -> Optional[bool]:
     return None
 
 
+def _parse_unit_ids(raw, primary: Optional[int]) -> list[int]:
+    """
+    '1-4, 7' -> [1, 2, 3, 4, 7]. Основной прибор (unit_id) всегда в списке и первым.
+    Пусто — только основной. primary=None — только перечисленные.
+    """
+    ids: list[int] = [] if primary is None else [primary]
+    for part in str(raw or "").replace(";", ",").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            if "-" in part:
+                a, b = (int(x) for x in part.split("-", 1))
+                rng = range(min(a, b), max(a, b) + 1)
+            else:
+                rng = [int(part)]
+        except ValueError:
+            continue
+        for uid in rng:
+            if 1 <= uid <= 247 and uid not in ids:
+                ids.append(uid)
+    return ids
+
+
+def _parse_bus_ports(raw, default_unit: int) -> list[tuple[str, list[int]]]:
+    """
+    Дополнительные линии RS-485: 'COM5: 1-4; COM6: 2, 7' -> [('COM5', [1, 2, 3, 4]), ('COM6', [2, 7])].
+    Адреса не указаны — один прибор default_unit.
+    """
+    out: list[tuple[str, list[int]]] = []
+    for part in str(raw or "").split(";"):
+        port, _, ids = part.partition(":")
+        port = _normalize_port_name(port)
+        if not port or any(p == port for p, _ in out):
+            continue
+        out.append((port, _parse_unit_ids(ids, None) or [default_unit]))
+    return out
+
+
+# Основной прибор (тот, что на главном экране) опрашивается на общей линии чаще остальных
+PRIMARY_UNIT_WEIGHT = 4
+# Линия RS-485 за сетевым преобразователем: t3.5 выдерживает он сам, нам хватает
+# минимальной паузы между кадрами (1.75 мс — как выше 19200 бод)
+NETWORK_BUS_BAUDRATE = 115200
+
+_SETPOINT_KINDS = {
+    "voltage": HoldingRegs.VOLTAGE_SETPOINT,
+    "current": HoldingRegs.CURRENT_SETPOINT,
+}
+
+
 class SourceController(QObject):
     """
     Управляет подключением/отключением и высокоуровневыми командами.
     ВАЖНО: connect() ничего не включает автоматически — питание только через set_power().
     """
     connectionChanged = Signal(bool)
+    setpointWritten = Signal(str, int)   # ("voltage"|"current", сырое значение) — после удачной записи
 
     def __init__(self, store: AppStore, parent=None):
         super().__init__(parent)
@@ -68,7 +134,22 @@ class SourceController(QObject):
         self.client = None
         self.driver: Optional[SourceDriver] = None
         self.svc: Optional[ConnectionService] = None
+        self.fleet: Optional[FleetPoller] = None   # остальные приборы за сетевым шлюзом (один event loop)
+        self.bus_pool: Optional[BusProcessPool] = None   # дополнительные линии RS-485 — по процессу на линию
+        self.bus: Optional[Rs485Bus] = None   # общая линия RS-485 с несколькими приборами
+        self._ring_telemetry: Dict[str, str] = {}   # источник кольца ("<порт>:<unit>") -> имя в журнале
+        self.store.sourceMeasurementsChanged.connect(self._on_source_measurements)
+        self.client_lock = None               # lock клиента из пула (общий с другими источниками)
+        self.timeouts: Optional[TimeoutTuner] = None   # таймауты транзакций по наблюдаемому RTT
         self.conn_type: Optional[str] = None
+        self.profile_name: Optional[str] = None
+        self.device_model: Optional[str] = None   # профиль модели прибора (device_profiles)
+        self.setpoints: Optional[SetpointWriter] = None
+        self.endpoint: Optional[str] = None   # порт или host:port — имя источника в телеметрии
+        # имя основного прибора в журнале телеметрии; после отключения остаётся — история доступна
+        self.telemetry_source: Optional[str] = None
+        self.data_visible = True   # окно не свёрнуто и UI не заблокирован
+        self.telemetry_on = False  # пишется журнал — данные нужны и при скрытом окне
 
     # ------------------- Публичный API -------------------
     def connect(self, conn_type: str, settings: Dict[str, Any]) -> bool:
@@ -78,6 +159,14 @@ class SourceController(QObject):
         """
         self.disconnect()
         self.conn_type = (conn_type or "").upper().strip()
+        # имя профиля (если подключаемся из сохранённого) — к нему привязан кэш схемы адресации
+        self.profile_name = (settings.get("profile") or "").strip() or None
+        # карта регистров модели; пусто — базовая модель
+        self.device_model = (str(settings.get("device_model") or "")).strip() or None
+        # Таймаут ответа подстраивается под RTT прибора (SRTT + 4·RTTVAR) в границах профиля;
+        # до первых замеров — верхняя граница. Повторы не нужны: потеря видна за десятки мс,
+        # а битый цикл покрывает бюджет сбоев ConnectionService.
+        self.timeouts = TimeoutTuner.from_settings(settings)
 
         try:
             if self.conn_type == "RTU":
@@ -92,16 +181,27 @@ class SourceController(QObject):
                 # Data bits — по умолчанию 8 (как в Modbus Poll)
                 bytesize = 8
                 unit_id = int(settings.get("unit_id", 1))
-
-                self.client = ModbusSerialClient(
-                    port=port,
-                    baudrate=baudrate,
-                    parity=parity,     # 'N'/'E'/'O'
-                    stopbits=stopbits, # 1 / 1.5 / 2
-                    bytesize=bytesize, # 8 data bits
-                    timeout=2.0,
-                    retries=1
-                )
+                # остальные приборы на той же линии (один порт на всех)
+                unit_ids = _parse_unit_ids(settings.get("unit_ids"), unit_id)
+                # другие линии RS-485 (свои порты) — опрос в отдельных процессах (см. _start_bus_pool)
+                bus_ports = [(p, ids) for p, ids in _parse_bus_ports(settings.get("bus_ports"), unit_id) if p != port]
+                self.endpoint = port
+
+                if str(settings.get("rtu_transport", "")).lower() == "lean":
+                    # свой RTU-транспорт: кэш кадров, CRC по таблице, разбор ответа без копий
+                    self.client = LeanRtuClient(port=port, baudrate=baudrate, parity=parity,
+                                                stopbits=stopbits, bytesize=bytesize,
+                                                timeout=self.timeouts.max_s)
+                else:
+                    self.client = ModbusSerialClient(
+                        port=port,
+                        baudrate=baudrate,
+                        parity=parity,     # 'N'/'E'/'O'
+                        stopbits=stopbits, # 1 / 1.5 / 2
+                        bytesize=bytesize, # 8 data bits
+                        timeout=self.timeouts.max_s,
+                        retries=0
+                    )
 
                 if not self.client.connect():
                     self.client.close()
@@ -110,8 +210,15 @@ class SourceController(QObject):
                         f"(baud={baudrate}, parity={parity}, stop={stopbits}, data=8)."
                     )
 
-                self.driver = SourceDriver(self.client, unit_id=unit_id)
-
+                if len(unit_ids) > 1:
+                    self.bus = Rs485Bus(self.client, baudrate,
+                                        max_failures=int(settings.get("max_failures", 3) or 3),
+                                        timeouts=self.timeouts)
+                    self.bus.measurements.connect(self._on_bus_measurements)
+                    self.bus.linkChanged.connect(self._on_bus_link)
+                self.driver = self._make_driver(unit_id, bus=self.bus)
+                for uid in unit_ids[1:]:
+                    self._make_driver(uid, bus=self.bus)
 
                 # Быстрый ping (ничего не записывает в прибор)
                 try:
@@ -125,16 +232,40 @@ class SourceController(QObject):
                     raise RuntimeError(f"Ошибка при попытке связи: {e}")
 
             else:
-                # ---- TCP ----
+                # ---- TCP / RTU поверх TCP / UDP ----
+                if self.conn_type not in NETWORK_CONN_TYPES:
+                    self.conn_type = "TCP"
                 host = settings.get("host", "192.168.1.100")
                 port = int(settings.get("port", 502))
                 unit_id = int(settings.get("unit_id", 1))
-
-                self.client = ModbusTcpClient(host=host, port=port, timeout=2.0)
-                if not self.client.connect():
-                    raise RuntimeError(f"Не удалось подключиться к {host}:{port}.")
-
-                self.driver = SourceDriver(self.client, unit_id=unit_id)
+                # остальные приборы за тем же шлюзом: Modbus TCP — парком на одном event loop
+                # (см. _start_fleet), RTU поверх TCP и UDP — по очереди через общий сокет (Rs485Bus)
+                unit_ids = _parse_unit_ids(settings.get("unit_ids"), unit_id)
+                bus_ports = []
+                self.endpoint = f"{host}:{port}"
+
+                # Клиент из пула: источники за одним шлюзом делят «тёплый» сокет,
+                # in_flight > 1 — конвейерный клиент (несколько запросов в полёте, только TCP).
+                # RTU_OVER_TCP — кадры RTU прямо в TCP (преобразователь «COM-порт по сети»),
+                # UDP — Modbus/UDP: без промежуточного шлюза-конвертера протокола.
+                self.client, self.client_lock = POOL.acquire({
+                    "host": host, "port": port, "timeout": self.timeouts.max_s,
+                    "in_flight": settings.get("in_flight", 1),
+                }, conn_type=self.conn_type)
+
+                if self.conn_type != "TCP" and len(unit_ids) > 1:
+                    # RTU поверх TCP / UDP: за преобразователем одна линия RS-485, и второго
+                    # соединения он может не принять — остальные приборы опрашиваются по очереди
+                    # через этот же сокет, как на своей линии (парк — только для Modbus TCP)
+                    self.bus = Rs485Bus(self.client, NETWORK_BUS_BAUDRATE,
+                                        max_failures=int(settings.get("max_failures", 3) or 3),
+                                        timeouts=self.timeouts, lock=self.client_lock)
+                    self.bus.measurements.connect(self._on_bus_measurements)
+                    self.bus.linkChanged.connect(self._on_bus_link)
+                self.driver = self._make_driver(unit_id, bus=self.bus)
+                if self.bus is not None:
+                    for uid in unit_ids[1:]:
+                        self._make_driver(uid, bus=self.bus)
 
                 if not self.driver.ping():
                     raise RuntimeError(
@@ -144,8 +275,36 @@ class SourceController(QObject):
             # Только опрос — без записи в coils
             # ConnectionService теперь управляет собственным внутренним потоком,
             # поэтому просто создаём и стартуем сервис.
-            self.svc = ConnectionService(self.driver, parent=None)
+            # I/U — каждые 100 мс, катушки/уставки — 250 мс, А·ч/температуры — 2 с
+            self.telemetry_on = bool(settings.get("telemetry", True))
+            if self.bus is not None:
+                # несколько приборов на одной линии — опрос по очереди в одном потоке линии
+                self.svc = self.bus.unit_service(unit_id)
+            else:
+                # До max_failures битых циклов подряд терпим, дальше сервис сам переподключается.
+                # Адаптивный период: 100 мс на переходных процессах, до 1 с на стоящих показаниях
+                adaptive = AdaptivePolicy() if settings.get("adaptive_poll", True) else None
+                self.svc = ConnectionService(self.driver, parent=None, poll_groups=DEFAULT_POLL_GROUPS,
+                                             max_failures=int(settings.get("max_failures", 3) or 3),
+                                             adaptive=adaptive)
+                self.svc.set_visible(self.data_visible or self.telemetry_on)
+            self.setpoints = SetpointWriter(self.submit)
+            self.setpoints.written_cb = self._on_setpoint_written
+            self.svc.add_listener(self.setpoints.on_measurements)
+            self.telemetry_source = self._telemetry_name(unit_id)
+            if self.telemetry_on:
+                # журнал измерений: listener вызывается в потоке опроса, запись — в потоке журнала
+                TELEMETRY.start()
+                self.svc.add_listener(TELEMETRY.listener(self.telemetry_source))
+                if self.bus is not None:
+                    for uid in unit_ids[1:]:
+                        self.bus.unit_service(uid).add_listener(TELEMETRY.listener(self._telemetry_name(uid)))
+            if self.conn_type == "TCP" and len(unit_ids) > 1:
+                self._start_fleet(settings, host, port, unit_ids[1:], self.telemetry_on)
+            if self.conn_type == "RTU" and bus_ports:
+                self._start_bus_pool(settings, bus_ports, self.telemetry_on)
             self.svc.measurements.connect(self.store.set_measurements)
+            self.svc.linkChanged.connect(self.store.set_link)
             # Подключаем ошибку и к локальному обработчику, и прямо в store —
             # это гарантирует, что GUI получит уведомление, даже если сигнал
             # проходит из рабочего потока.
@@ -180,15 +339,76 @@ class SourceController(QObject):
                 pass
             return False
 
-    def set_voltage(self, value: float):
+    def submit(self, fn, priority: int = PRIO_WRITE) -> Future:
+        """
+        Команда в поток шины (ConnectionService). fn(driver) выполняется там же, где опрос,
+        поэтому GUI никогда не блокируется на Modbus и кадры не перемешиваются.
+        """
+        if not self.svc:
+            fut: Future = Future()
+            fut.set_exception(RuntimeError("Нет активного подключения к устройству"))
+            return fut
+        return self.svc.submit(fn, priority)
+
+    def set_voltage(self, value: float) -> Future:
         # отправить команду в драйвер на изменение напряжения
-        if self.driver:
-            self.driver.set_voltage(value)
+        return self.submit(lambda d: d.set_voltage(value))
 
-    def set_current(self, value: float):
+    def set_current(self, value: float) -> Future:
         # отправить команду в драйвер на изменение тока
-        if self.driver:
-            self.driver.set_current(value)
+        return self.submit(lambda d: d.set_current(value))
+
+    def apply_setpoints(self, current: int, voltage: int, revers: int, verify: bool = False) -> Future:
+        """
+        Рабочая точка целиком (сырые значения 40002–40004) одной транзакцией FC16.
+        Future[bool]; verify=True — плюс одно контрольное чтение.
+        """
+        sp = Setpoints(current=int(current), voltage=int(voltage), revers=int(revers))
+
+        def _apply(d: SourceDriver) -> bool:
+            ok = d.write_setpoints(sp, verify=verify)
+            if ok and self.setpoints is not None:
+                self.setpoints.note_written(sp)
+            return ok
+        return self.submit(_apply)
+
+    def adjust_voltage(self, delta: int) -> Optional[int]:
+        """
+        Сдвиг уставки напряжения. Применяется к теневой копии сразу (новое сырое значение
+        возвращается), на шину уходит только последнее значение — по одной записи за слот.
+        """
+        return self._adjust(HoldingRegs.VOLTAGE_SETPOINT, delta)
+
+    def adjust_current(self, delta: int) -> Optional[int]:
+        """Сдвиг уставки тока — см. adjust_voltage()."""
+        return self._adjust(HoldingRegs.CURRENT_SETPOINT, delta)
+
+    def setpoint_raw(self, kind: str) -> Optional[int]:
+        """Уставка ("voltage"|"current") с учётом ещё не отправленных изменений."""
+        reg = _SETPOINT_KINDS.get(kind)
+        if reg is None or self.setpoints is None:
+            return None
+        return self.setpoints.value(reg)
+
+    def toggle_revers(self) -> Future:
+        def _toggle(d: SourceDriver):
+            old = d.read_revers()
+            return d.write_revers(0 if old == 1 else 1)
+        return self.submit(_toggle)
+
+    def timeout_stats(self) -> list:
+        """SRTT/RTTVAR/текущий таймаут по (unit id, код функции)."""
+        return self.timeouts.stats() if self.timeouts is not None else []
+
+    def set_data_visible(self, visible: bool):
+        """
+        Видны ли измерения оператору: свёрнутое окно или заблокированный UI — опрос реже.
+        Пока пишется журнал телеметрии, он тоже потребитель данных — период не растягиваем.
+        """
+        self.data_visible = bool(visible)
+        set_visible = getattr(self.svc, "set_visible", None)
+        if callable(set_visible):
+            set_visible(self.data_visible or self.telemetry_on)
 
     def disconnect(self):
         """Останавливает опрос и закрывает соединение."""
@@ -196,57 +416,174 @@ class SourceController(QObject):
         self.store.set_connected(False)
         self.connectionChanged.emit(False)
 
-    def set_power(self, on: bool) -> bool:
+    def set_power(self, on: bool) -> Future:
         """
-        Включение/выключение источника.
-        Требуем успех обеих катушек и соблюдаем безопасный порядок:
+        Включение/выключение источника. Возвращает Future[bool].
+        Требуем успех обеих катушек и соблюдаем безопасный порядок (см. SourceDriver.set_power):
           ON:  питание устройства -> инвертор
-          OFF: инвертор -> питание устройства
+          OFF: инвертор -> питание устройства (PRIO_SAFETY — вперёд любых команд и опроса)
         """
-        if not self.driver:
-            return False
-        try:
-            if on:
-                ok1 = bool(self.driver.set_device_power(True))
-                ok2 = bool(self.driver.set_inverter_enable(True))
-                return ok1 and ok2
-            else:
-                ok1 = bool(self.driver.set_inverter_enable(False))
-                ok2 = bool(self.driver.set_device_power(False))
-                return ok1 and ok2
-        except Exception:
-            return False
+        return self.submit(lambda d: bool(d.set_power(on)), PRIO_WRITE if on else PRIO_SAFETY)
 
-    def read_register(self, addr: int) -> bool:
+    def read_register(self, addr: int) -> Future:
         """
-        Читает holding-регистры начиная с addr (0-based).
+        Читает катушку addr (0-based). Возвращает Future[bool].
         Для pymodbus >= 3.6.
         """
         if not self.driver or not hasattr(self.driver, "client"):
             raise RuntimeError("Нет активного подключения к устройству")
 
-        rr = self.driver.client.read_coils(addr)
+        def _read(d: SourceDriver) -> bool:
+            rr = d.read_coil(addr)
+            if rr is None or rr.isError():
+                raise RuntimeError(f"Ошибка чтения регистра {addr + 1}")
+            return rr.bits[0]
+        return self.submit(_read, PRIO_READ)
 
-
-
-        if rr.isError():
-            raise RuntimeError(f"Ошибка чтения регистра {addr + 1}")
-        return rr.bits[0]
-
-    def write_register(self, addr: int, value: int) -> bool:
+    def write_register(self, addr: int, value: int) -> Future:
         if not self.driver or not hasattr(self.driver, "client"):
             raise RuntimeError("Нет активного подключения к устройству")
 
-        rq = self.driver.client.write_coil(addr, value)
-        if rq.isError():
-            raise RuntimeError(f"Ошибка записи регистра {addr + 1}")
-        return True
+        def _write(d: SourceDriver) -> bool:
+            rq = d.write_coil(addr, value)
+            if rq is None or rq.isError():
+                raise RuntimeError(f"Ошибка записи регистра {addr + 1}")
+            return True
+        # выключение — команда безопасности
+        return self.submit(_write, PRIO_WRITE if value else PRIO_SAFETY)
 
     # ------------------- Внутреннее -------------------
+    def _adjust(self, reg: int, delta: int) -> Optional[int]:
+        if self.setpoints is None:
+            return None
+        return self.setpoints.adjust(reg, delta)
+
+    def _on_setpoint_written(self, reg: int, value: int):
+        # приходит из потока шины — в GUI передаём сигналом
+        for kind, r in _SETPOINT_KINDS.items():
+            if r == reg:
+                self.setpointWritten.emit(kind, int(value))
+
+    def _start_fleet(self, settings: Dict[str, Any], host: str, port: int, unit_ids: list, telemetry: bool):
+        """
+        Остальные приборы за сетевым шлюзом — FleetPoller: все на одном event loop в одном потоке,
+        отсчёты прямо в AppStore (источник — str(unit_id), как у приборов общей линии RS-485).
+        Основной прибор остаётся на ConnectionService: через него идут команды и уставки.
+        У парка своё соединение со шлюзом — шлюз должен принимать несколько клиентов.
+        """
+        self.fleet = FleetPoller(store=self.store,
+                                 max_failures=int(settings.get("max_failures", 3) or 3))
+        if self.profile_name:
+            self.fleet.addressing_cb = lambda _sid, scheme, name=self.profile_name: self._save_addressing(name, scheme)
+        if telemetry:
+            names = {str(uid): self._telemetry_name(uid) for uid in unit_ids}
+            self.fleet.measurements_cb = lambda sid, meas: TELEMETRY.submit(names.get(sid, sid), meas)
+        cached = None
+        if self.profile_name:
+            try:
+                cached = db.get_profile_addressing(self.profile_name)
+            except Exception:
+                cached = None
+        for uid in unit_ids:
+            self.fleet.add_source(FleetSource(
+                source_id=str(uid),
+                conn_type=self.conn_type,
+                settings={"host": host, "port": port, "unit_id": uid, "timeout": self.timeouts.max_s,
+                          "device_model": self.device_model},
+                addressing=cached,
+            ))
+        self.fleet.start()
+        print(f"[SourceController] fleet: {len(unit_ids)} units behind {host}:{port}")
+
+    def _start_bus_pool(self, settings: Dict[str, Any], bus_ports: list, telemetry: bool):
+        """
+        Дополнительные линии RS-485 — BusProcessPool: по процессу (со своим GIL) на линию, измерения
+        через кольцо в разделяемой памяти в AppStore (источник — "<порт>:<unit_id>"). Зависший GUI
+        не задерживает опрос этих линий. Процессы только читают — команды идут основному прибору.
+        """
+        cached = None
+        if self.profile_name:
+            try:
+                cached = db.get_profile_addressing(self.profile_name)
+            except Exception:
+                cached = None
+        worker_settings = {k: settings[k] for k in ("baudrate", "parity", "stopbits", "rtu_transport",
+                                                    "timeout_min_ms", "timeout_max_ms") if k in settings}
+        self.bus_pool = BusProcessPool(store=self.store)
+        for port, ids in bus_ports:
+            self.bus_pool.add_bus(BusSpec(
+                bus_id=port,
+                conn_type="RTU",
+                settings=dict(worker_settings, port=port),
+                unit_ids=ids,
+                addressing=cached,
+                max_failures=int(settings.get("max_failures", 3) or 3),
+                device_model=self.device_model,
+            ))
+            if telemetry:
+                for uid in ids:
+                    self._ring_telemetry[f"{port}:{uid}"] = self._telemetry_name(uid, line=port)
+        if telemetry:
+            TELEMETRY.start()
+        self.bus_pool.start()
+
+    def _on_bus_measurements(self, unit_id: int, meas):
+        self.store.set_source_measurements(str(unit_id), meas)
+
+    def _on_bus_link(self, unit_id: int, info):
+        self.store.set_source_link(str(unit_id), info)
+
+    def _on_source_measurements(self, source_id: str, meas):
+        # отсчёты линий из процессов опроса приходят в GUI-поток через AppStore — оттуда в журнал
+        name = self._ring_telemetry.get(source_id)
+        if name is not None:
+            TELEMETRY.submit(name, meas)
+
+    def _telemetry_name(self, unit_id: int, line: Optional[str] = None) -> str:
+        """
+        Имя источника в журнале — одно и то же при каждом подключении к тому же прибору.
+        line — порт дополнительной линии RS-485 (у неё свои адреса приборов).
+        """
+        if line:
+            return f"{self.profile_name}@{line}#{unit_id}" if self.profile_name else f"{line}#{unit_id}"
+        return f"{self.profile_name or self.endpoint}#{unit_id}"
+
+    def _make_driver(self, unit_id: int, bus: Optional[Rs485Bus] = None) -> SourceDriver:
+        """
+        Драйвер со схемой адресации из профиля: при повторном подключении
+        перебор вариантов не нужен — первая же транзакция идёт по известной схеме.
+        С bus — прибор на общей линии (все приборы профиля одной модели, схема общая).
+        """
+        profile = self.profile_name
+        cached = None
+        if profile:
+            try:
+                cached = db.get_profile_addressing(profile)
+            except Exception:
+                cached = None
+        if bus is not None:
+            # первым добавляется основной прибор
+            weight = PRIMARY_UNIT_WEIGHT if not bus.unit_ids() else 1
+            driver = bus.add_unit(unit_id, weight=weight, addressing=cached, profile=self.device_model)
+        else:
+            driver = SourceDriver(self.client, unit_id=unit_id, addressing=cached, lock=self.client_lock,
+                                  timeouts=self.timeouts, profile=self.device_model)
+        if profile:
+            driver.addressing_cb = lambda scheme, name=profile: self._save_addressing(name, scheme)
+        return driver
+
+    @staticmethod
+    def _save_addressing(profile: str, scheme: Dict[str, Any]):
+        # вызывается и из потока опроса — db открывает отдельное соединение на каждый вызов
+        try:
+            db.set_profile_addressing(profile, scheme)
+        except Exception as e:
+            print(f"[SourceController] failed to save addressing for '{profile}': {e}")
+
     def _on_service_error(self, msg: str):
-        # При ошибке сервиса — останавливаем опрос и закрываем соединение,
-        # чтобы прекратить повторные попытки чтения (и шум в консоли).
-        # debug: логируем приход ошибки в контроллер
+        # Связь потеряна (бюджет сбоев исчерпан). Сервис сам переподключается с тем же
+        # драйвером — здесь только сообщаем об ошибке, ничего не разрушая.
+        # Полный разрыв — только по disconnect().
         try:
             print(f"[SourceController] service error: {msg}")
         except Exception:
@@ -259,20 +596,6 @@ class SourceController(QObject):
             self.store.set_error(msg)
         except Exception:
             pass
-        # Остановить сервис/клиент немедленно
-        try:
-            # остановим сервис и закроем клиент
-            self._cleanup()
-        except Exception:
-            pass
-        try:
-            self.store.set_connected(False)
-        except Exception:
-            pass
-        try:
-            self.connectionChanged.emit(False)
-        except Exception:
-            pass
 
     def _cleanup(self):
         # Останов сервиса
@@ -282,14 +605,35 @@ class SourceController(QObject):
             except Exception:
                 pass
             self.svc = None
-
-        # Закрытие клиента
+        self.bus = None
+        if self.fleet is not None:
+            try:
+                self.fleet.stop()
+            except Exception as e:
+                print(f"[SourceController] fleet stop: {e}")
+            self.fleet = None
+        if self.bus_pool is not None:
+            try:
+                self.bus_pool.stop()
+            except Exception as e:
+                print(f"[SourceController] bus pool stop: {e}")
+            self.bus_pool = None
+        self._ring_telemetry.clear()
+        self.setpoints = None
+        self.telemetry_on = False
+
+        # Закрытие клиента (клиент из пула возвращаем — сокет останется тёплым)
         if self.client:
             try:
-                self.client.close()
+                if not POOL.release(self.client):
+                    self.client.close()
             except Exception:
                 pass
             self.client = None
+        self.client_lock = None
+        self.timeouts = None
 
         self.driver = None
         self.conn_type = None
+        self.profile_name = None
+        self.endpoint = None
@@ -23,10 +23,15 @@ def init_db(db_path: Optional[str] = None) -> None:
         conn.execute("""
             CREATE TABLE IF NOT EXISTS profiles (
                 name TEXT PRIMARY KEY,
-                conn_type TEXT NOT NULL,          -- 'RTU' | 'TCP'
-                settings TEXT NOT NULL            -- JSON-строка
+                conn_type TEXT NOT NULL,          -- 'RTU' | 'TCP' | 'RTU_OVER_TCP' | 'UDP'
+                settings TEXT NOT NULL,           -- JSON-строка
+                addressing TEXT                   -- JSON: удачная схема адресации драйвера
             )
         """)
+        # миграция старых БД: колонки addressing раньше не было
+        cols = {r[1] for r in conn.execute("PRAGMA table_info(profiles)")}
+        if "addressing" not in cols:
+            conn.execute("ALTER TABLE profiles ADD COLUMN addressing TEXT")
         conn.commit()
 
 
@@ -110,16 +115,46 @@ def rename_profile(old_name: str, new_name: str) -> None:
         return
 
     with _conn() as conn:
-        cur = conn.execute("SELECT conn_type, settings FROM profiles WHERE name = ?", (old_name,))
+        cur = conn.execute("SELECT conn_type, settings, addressing FROM profiles WHERE name = ?", (old_name,))
         row = cur.fetchone()
         if not row:
             return
-        conn_type, settings_json = row
+        conn_type, settings_json, addressing_json = row
 
         # Удалим старый, вставим (или заменим) новый
         conn.execute("DELETE FROM profiles WHERE name = ?", (old_name,))
         conn.execute(
-            "INSERT OR REPLACE INTO profiles(name, conn_type, settings) VALUES (?, ?, ?)",
-            (new_name, conn_type, settings_json)
+            "INSERT OR REPLACE INTO profiles(name, conn_type, settings, addressing) VALUES (?, ?, ?, ?)",
+            (new_name, conn_type, settings_json, addressing_json)
         )
         conn.commit()
+
+
+def get_profile_addressing(name: str) -> Optional[Dict[str, Any]]:
+    """
+    Схема адресации, найденная драйвером при прошлом подключении
+    ({"reader": ..., "base": ..., "shift": ...}) или None.
+    """
+    name = (name or "").strip()
+    if not name:
+        return None
+    with _conn() as conn:
+        row = conn.execute("SELECT addressing FROM profiles WHERE name = ?", (name,)).fetchone()
+    if not row or not row[0]:
+        return None
+    try:
+        data = json.loads(row[0])
+    except Exception:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def set_profile_addressing(name: str, addressing: Optional[Dict[str, Any]]) -> None:
+    """Сохраняет схему адресации в профиль (None — сбросить). Несуществующий профиль не создаётся."""
+    name = (name or "").strip()
+    if not name:
+        return
+    value = json.dumps(dict(addressing), ensure_ascii=False) if addressing else None
+    with _conn() as conn:
+        conn.execute("UPDATE profiles SET addressing = ? WHERE name = ?", (value, name))
+        conn.commit()
@@ -6,6 +6,10 @@ from PySide6.QtWidgets import (
 )
 
 from dictionary import CONNECTION_SCREEN
+from app.modbus.client_factory import NETWORK_CONN_TYPES
+
+# Порядок совпадает с CONNECTION_SCREEN["types"]
+CONN_TYPES = ("RTU",) + NETWORK_CONN_TYPES
 from .widgets import AlertBox
 from .settings_panel import SettingsPanel
 
@@ -16,7 +20,7 @@ class ConnectionTab(QWidget):
       ┌ Плашка выбора типа подключения (та же ширина и стили, что и у формы настроек)
       │   ├ селектор как у селектора профиля (тот же objectName/props → одинаковый QSS)
       │   └ AlertBox с подсказками (внутри этой плашки)
-      └ SettingsPanel (RTU/TCP) со всеми профилями и кнопкой Подключиться/Отключить
+      └ SettingsPanel (RTU/TCP/RTU поверх TCP/UDP) со всеми профилями и кнопкой Подключиться/Отключить
     """
     connectRequested = Signal(str, dict)   # (conn_type, settings)
     disconnectRequested = Signal()         # () — запрос на отключение
@@ -168,8 +172,7 @@ class ConnectionTab(QWidget):
         return super().eventFilter(obj, ev)
 
     def _type_changed(self, idx: int):
-        text = self.type_box.currentText()
-        conn_type = "RTU" if "RTU" in text or "485" in text else "TCP"
+        conn_type = CONN_TYPES[idx] if 0 <= idx < len(CONN_TYPES) else "TCP"
         if conn_type != self._current_type:
             self._current_type = conn_type
             self._mount_panel(conn_type)
@@ -3,7 +3,7 @@ from __future__ import annotations
 import os
 import time
 
-from PySide6.QtCore import Qt, QTimer, QSize
+from PySide6.QtCore import Qt, QTimer, QSize, QEvent
 from PySide6.QtGui import QIcon, QAction, QKeySequence
 from PySide6.QtWidgets import (
     QMainWindow, QWidget, QStackedWidget, QHBoxLayout, QVBoxLayout,
@@ -22,6 +22,7 @@ from .widgets import AlertBox, DangerOverlay
 from app.state.store import AppStore
 from app.controllers.source_controller import SourceController
 from .source_header import SourceHeaderWidget
+from .strip_chart import StripChart
 
 APP_BG = "#292116"
 PRIMARY_BORDER = "#EF7F1A"
@@ -29,6 +30,10 @@ TITLE_BAR_BG = "#1E1E1E"
 WHITE = "#FFFFFF"
 ACCENT = "#EF7F1A"
 
+# Лента на главном экране: минимальная высота и высота окна, с которой она помещается
+STRIP_CHART_MIN_H = 120
+STRIP_CHART_FROM_H = 1060
+
 
 def icon_label(name: str, size: int = 24) -> QLabel:
     lbl = QLabel()
@@ -48,6 +53,7 @@ class MainWindow(QMainWindow):
         # Сервисы
         self.store = AppStore(self)
         self.source = SourceController(self.store, self)
+        self.source.setpointWritten.connect(self._on_setpoint_written)
 
         # Состояния экрана
         self._is_fullscreen = True
@@ -169,6 +175,7 @@ class MainWindow(QMainWindow):
         # Сигналы стора
         self.store.connectionChanged.connect(self._on_connection_changed)
         self.store.measurementsChanged.connect(self._on_meas)
+        self.store.linkChanged.connect(self._on_link_changed)
         # Ошибки — показываем alert без блокировки UI
         try:
             self.store.errorText.connect(self._on_store_error)
@@ -223,6 +230,9 @@ class MainWindow(QMainWindow):
 
     def resizeEvent(self, event):
         super().resizeEvent(event)
+        if hasattr(self, "strip_chart"):
+            # на минимальном окне (1000 px) ленте места нет — показания не должны обрезаться
+            self.strip_chart.setMinimumHeight(STRIP_CHART_MIN_H if self.height() >= STRIP_CHART_FROM_H else 0)
         if self.overlay.isVisible():
             self.overlay.setGeometry(self.right_panel.rect())
 
@@ -271,7 +281,12 @@ class MainWindow(QMainWindow):
             type="current"
         )
         v.addLayout(current_layout)
-        v.addStretch()
+
+        # --- Лента I/U и уставок за последние минуты (из истории стора) ---
+        # высота — по месту (см. resizeEvent): крупные показания важнее
+        self.strip_chart = StripChart(self.store)
+        self.strip_chart.setMaximumHeight(320)
+        v.addWidget(self.strip_chart, 3)
 
         self.source_header_home = SourceHeaderWidget(source_controller=self.source, main=self)
         v.addWidget(self.source_header_home)
@@ -417,32 +432,24 @@ class MainWindow(QMainWindow):
     def _adjust_voltage(self, delta: int):
         if not hasattr(self.source, 'driver') or not self.source.driver or self.lock:
             return
-        try:
-            current_raw_value = self.source.driver.read_voltage_register()
-            if current_raw_value is None:
-                return
-            new_raw_value = current_raw_value + delta
-            success = self.source.driver.write_voltage_register(new_raw_value)
-            if success:
-                scaled_new = new_raw_value * 0.1
-                self.lbl_voltage_dup.setText(f"{scaled_new:+.1f} В".replace("+", "").replace(".", ","))
-        except Exception as e:
-            print(f"Ошибка при изменении напряжения: {e}")
+        # уставка меняется в теневой копии сразу; на шину уйдёт только последнее значение
+        new_raw_value = self.source.adjust_voltage(delta)
+        if new_raw_value is not None:
+            self._on_setpoint_written("voltage", new_raw_value)
 
     def _adjust_current(self, delta: int):
         if not hasattr(self.source, 'driver') or not self.source.driver or self.lock:
             return
-        try:
-            current_raw_value = self.source.driver.read_current_register()
-            if current_raw_value is None:
-                return
-            new_raw_value = current_raw_value + delta
-            success = self.source.driver.write_current_register(new_raw_value)
-            if success:
-                scaled_new = new_raw_value * 0.1
-                self.lbl_current_dup.setText(f"{scaled_new:+.1f} А".replace(".", "").replace("+", ""))
-        except Exception as e:
-            print(f"Ошибка при изменении тока: {e}")
+        new_raw_value = self.source.adjust_current(delta)
+        if new_raw_value is not None:
+            self._on_setpoint_written("current", new_raw_value)
+
+    def _on_setpoint_written(self, kind: str, raw: int):
+        scaled_new = raw * 0.1
+        if kind == "voltage":
+            self.lbl_voltage_dup.setText(f"{scaled_new:+.1f} В".replace("+", "").replace(".", ","))
+        elif kind == "current":
+            self.lbl_current_dup.setText(f"{scaled_new:+.1f} А".replace(".", "").replace("+", ""))
 
     # ---------- навигация ----------
     def _on_nav(self, key: str):
@@ -530,6 +537,19 @@ class MainWindow(QMainWindow):
             self.connection_tab.set_connected(True)
             self._set_status("connected", "Подключено")
 
+    def _on_link_changed(self, info):
+        """Качество связи от сервиса опроса: обрыв -> «Переподключение», восстановление -> прячем overlay."""
+        state = (info or {}).get("state")
+        if state in ("lost", "reconnecting"):
+            self._set_status("reconnecting", "Переподключение")
+        elif state == "restored":
+            try:
+                self._danger_overlay.hide_overlay()
+            except Exception:
+                pass
+            if self.store.connected:
+                self._set_status("connected", "Подключено")
+
     # ---------- UI по подключению ----------
     def _apply_connected_ui(self, connected: bool):
         if hasattr(self, "lbl_home_hint"):
@@ -538,6 +558,8 @@ class MainWindow(QMainWindow):
             self.btn_connect_big.setVisible(not connected)
         if hasattr(self, "bottom_container"):
             self.bottom_container.setVisible(connected)
+        if hasattr(self, "strip_chart"):
+            self.strip_chart.setVisible(connected)
         self._apply_nav_enabled(connected)
 
     def is_mismatch(self, v_measured: float, v_setpoint: float, threshold_pct: float = 2.0) -> bool:
@@ -553,8 +575,11 @@ class MainWindow(QMainWindow):
                 self.settings_screen.update_from_meas(meas)
             v = float(meas.voltage)
             i = float(meas.current)
-            i_i = float(meas.current_i) / 10
-            v_i = float(meas.voltage_i) / 10
+            # уставки — с учётом ещё не записанных нажатий +/-, чтобы подпись не «прыгала» назад
+            i_set = self.source.setpoint_raw("current")
+            v_set = self.source.setpoint_raw("voltage")
+            i_i = float(meas.current_i if i_set is None else i_set) / 10
+            v_i = float(meas.voltage_i if v_set is None else v_set) / 10
 
             polarity = meas.polarity
             polarity_t = '-' if polarity == 1 else ''
@@ -578,7 +603,8 @@ class MainWindow(QMainWindow):
 
             self.lbl_ah.setText(f"{int(meas.ah_counter)} А·ч")
 
-            current_val = self.source.read_register(1)
+            # состояние катушки приходит в том же снимке — GUI-поток шину не трогает
+            current_val = getattr(meas, "inverter_on", None)
 
             if getattr(meas, "error_overheat", False) or getattr(meas, "error_mains", False):
                 self.power_state = "stop"
@@ -618,7 +644,10 @@ class MainWindow(QMainWindow):
         if self.lock:
             return
 
-        current_val = self.source.read_register(1)
+        # последнее известное состояние из опроса (без чтения с шины в GUI-потоке)
+        current_val = getattr(self.store.meas, "inverter_on", None)
+        if current_val is None:
+            return
 
         if current_val:
             self._run_timer.stop()
@@ -680,6 +709,20 @@ class MainWindow(QMainWindow):
 
     def _on_lock(self, locked: bool):
         self.lock = locked
+        self._update_data_visibility()
+
+    def changeEvent(self, event):
+        super().changeEvent(event)
+        if event.type() == QEvent.WindowStateChange:
+            self._update_data_visibility()
+
+    def _update_data_visibility(self):
+        # свёрнутое окно или заблокированный UI — измерения никто не смотрит, опрос замедляется
+        visible = not self.isMinimized() and not self.left.is_locked()
+        try:
+            self.source.set_data_visible(visible)
+        except Exception:
+            pass
 
     # ---------- Ошибки / предупреждения ----------
     def _on_store_error(self, text: str):
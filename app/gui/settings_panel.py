@@ -10,7 +10,8 @@ import serial
 from serial.tools import list_ports
 
 from app import db
-from resources import DEFAULT_RTU, DEFAULT_WIFI
+from app.modbus.device_profiles import profile_names
+from resources import DEFAULT_RTU, DEFAULT_WIFI, DEFAULT_RTU_OVER_TCP, DEFAULT_UDP
 from dictionary import SETTINGS_SCREEN, TOOLTIPS_RTU, TOOLTIPS_TCP, PROFILE_MSGS
 from .widgets import AlertBox, DangerOverlay
 
@@ -47,6 +48,17 @@ GREEN = QColor("#16A34A")
 RED   = QColor("#DC2626")
 GRAY  = QColor("#9CA3AF")
 
+_DEFAULTS_BY_TYPE = {
+    "RTU": DEFAULT_RTU,
+    "TCP": DEFAULT_WIFI,
+    "RTU_OVER_TCP": DEFAULT_RTU_OVER_TCP,
+    "UDP": DEFAULT_UDP,
+}
+
+
+def _defaults_for(conn_type: str) -> dict:
+    return _DEFAULTS_BY_TYPE.get(conn_type, DEFAULT_WIFI)
+
 
 class SettingsPanel(QWidget):
     def __init__(self, conn_type: str, on_back, on_connect):
@@ -173,24 +185,79 @@ class SettingsPanel(QWidget):
             self.inputs["unit_id"] = unit
             self._add_row("unit_id", unit, TOOLTIPS_RTU["unit_id"])
 
-        else:  # TCP
+            # Остальные приборы на той же линии
+            unit_ids = QLineEdit()
+            unit_ids.setText(str(DEFAULT_RTU.get("unit_ids", "")))
+            unit_ids.setPlaceholderText("2-5, 8")
+            self.inputs["unit_ids"] = unit_ids
+            self._add_row("unit_ids", unit_ids, TOOLTIPS_RTU["unit_ids"])
+
+            # Другие линии RS-485 (свои порты) — опрос в отдельных процессах
+            bus_ports = QLineEdit()
+            bus_ports.setText(str(DEFAULT_RTU.get("bus_ports", "")))
+            bus_ports.setPlaceholderText("COM5: 1-4; COM6: 2, 7")
+            self.inputs["bus_ports"] = bus_ports
+            self._add_row("bus_ports", bus_ports, TOOLTIPS_RTU["bus_ports"])
+
+            # Транспорт RTU: pymodbus или облегчённый
+            self.transport_cb = QComboBox()
+            self.transport_cb.addItems(["pymodbus", "lean"])
+            self.transport_cb.setCurrentText(str(DEFAULT_RTU.get("rtu_transport", "pymodbus")))
+            self.inputs["rtu_transport"] = self.transport_cb
+            self._add_row("rtu_transport", self.transport_cb, TOOLTIPS_RTU["rtu_transport"])
+
+        else:  # TCP / RTU_OVER_TCP / UDP
+            net_defaults = _defaults_for(self.conn_type)
             host = QLineEdit()
-            host.setText(str(DEFAULT_WIFI.get("host", "192.168.1.100")))
+            host.setText(str(net_defaults.get("host", "192.168.1.100")))
             self.inputs["host"] = host
             self._add_row("host", host, TOOLTIPS_TCP["host"])
 
             port = QLineEdit()
-            port.setText(str(DEFAULT_WIFI.get("port", "502")))
+            port.setText(str(net_defaults.get("port", "502")))
             port.setValidator(QIntValidator(1, 65535, self))
             self.inputs["port"] = port
             self._add_row("port", port, TOOLTIPS_TCP["port"])
 
             unit = QLineEdit()
-            unit.setText(str(DEFAULT_WIFI.get("unit_id", "1")))
+            unit.setText(str(net_defaults.get("unit_id", "1")))
             unit.setValidator(QIntValidator(1, 247, self))
             self.inputs["unit_id"] = unit
             self._add_row("unit_id", unit, TOOLTIPS_TCP["unit_id"])
 
+            # Остальные приборы за тем же шлюзом
+            unit_ids = QLineEdit()
+            unit_ids.setText(str(net_defaults.get("unit_ids", "")))
+            unit_ids.setPlaceholderText("2-5, 8")
+            self.inputs["unit_ids"] = unit_ids
+            self._add_row("unit_ids", unit_ids, TOOLTIPS_TCP["unit_ids"])
+
+            if self.conn_type == "TCP":
+                # конвейер есть только у Modbus TCP (сопоставление ответов по transaction id)
+                in_flight = QLineEdit()
+                in_flight.setText(str(DEFAULT_WIFI.get("in_flight", "1")))
+                in_flight.setValidator(QIntValidator(1, 16, self))
+                self.inputs["in_flight"] = in_flight
+                self._add_row("in_flight", in_flight, TOOLTIPS_TCP["in_flight"])
+
+        # Границы адаптивного таймаута ответа (общие для RTU и TCP)
+        defaults = _defaults_for(self.conn_type)
+        tips = TOOLTIPS_RTU if self.conn_type == "RTU" else TOOLTIPS_TCP
+
+        # Модель прибора (карта регистров из device_profiles)
+        self.model_cb = QComboBox()
+        self.model_cb.addItems(profile_names())
+        self.model_cb.setCurrentText(str(defaults.get("device_model", "rectifier")))
+        self.inputs["device_model"] = self.model_cb
+        self._add_row("device_model", self.model_cb, tips["device_model"])
+
+        for key in ("timeout_min_ms", "timeout_max_ms"):
+            edit = QLineEdit()
+            edit.setText(str(defaults.get(key, "")))
+            edit.setValidator(QIntValidator(5, 10000, self))
+            self.inputs[key] = edit
+            self._add_row(key, edit, tips[key])
+
         v.addLayout(self.form)
 
         # Кнопки (явный стиль, чтобы не «съедались»)
@@ -347,7 +414,7 @@ class SettingsPanel(QWidget):
 
         if text == "-- Новый профиль --":
             self.current_profile = None
-            defaults = DEFAULT_RTU if self.conn_type == "RTU" else DEFAULT_WIFI
+            defaults = _defaults_for(self.conn_type)
             for k, w in self.inputs.items():
                 if isinstance(w, QLineEdit):
                     w.setText(str(defaults.get(k, "")))
@@ -447,4 +514,7 @@ class SettingsPanel(QWidget):
 
     def _connect(self):
         data = self._collect()
+        # имя профиля нужно контроллеру для кэша схемы адресации; в сам профиль не сохраняется
+        if self.current_profile:
+            data["profile"] = self.current_profile["name"]
         self.on_connect(self.conn_type, data)
@@ -4,12 +4,14 @@ from PySide6.QtWidgets import QWidget, QGridLayout, QLabel, QVBoxLayout
 from PySide6.QtCore import Qt
 from PySide6.QtGui import QFont, QIcon
 from resources import ASSETS_DIR
+from app.gui.trend_window import TrendWindow
 
 
 class SourceTableWidget(QWidget):
     def __init__(self, source_controller=None, parent=None):
         super().__init__(parent)
         self.source = source_controller
+        self._trend = None   # окно трендов — одно, переиспользуется
         self._setup_ui()
         self._update_table()
         self._meas = None
@@ -118,6 +120,19 @@ class SourceTableWidget(QWidget):
 
     def _on_graph_clicked(self, row_index):
         print(f"Клик по иконке графика для строки {row_index}")
+        # строка 1 — подключённый (или последний подключавшийся) источник; для остальных
+        # окно откроется на выборе источника из журнала
+        name = getattr(self.source, "telemetry_source", None) if row_index == 1 else None
+        try:
+            if self._trend is None:
+                self._trend = TrendWindow(name)
+            else:
+                self._trend.set_source(name)
+            self._trend.show()
+            self._trend.raise_()
+            self._trend.activateWindow()
+        except Exception as e:
+            print(f"[SourceTable] Ошибка открытия трендов: {e}")
 
     def _update_table(self):
         data = self._get_table_data()
@@ -51,12 +51,7 @@ class SourceHeaderWidget(QWidget):
         if self.source is None or self.main.lock:
             return
         try:
-            old = self.source.driver.read_revers()
-            if old == 1:
-                new = 0
-            else:
-                new = 1
-            self.source.driver.write_revers(new)
-            pass
+            # чтение и запись REVERS — одной командой в потоке шины
+            self.source.toggle_revers()
         except Exception as e:
             return
\ No newline at end of file
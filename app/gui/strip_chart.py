@@ -0,0 +1,285 @@
+# app/gui/strip_chart.py
+"""
+Бегущий график I/U и уставок за последние минуты на главном экране.
+Картинка хранится в QPixmap: на кадре он сдвигается на число прошедших столбцов
+(QPixmap.scroll), и дорисовываются только новые столбцы — по min/max отсчётов в столбце.
+Весь путь заново рисуется только при смене размера или масштаба по Y.
+Данные берутся из истории AppStore (MeasurementHistory) — отдельного буфера нет.
+"""
+from __future__ import annotations
+
+import math
+import time
+from typing import Optional, Dict, Tuple, List
+
+import numpy as np
+from PySide6.QtWidgets import QWidget
+from PySide6.QtCore import Qt, QTimer, QPointF, QRectF, QLineF, QSize
+from PySide6.QtGui import QPainter, QColor, QPen, QPixmap, QFont
+
+from app.state.store import MAIN_SOURCE
+from app.modbus.driver import SCALE_I, SCALE_V
+
+BG = "#1E1E1E"
+GRID = "#3A3A3A"
+WHITE = "#FFFFFF"
+ACCENT = "#EF7F1A"
+SETPOINT = "#9E9E9E"
+
+SPAN_S = 180.0     # ширина окна, с
+FPS = 20
+# Правый край отстаёт от текущего времени: отсчёт приходит позже своей метки (дедлайна цикла)
+LAG_S = 0.5
+# Вертикальная метка времени каждые GRID_S секунд
+GRID_S = 30.0
+# Раз в RESCALE_EVERY_S проверяем, не стал ли масштаб по Y слишком крупным для данных
+RESCALE_EVERY_S = 5.0
+
+# Полосы: подпись; ряды — (поле истории, множитель, цвет, толщина линии)
+LANES = (
+    ("I, А", (("current", 1.0, ACCENT, 2), ("current_i", SCALE_I, SETPOINT, 1))),
+    ("U, В", (("voltage", 1.0, WHITE, 2), ("voltage_i", SCALE_V, SETPOINT, 1))),
+)
+
+_MARGIN_L = 64
+_LANE_GAP = 8
+_PAD = 3
+
+
+class StripChart(QWidget):
+    """
+    Лента за последние span_s секунд для источника source_id из AppStore.history.
+    Столбец пикселей — фиксированный интервал абсолютного времени (span_s / ширина),
+    поэтому сдвиг картинки на n пикселей точно соответствует n новым столбцам.
+    Пока виджет скрыт, таймер стоит; при показе картинка строится заново.
+    """
+    def __init__(self, store, source_id: str = MAIN_SOURCE, span_s: float = SPAN_S, fps: int = FPS, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.source_id = source_id
+        self.span_s = float(span_s)
+        self.setAttribute(Qt.WA_OpaquePaintEvent, True)
+        # Высоту отдаём раскладке: на маленьком экране лента сжимается раньше показаний
+        self.setMinimumHeight(0)
+        self._pm: Optional[QPixmap] = None
+        self._spc = 1.0                  # секунд на столбец
+        self._col: Optional[int] = None  # абсолютный номер последнего нарисованного столбца
+        self._ranges: List[Tuple[float, float]] = [(0.0, 1.0)] * len(LANES)
+        self._prev: Dict[str, Tuple[int, float]] = {}   # поле -> (столбец, y последнего значения)
+        self._next_rescale = 0.0
+        self.frame_ms = 0.0              # стоимость последнего кадра (для отладки)
+        self._timer = QTimer(self)
+        self._timer.setInterval(int(1000 / max(1, fps)))
+        self._timer.timeout.connect(self._tick)
+
+    # ---------- жизненный цикл ----------
+    def showEvent(self, e):
+        super().showEvent(e)
+        self._pm = None
+        self._timer.start()
+        self._tick()
+
+    def hideEvent(self, e):
+        super().hideEvent(e)
+        self._timer.stop()
+
+    def resizeEvent(self, e):
+        super().resizeEvent(e)
+        self._pm = None
+
+    def reset(self):
+        """Перерисовать всё на следующем кадре (например, после переподключения)."""
+        self._pm = None
+
+    # ---------- геометрия ----------
+    def _plot_size(self) -> Tuple[int, int]:
+        return max(1, self.width() - _MARGIN_L), max(1, self.height())
+
+    def _lane_rect(self, i: int) -> Tuple[float, float]:
+        """(верх, высота) полосы i внутри картинки."""
+        _w, h = self._plot_size()
+        lane_h = (h - _LANE_GAP * (len(LANES) - 1)) / len(LANES)
+        return i * (lane_h + _LANE_GAP), lane_h
+
+    def _y(self, lane: int, v):
+        top, lane_h = self._lane_rect(lane)
+        lo, hi = self._ranges[lane]
+        return top + lane_h - _PAD - (v - lo) * ((lane_h - 2 * _PAD) / (hi - lo))
+
+    # ---------- данные ----------
+    def _stats(self, hist, c0: int, n: int):
+        """
+        Столбцы c0..c0+n-1: (номера столбцов с данными, {поле: (min, max, first, last)}).
+        Отсчёты группируются по столбцу одним проходом NumPy (reduceat).
+        """
+        spc = self._spc
+        d = hist.between(c0 * spc, (c0 + n) * spc)
+        t = d["t"]
+        if not len(t):
+            return None, {}
+        idx = np.maximum(np.floor(t / spc).astype(np.int64) - c0, 0)
+        keep = idx < n
+        if not keep.all():
+            idx = idx[keep]
+            t = t[keep]
+        if not len(idx):
+            return None, {}
+        starts = np.flatnonzero(np.concatenate(([True], idx[1:] != idx[:-1])))
+        ends = np.concatenate((starts[1:], [len(idx)])) - 1
+        out = {}
+        for _title, series in LANES:
+            for name, k, _color, _w in series:
+                v = d[name][:len(idx)].astype(np.float64) * k
+                out[name] = (np.minimum.reduceat(v, starts), np.maximum.reduceat(v, starts), v[starts], v[ends])
+        return idx[starts] + c0, out
+
+    @staticmethod
+    def _range_of(stats, lane: int) -> Optional[Tuple[float, float]]:
+        lo = math.inf
+        hi = -math.inf
+        for name, _k, _c, _w in LANES[lane][1]:
+            s = stats.get(name)
+            if s is not None and len(s[0]):
+                lo = min(lo, float(np.nanmin(s[0])))
+                hi = max(hi, float(np.nanmax(s[1])))
+        return None if lo > hi else (lo, hi)
+
+    @staticmethod
+    def _padded(r: Optional[Tuple[float, float]]) -> Tuple[float, float]:
+        if r is None:
+            return 0.0, 1.0
+        lo, hi = r
+        pad = (hi - lo) * 0.15 or max(abs(hi) * 0.1, 1.0)
+        return lo - pad, hi + pad
+
+    # ---------- кадр ----------
+    def _tick(self):
+        hist = self.store.history_for(self.source_id)
+        if hist is None:
+            return
+        t_start = time.perf_counter()
+        w, h = self._plot_size()
+        if h < 40:
+            return   # места под ленту нет (маленькое окно)
+        self._spc = self.span_s / w
+        cur = int((time.time() - LAG_S) // self._spc) - 1   # последний законченный столбец
+
+        redraw = self._pm is None or self._pm.width() != w or self._pm.height() != h \
+            or self._col is None or cur - self._col >= w or cur < self._col
+        if not redraw and time.monotonic() >= self._next_rescale:
+            redraw = self._needs_rescale(hist, cur, w)
+        if redraw:
+            self._redraw(hist, cur, w, h)
+        elif cur > self._col:
+            n = cur - self._col
+            cols, stats = self._stats(hist, self._col + 1, n)
+            if any(self._outside(stats, lane) for lane in range(len(LANES))):
+                self._redraw(hist, cur, w, h)
+            else:
+                self._pm.scroll(-n, 0, self._pm.rect())
+                p = QPainter(self._pm)
+                try:
+                    p.fillRect(QRectF(w - n, 0, n, h), QColor(BG))
+                    self._draw_columns(p, self._col + 1, n, cur, w, cols, stats)
+                finally:
+                    p.end()
+                self._col = cur
+        else:
+            return
+        self.update()
+        self.frame_ms = (time.perf_counter() - t_start) * 1000.0
+
+    def _outside(self, stats, lane: int) -> bool:
+        r = self._range_of(stats, lane)
+        if r is None:
+            return False
+        lo, hi = self._ranges[lane]
+        return r[0] < lo or r[1] > hi
+
+    def _needs_rescale(self, hist, cur: int, w: int) -> bool:
+        # данные сжались (например, источник выключили) — масштаб подгоняется заново
+        self._next_rescale = time.monotonic() + RESCALE_EVERY_S
+        _cols, stats = self._stats(hist, cur - w + 1, w)
+        for lane in range(len(LANES)):
+            r = self._range_of(stats, lane)
+            lo, hi = self._ranges[lane]
+            if r is not None and (r[1] - r[0]) * 1.15 < (hi - lo) * 0.4:
+                return True
+        return False
+
+    def _redraw(self, hist, cur: int, w: int, h: int):
+        if self._pm is None or self._pm.width() != w or self._pm.height() != h:
+            self._pm = QPixmap(w, h)
+        self._pm.fill(QColor(BG))
+        c0 = cur - w + 1
+        cols, stats = self._stats(hist, c0, w)
+        self._ranges = [self._padded(self._range_of(stats, lane)) for lane in range(len(LANES))]
+        self._prev.clear()
+        p = QPainter(self._pm)
+        try:
+            self._draw_columns(p, c0, w, cur, w, cols, stats)
+        finally:
+            p.end()
+        self._col = cur
+        self._next_rescale = time.monotonic() + RESCALE_EVERY_S
+
+    def _draw_columns(self, p: QPainter, c0: int, n: int, cur: int, w: int, cols, stats):
+        """Столбцы c0..c0+n-1 (x = w - 1 - (cur - столбец)): метки времени и отрезки рядов."""
+        spc = self._spc
+        _w, h = self._plot_size()
+        p.setPen(QPen(QColor(GRID), 1))
+        g0 = math.ceil(c0 * spc / GRID_S)
+        g1 = math.floor((c0 + n) * spc / GRID_S)
+        for g in range(g0, g1 + 1):
+            x = w - 1 - (cur - int(g * GRID_S // spc))
+            p.drawLine(QPointF(x, 0), QPointF(x, h))
+        if cols is None:
+            return
+        p.setRenderHint(QPainter.Antialiasing, False)
+        xs = (w - 1 - (cur - cols)).tolist()
+        cols_l = cols.tolist()
+        for lane, (_title, series) in enumerate(LANES):
+            for name, _k, color, width in series:
+                mn, mx, first, last = stats[name]
+                y_mn = self._y(lane, mn).tolist()
+                y_mx = self._y(lane, mx).tolist()
+                y_first = self._y(lane, first).tolist()
+                y_last = self._y(lane, last).tolist()
+                lines = []
+                prev = self._prev.get(name)
+                for j, x in enumerate(xs):
+                    col = cols_l[j]
+                    if prev is not None and prev[0] == col - 1:
+                        # продолжение линии из соседнего столбца
+                        lines.append(QLineF(x - 1, prev[1], x, y_first[j]))
+                    if y_mn[j] != y_mx[j]:
+                        # всплески внутри столбца — вертикаль min..max
+                        lines.append(QLineF(x, y_mn[j], x, y_mx[j]))
+                    prev = (col, y_last[j])
+                if prev is not None:
+                    self._prev[name] = prev
+                if lines:
+                    p.setPen(QPen(QColor(color), width))
+                    p.drawLines(lines)
+
+    # ---------- отрисовка ----------
+    def paintEvent(self, _e):
+        p = QPainter(self)
+        try:
+            p.fillRect(QRectF(0, 0, _MARGIN_L, self.height()), QColor(BG))
+            if self._pm is None or self._pm.size() != self.size() - QSize(_MARGIN_L, 0):
+                p.fillRect(QRectF(_MARGIN_L, 0, self.width() - _MARGIN_L, self.height()), QColor(BG))
+                return
+            p.drawPixmap(_MARGIN_L, 0, self._pm)
+            font = QFont()
+            font.setPointSize(9)
+            p.setFont(font)
+            for lane, (title, _series) in enumerate(LANES):
+                top, lane_h = self._lane_rect(lane)
+                lo, hi = self._ranges[lane]
+                p.setPen(QColor(WHITE))
+                p.drawText(QRectF(2, top, _MARGIN_L - 6, 16), Qt.AlignRight | Qt.AlignTop, f"{hi:.4g}")
+                p.drawText(QRectF(2, top + lane_h / 2 - 8, _MARGIN_L - 6, 16), Qt.AlignRight | Qt.AlignVCenter, title)
+                p.drawText(QRectF(2, top + lane_h - 16, _MARGIN_L - 6, 16), Qt.AlignRight | Qt.AlignBottom, f"{lo:.4g}")
+        finally:
+            p.end()
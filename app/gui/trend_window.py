@@ -0,0 +1,399 @@
+# app/gui/trend_window.py
+"""
+Окно трендов источника по журналу телеметрии (app/telemetry.py).
+Данные прореживаются в SQLite (decimate: min/max на столбец пикселя по подходящему уровню
+свёрток), в память попадает только видимый диапазон — не больше ширины графика строк.
+Запросы идут в отдельном потоке; пока ответ не пришёл, на экране сдвинутая старая картинка.
+"""
+from __future__ import annotations
+
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, List, Tuple
+
+import numpy as np
+from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QComboBox, QPushButton, QCheckBox, QLabel
+from PySide6.QtCore import Qt, Signal, QTimer, QPointF, QRectF
+from PySide6.QtGui import QPainter, QColor, QPen, QFont
+
+from app import telemetry
+from app.modbus.driver import SCALE_I, SCALE_V
+
+# Полосы графика: подпись и ряды (поле, "envelope" — огибающая min/max | "mean" — линия, цвет)
+LANES = (
+    ("Ток, А", (("current", "envelope", "#4FC3F7"), ("current_i", "mean", "#FFB74D"))),
+    ("Напряжение, В", (("voltage", "envelope", "#81C784"), ("voltage_i", "mean", "#FFB74D"))),
+    ("Температура, °C", (("temp1", "mean", "#E57373"), ("temp2", "mean", "#BA68C8"))),
+)
+# Уставки в журнале сырые (как в регистрах) — на графике в А/В
+_SCALE = {"current_i": SCALE_I, "voltage_i": SCALE_V}
+# Температуры меняются медленно — им хватает в 8 раз более грубой сетки (запрос дешевле)
+TEMP_DECIMATION = 8
+
+PRESETS = (("1 мин", 60), ("1 ч", 3600), ("Сутки", 86400), ("Неделя", 7 * 86400))
+MIN_SPAN_S = 1.0
+# Пауза в журнале длиннее этого (и длиннее пары столбцов/корзин) — разрыв линии
+GAP_S = 5.0
+MAX_SPAN_S = 400 * 86400
+# Шаги сетки времени, с — выбирается первый, дающий не меньше _TICK_PX между метками
+_TICK_STEPS = (1, 2, 5, 10, 15, 30, 60, 120, 300, 600, 900, 1800, 3600, 2 * 3600, 3 * 3600,
+               6 * 3600, 12 * 3600, 86400, 2 * 86400, 7 * 86400, 14 * 86400, 30 * 86400)
+_TICK_PX = 90
+
+_MARGIN_L = 70
+_MARGIN_R = 12
+_MARGIN_T = 8
+_MARGIN_B = 26
+_LANE_GAP = 10
+
+
+class TrendPlot(QWidget):
+    """
+    Отрисовка прорежённых рядов QPainter-ом. Данные — куски вида (t0, t1, столбцов, dict
+    из telemetry.decimate); x столбца считается от диапазона, под который кусок запрошен,
+    поэтому при панорамировании старый кусок просто сдвигается до прихода нового.
+    Перетаскивание — сдвиг, колесо — масштаб вокруг курсора; о смене окна — viewChanged.
+    """
+    viewChanged = Signal(float, float)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setMinimumSize(480, 320)
+        self.setMouseTracking(False)
+        now = time.time()
+        self.t0 = now - 3600
+        self.t1 = now
+        self._chunks: List[Tuple[float, float, int, Dict[str, Any]]] = []
+        self._drag_x: Optional[float] = None
+        self._drag_view: Tuple[float, float] = (self.t0, self.t1)
+        self.status = ""
+
+    # ---------- данные и окно ----------
+    def plot_width(self) -> int:
+        return max(1, self.width() - _MARGIN_L - _MARGIN_R)
+
+    def set_view(self, t0: float, t1: float, emit: bool = True):
+        span = min(MAX_SPAN_S, max(MIN_SPAN_S, float(t1) - float(t0)))
+        mid = (float(t0) + float(t1)) / 2.0
+        self.t0 = mid - span / 2.0
+        self.t1 = mid + span / 2.0
+        self.update()
+        if emit:
+            self.viewChanged.emit(self.t0, self.t1)
+
+    def set_chunks(self, chunks):
+        self._chunks = list(chunks)
+        self.update()
+
+    # ---------- мышь ----------
+    def mousePressEvent(self, e):
+        if e.button() == Qt.LeftButton:
+            self._drag_x = e.position().x()
+            self._drag_view = (self.t0, self.t1)
+
+    def mouseMoveEvent(self, e):
+        if self._drag_x is None:
+            return
+        t0, t1 = self._drag_view
+        dt = -(e.position().x() - self._drag_x) * (t1 - t0) / self.plot_width()
+        self.set_view(t0 + dt, t1 + dt)
+
+    def mouseReleaseEvent(self, e):
+        self._drag_x = None
+
+    def wheelEvent(self, e):
+        steps = e.angleDelta().y() / 120.0
+        if not steps:
+            return
+        factor = 0.8 ** steps
+        x = e.position().x() - _MARGIN_L
+        frac = min(1.0, max(0.0, x / self.plot_width()))
+        anchor = self.t0 + frac * (self.t1 - self.t0)
+        span = min(MAX_SPAN_S, max(MIN_SPAN_S, (self.t1 - self.t0) * factor))
+        self.set_view(anchor - frac * span, anchor - frac * span + span)
+
+    # ---------- отрисовка ----------
+    def _series(self, field: str, kind: str):
+        """(x столбцов, lo, hi, разрывы) ряда из куска, где он есть; для линии lo is hi."""
+        for ct0, ct1, n, data in self._chunks:
+            key_lo = f"{field}_min" if kind == "envelope" else f"{field}_mean"
+            if key_lo not in data:
+                continue
+            px = data["px"]
+            if not len(px):
+                return None
+            per_px = (ct1 - ct0) / n
+            t = ct0 + (px + 0.5) * per_px
+            x = _MARGIN_L + (t - self.t0) / (self.t1 - self.t0) * self.plot_width()
+            lo = data[key_lo]
+            hi = data[f"{field}_max"] if kind == "envelope" else lo
+            k = _SCALE.get(field)
+            if k is not None:
+                lo = lo * k
+                hi = lo if kind != "envelope" else hi * k
+            # разрыв — нет значения или между столбцами пауза длиннее обычного шага данных
+            limit = max(GAP_S, 2.0 * data["tier"], 3.0 * per_px)
+            gap = np.isnan(lo) | np.concatenate(([True], np.diff(data["t"]) > limit))
+            return x, lo, hi, gap
+        return None
+
+    def paintEvent(self, _e):
+        p = QPainter(self)
+        try:
+            p.fillRect(self.rect(), QColor("#1E1E1E"))
+            w = self.plot_width()
+            h_total = self.height() - _MARGIN_T - _MARGIN_B
+            lane_h = max(20.0, (h_total - _LANE_GAP * (len(LANES) - 1)) / len(LANES))
+            font = QFont()
+            font.setPointSize(9)
+            p.setFont(font)
+            ticks = self._time_ticks()
+
+            for i, (title, series) in enumerate(LANES):
+                top = _MARGIN_T + i * (lane_h + _LANE_GAP)
+                rect = QRectF(_MARGIN_L, top, w, lane_h)
+                p.setPen(QPen(QColor("#444444"), 1))
+                p.drawRect(rect)
+                for tx, _label in ticks:
+                    p.drawLine(QPointF(tx, top), QPointF(tx, top + lane_h))
+
+                data = [(s, self._series(s[0], s[1])) for s in series]
+                y_lo, y_hi = self._y_range([d for _s, d in data if d is not None])
+                p.setPen(QColor("#FFFFFF"))
+                p.drawText(QRectF(4, top, _MARGIN_L - 8, 16), Qt.AlignRight | Qt.AlignTop, f"{y_hi:.4g}")
+                p.drawText(QRectF(4, top + lane_h - 16, _MARGIN_L - 8, 16), Qt.AlignRight | Qt.AlignBottom,
+                           f"{y_lo:.4g}")
+                p.drawText(QRectF(_MARGIN_L + 6, top + 2, w - 12, 16), Qt.AlignLeft | Qt.AlignTop, title)
+
+                p.save()
+                p.setClipRect(rect)
+                for (field, kind, color), d in data:
+                    if d is not None:
+                        self._draw_series(p, d, kind, QColor(color), top, lane_h, y_lo, y_hi)
+                p.restore()
+
+            p.setPen(QColor("#FFFFFF"))
+            base = self.height() - _MARGIN_B + 4
+            for tx, label in ticks:
+                p.drawText(QRectF(tx - 60, base, 120, 18), Qt.AlignHCenter | Qt.AlignTop, label)
+            if self.status:
+                p.setPen(QColor("#9E9E9E"))
+                p.drawText(QRectF(_MARGIN_L + 6, _MARGIN_T + 2, w - 12, 16), Qt.AlignRight | Qt.AlignTop, self.status)
+        finally:
+            p.end()
+
+    @staticmethod
+    def _y_range(series) -> Tuple[float, float]:
+        lo = math.inf
+        hi = -math.inf
+        for _x, s_lo, s_hi, _gap in series:
+            if len(s_lo) and not np.all(np.isnan(s_lo)):
+                lo = min(lo, float(np.nanmin(s_lo)))
+                hi = max(hi, float(np.nanmax(s_hi)))
+        if lo > hi:
+            return 0.0, 1.0
+        pad = (hi - lo) * 0.05 or max(abs(hi) * 0.05, 0.5)
+        return lo - pad, hi + pad
+
+    @staticmethod
+    def _draw_series(p: QPainter, series, kind: str, color: QColor, top: float, lane_h: float,
+                     y_lo: float, y_hi: float):
+        x, lo, hi, gap = series
+        k = lane_h / (y_hi - y_lo)
+        y_lo_px = top + lane_h - (lo - y_lo) * k
+        y_hi_px = top + lane_h - (hi - y_lo) * k
+        p.setPen(QPen(color, 1))
+        pts: List[QPointF] = []
+        for j in range(len(x)):
+            if gap[j]:
+                if len(pts) > 1:
+                    p.drawPolyline(pts)
+                pts = []
+                if math.isnan(lo[j]):
+                    continue
+            xj = float(x[j])
+            if kind == "envelope":
+                # огибающая: в каждом столбце вертикаль min..max, столбцы соединены
+                pts.append(QPointF(xj, float(y_lo_px[j])))
+                pts.append(QPointF(xj, float(y_hi_px[j])))
+            else:
+                pts.append(QPointF(xj, float(y_lo_px[j])))
+        if len(pts) > 1:
+            p.drawPolyline(pts)
+        elif pts:
+            p.drawPoint(pts[0])
+
+    def _time_ticks(self) -> List[Tuple[float, str]]:
+        span = self.t1 - self.t0
+        w = self.plot_width()
+        step = _TICK_STEPS[-1]
+        for s in _TICK_STEPS:
+            if s / span * w >= _TICK_PX:
+                step = s
+                break
+        # метки по местному времени: полночь, ровные часы и т.д.
+        off = time.localtime(self.t0).tm_gmtoff
+        t = self.t0 - (self.t0 + off) % step + step
+        if step >= 86400:
+            fmt = "%d.%m"
+        elif span >= 86400:
+            fmt = "%d.%m %H:%M"
+        elif step >= 60:
+            fmt = "%H:%M"
+        else:
+            fmt = "%H:%M:%S"
+        ticks = []
+        while t <= self.t1:
+            ticks.append((_MARGIN_L + (t - self.t0) / span * w, time.strftime(fmt, time.localtime(t))))
+            t += step
+        return ticks
+
+
+class TrendWindow(QWidget):
+    """
+    Отдельное окно трендов: выбор источника из журнала, быстрые диапазоны,
+    «Сейчас» — окно едет за текущим временем. Запросы — в одном фоновом потоке,
+    новый ставится только после ответа на предыдущий (промежуточные окна пропускаются).
+    """
+    _fetched = Signal(int, object)
+
+    def __init__(self, source: Optional[str] = None, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Тренды")
+        self.resize(1100, 640)
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="trend")
+        self._conn = None        # соединение с журналом — живёт в потоке запросов
+        self._gen = 0
+        self._busy = False
+        self._dirty = False
+        self._fetched.connect(self._on_fetched)
+
+        layout = QVBoxLayout(self)
+        bar = QHBoxLayout()
+        self.source_cb = QComboBox()
+        self.source_cb.setMinimumWidth(260)
+        self.source_cb.currentTextChanged.connect(lambda _t: self._request())
+        bar.addWidget(self.source_cb)
+        for text, span in PRESETS:
+            btn = QPushButton(text)
+            btn.clicked.connect(lambda _c=False, s=span: self._show_last(s))
+            bar.addWidget(btn)
+        self.follow_cb = QCheckBox("Сейчас")
+        self.follow_cb.setChecked(True)
+        self.follow_cb.toggled.connect(lambda on: on and self._show_last(self.plot.t1 - self.plot.t0))
+        bar.addWidget(self.follow_cb)
+        bar.addStretch()
+        self.info_lbl = QLabel("")
+        bar.addWidget(self.info_lbl)
+        layout.addLayout(bar)
+
+        self.plot = TrendPlot(self)
+        self.plot.viewChanged.connect(self._on_view_changed)
+        layout.addWidget(self.plot, 1)
+
+        # «Сейчас»: раз в секунду окно сдвигается к текущему времени
+        self._follow_timer = QTimer(self)
+        self._follow_timer.setInterval(1000)
+        self._follow_timer.timeout.connect(self._on_follow_tick)
+
+        self.set_source(source)
+
+    # ---------- публичный API ----------
+    def set_source(self, source: Optional[str]):
+        """Обновить список источников журнала и выбрать source (если есть)."""
+        try:
+            names = telemetry.list_sources()
+        except Exception as e:
+            print(f"[Trend] cannot list sources: {e}")
+            names = []
+        if source and source not in names:
+            names.insert(0, source)
+        current = source or self.source_cb.currentText()
+        self.source_cb.blockSignals(True)
+        self.source_cb.clear()
+        self.source_cb.addItems(names)
+        if current in names:
+            self.source_cb.setCurrentText(current)
+        self.source_cb.blockSignals(False)
+        self._request()
+
+    # ---------- окно ----------
+    def _show_last(self, span: float):
+        now = time.time()
+        self.plot.set_view(now - span, now, emit=False)
+        self._request()
+
+    def _on_view_changed(self, t0: float, t1: float):
+        # ручной сдвиг в прошлое — перестаём ехать за текущим временем
+        if self.follow_cb.isChecked() and t1 < time.time() - (t1 - t0) * 0.02:
+            self.follow_cb.blockSignals(True)
+            self.follow_cb.setChecked(False)
+            self.follow_cb.blockSignals(False)
+        self._request()
+
+    def _on_follow_tick(self):
+        if self.follow_cb.isChecked() and self.isVisible():
+            self._show_last(self.plot.t1 - self.plot.t0)
+
+    # ---------- запросы ----------
+    def _request(self):
+        source = self.source_cb.currentText()
+        if not source:
+            return
+        if self._busy:
+            self._dirty = True
+            return
+        self._busy = True
+        self._dirty = False
+        self._gen += 1
+        gen = self._gen
+        args = (source, self.plot.t0, self.plot.t1, self.plot.plot_width())
+        fut = self._pool.submit(self._fetch, *args)
+        fut.add_done_callback(lambda f, g=gen: self._fetched.emit(g, f))
+
+    def _fetch(self, source: str, t0: float, t1: float, width: int) -> dict:
+        # поток запросов
+        if self._conn is None:
+            self._conn = telemetry.connect()
+        ts = time.perf_counter()
+        main = telemetry.decimate(source, t0, t1, width, envelope=("current", "voltage"),
+                                  means=("current_i", "voltage_i"), conn=self._conn)
+        n_temp = max(1, width // TEMP_DECIMATION)
+        temps = telemetry.decimate(source, t0, t1, n_temp, envelope=(), means=("temp1", "temp2"),
+                                   conn=self._conn)
+        return {
+            "chunks": [(t0, t1, width, main), (t0, t1, n_temp, temps)],
+            "tier": main["tier"],
+            "ms": (time.perf_counter() - ts) * 1000.0,
+        }
+
+    def _on_fetched(self, gen: int, fut):
+        self._busy = False
+        try:
+            res = fut.result()
+        except Exception as e:
+            print(f"[Trend] query failed: {e}")
+            self.info_lbl.setText("Ошибка чтения журнала")
+            res = None
+        if res is not None:
+            self.plot.set_chunks(res["chunks"])
+            tier = res["tier"]
+            self.plot.status = "исходные отсчёты" if tier == telemetry.RAW else f"свёртка {tier} с"
+            self.info_lbl.setText(f"{res['ms']:.0f} мс")
+        if self._dirty:
+            self._request()
+
+    def resizeEvent(self, e):
+        super().resizeEvent(e)
+        self._request()
+
+    def showEvent(self, e):
+        super().showEvent(e)
+        self._follow_timer.start()
+        self._request()
+
+    def closeEvent(self, e):
+        # окно только скрывается (его переиспользует таблица источников) — таймер не нужен
+        self._follow_timer.stop()
+        super().closeEvent(e)
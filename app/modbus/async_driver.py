@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Optional, List, Dict, Any
+
+from .driver import (
+    _DriverCore, unit_kwarg, clamp_setpoint, BLOCK_COILS, SNAPSHOT_HOLD_START, SNAPSHOT_HOLD_COUNT,
+)
+from .pipelined_tcp import FC_READ_HOLDING, FC_READ_INPUT
+from .registry import HoldingRegs, holding_reg, Measurements, Setpoints
+from .rtt import is_no_response
+
+
+class AsyncSourceDriver(_DriverCore):
+    """
+    Асинхронный двойник SourceDriver для AsyncModbusTcpClient / AsyncModbusSerialClient.
+    Адрес ведомого передаётся в каждом вызове, поэтому один клиент (порт RS-485 или шлюз)
+    можно делить между несколькими источниками — их запросы сериализует общий lock.
+    Схема адресации, образ регистров и декод — общие с SourceDriver (_DriverCore).
+    Поштучного legacy-чтения нет: устройство должно отдавать окна снимка целиком.
+    """
+    def __init__(self, client, unit_id: int = 1, snapshot: bool = True,
+                 addressing: Optional[Dict[str, Any]] = None, lock: Optional[asyncio.Lock] = None,
+                 profile=None):
+        super().__init__(unit_id, snapshot=snapshot, addressing=addressing, profile=profile)
+        self.client = client
+        self.lock = lock
+
+    # ---------- транспорт ----------
+    async def _call(self, name: str, *args, **kwargs):
+        method = getattr(self.client, name, None)
+        if method is None:
+            return None
+        kw = unit_kwarg(method)
+        if kw:
+            kwargs[kw] = self.unit
+        try:
+            if self.lock is None:
+                rr = await method(*args, **kwargs)
+            else:
+                async with self.lock:
+                    rr = await method(*args, **kwargs)
+        except Exception:
+            rr = None
+        self._answered = not is_no_response(rr)
+        return rr
+
+    async def _read_regs(self, reader: str, start: int, count: int) -> Optional[List[int]]:
+        if not self._addr_is_ok(start, count):
+            return None
+        if reader == "input":
+            name, fc = "read_input_registers", FC_READ_INPUT
+        else:
+            name, fc = "read_holding_registers", FC_READ_HOLDING
+        return self._ok_regs(await self._call(name, start, count=count), count, fc)
+
+    async def _read_scheme(self, reader: str, base: str, shift: int, addr_1based: int, count: int) -> Optional[List[int]]:
+        return await self._read_regs(reader, self._scheme_start(base, shift, addr_1based), count)
+
+    async def _read_cached(self, addr_1based: int, count: int) -> Optional[List[int]]:
+        return await self._read_scheme(self._reader_kind, self._base_kind, self._addr_shift, addr_1based, count)
+
+    async def _read_block_smart(self, addr_1based_start: int, count: int) -> Optional[List[int]]:
+        """Как SourceDriver._read_block_smart: закэшированная схема, перебор — только при отказе."""
+        for reader, base, sh in self._schemes():
+            regs = await self._read_scheme(reader, base, sh, addr_1based_start, count)
+            if regs is not None:
+                self._remember_scheme(reader, base, sh)
+                return regs
+        return None
+
+    async def _read_hold(self, addr_1based: int, count: int) -> Optional[List[int]]:
+        return await self._read_regs("holding", holding_reg(addr_1based), count)
+
+    # ---------- чтение ----------
+    async def read_coil_states(self) -> Optional[List[bool]]:
+        window = self.profile.windows.get("coils")
+        if window is None:
+            return None
+        address, n, pad = self._coil_window(*window)
+        bits = self._ok_bits(await self._call("read_coils", address, count=n), n)
+        return None if bits is None else [False] * pad + bits
+
+    async def read_snapshot(self) -> Optional[Measurements]:
+        """Окна input + holding профиля по закэшированной схеме (перебор — reprobe())."""
+        windows = self.profile.windows
+        try:
+            inp = hold = []
+            if "input" in windows:
+                inp = await self._read_cached(*windows["input"])
+                if inp is None:
+                    return None
+            if "holding" in windows:
+                hold = await self._read_hold(*windows["holding"])
+                if hold is None:
+                    return None
+            self._store_snapshot(inp, hold)
+            return self._decode_buffers(inp, hold)
+        except Exception:
+            return None
+
+    async def read_measurements(self) -> Optional[Measurements]:
+        """Снимок + катушки — то же содержимое Measurements, что и у SourceDriver.read_measurements()."""
+        meas = await self.read_snapshot()
+        if meas is not None:
+            bits = await self.read_coil_states()
+            if bits is not None:
+                self._image[BLOCK_COILS] = bits
+            self._apply_coils(meas, bits)
+        return meas
+
+    async def read_block(self, name: str) -> bool:
+        block = self.profile.blocks.get(name)
+        if block is None:
+            return True
+        kind, start, count = block
+        if kind == "input":
+            regs = await self._read_cached(start, count)
+        elif kind == "holding":
+            regs = await self._read_hold(start, count)
+        else:
+            regs = await self.read_coil_states()
+        if regs is None:
+            return False
+        self._image[name] = list(regs[:count])
+        return True
+
+    async def ping(self) -> bool:
+        window = self.profile.windows.get("input")
+        if window is None:
+            return await self._read_hold(self.profile.windows["holding"][0], 1) is not None
+        if await self._read_cached(window[0], 1) is not None:
+            return True
+        # как SourceDriver.ping(): перебор, только если прибор хоть что-то ответил
+        return self._answered and await self.reprobe()
+
+    async def reprobe(self) -> bool:
+        """Полный перебор схем адресации (см. SourceDriver.reprobe)."""
+        window = self.profile.windows.get("input")
+        if window is None or not self._answered:
+            return False
+        return await self._read_block_smart(window[0], 1) is not None
+
+    # ---------- запись ----------
+    async def write_setpoints(self, sp: Setpoints, verify: bool = False) -> bool:
+        """Рабочая точка 40002–40004 одним FC16 (см. SourceDriver.write_setpoints)."""
+        regs = [clamp_setpoint(HoldingRegs.CURRENT_SETPOINT + i, v) for i, v in enumerate(sp.as_registers())]
+        rr = await self._call("write_registers", holding_reg(SNAPSHOT_HOLD_START), regs)
+        if rr is None or getattr(rr, "isError", lambda: False)():
+            return False
+        self._image_written(SNAPSHOT_HOLD_START, regs)
+        if not verify:
+            return True
+        back = await self._read_hold(SNAPSHOT_HOLD_START, SNAPSHOT_HOLD_COUNT)
+        return back is not None and [int(x) for x in back[:SNAPSHOT_HOLD_COUNT]] == regs
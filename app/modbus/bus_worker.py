@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import random
+import time
+from typing import Dict, Any, List
+
+# Модуль исполняется в отдельном процессе: здесь нельзя тянуть PySide6 — только транспорт,
+# драйвер и кольцо в разделяемой памяти.
+from .client_factory import create_client
+from .driver import SourceDriver, REPROBE_AFTER_MISSES
+from .serial_line import SilentBusClient
+from .rtt import TimeoutTuner
+from .shm_ring import attach, RingWriter
+
+
+def _reconnect(client) -> bool:
+    try:
+        client.close()
+    except Exception:
+        pass
+    try:
+        return bool(client.connect())
+    except Exception:
+        return False
+
+
+def run_bus_worker(spec: Dict[str, Any], shm_name: str, stop_event):
+    """
+    Точка входа процесса линии (multiprocessing, spawn).
+    spec: {bus_id, conn_type, settings, unit_ids, interval_ms, addressing?, max_failures,
+           reconnect_base_s, reconnect_max_s}.
+    Приборы опрашиваются по очереди на фиксированной сетке interval_ms; каждый результат
+    (и каждый сбой) публикуется в кольцо. Процесс только читает — команды идут через GUI-процесс.
+    """
+    bus_id = spec.get("bus_id", "?")
+    conn_type = spec.get("conn_type", "RTU")
+    settings = dict(spec.get("settings") or {})
+    unit_ids: List[int] = [int(u) for u in spec.get("unit_ids") or [settings.get("unit_id", 1)]]
+    period = max(10, int(spec.get("interval_ms", 250))) / 1000.0
+    max_failures = max(1, int(spec.get("max_failures", 3)))
+    base_s = max(0.05, float(spec.get("reconnect_base_s", 0.5)))
+    max_s = max(base_s, float(spec.get("reconnect_max_s", 30.0)))
+
+    shm = attach(shm_name)
+    ring = RingWriter(shm.buf)
+    timeouts = TimeoutTuner.from_settings(settings)
+    settings.setdefault("timeout", timeouts.max_s)
+    client = create_client(conn_type, settings)
+    bus = client
+    if conn_type == "RTU":
+        bus = SilentBusClient(client, int(settings.get("baudrate", 9600)))
+    drivers = [SourceDriver(bus, unit_id=uid, addressing=spec.get("addressing"), timeouts=timeouts,
+                            profile=spec.get("device_model"))
+               for uid in unit_ids]
+    failures: Dict[int, int] = {uid: 0 for uid in unit_ids}
+    print(f"[BusWorker {bus_id}] started, units={unit_ids}")
+
+    try:
+        attempt = 0
+        while not stop_event.is_set() and not _reconnect(client):
+            delay = min(max_s, base_s * (2 ** min(attempt, 16))) * random.uniform(0.5, 1.0)
+            attempt += 1
+            stop_event.wait(delay)
+
+        due = time.monotonic()
+        wall0 = time.time() - due
+        attempt = 0
+        while not stop_event.is_set():
+            delay = due - time.monotonic()
+            if delay > 0 and stop_event.wait(delay):
+                break
+            for d in drivers:
+                try:
+                    meas = d.read_measurements()
+                except Exception:
+                    meas = None
+                uid = d.unit
+                if meas is not None:
+                    failures[uid] = 0
+                    meas.timestamp = wall0 + due
+                    ring.write(uid, meas)
+                else:
+                    failures[uid] += 1
+                    if failures[uid] == REPROBE_AFTER_MISSES and failures[uid] < max_failures:
+                        d.reprobe()
+                    ring.write(uid, None, failures[uid], failures[uid] >= max_failures)
+
+            if all(n >= max_failures for n in failures.values()):
+                # молчат все приборы линии — переоткрываем порт с экспоненциальной задержкой
+                delay = min(max_s, base_s * (2 ** min(attempt, 16))) * random.uniform(0.5, 1.0)
+                attempt += 1
+                if stop_event.wait(delay):
+                    break
+                _reconnect(client)
+                due = time.monotonic()
+                wall0 = time.time() - due
+                continue
+            attempt = 0
+
+            due += period
+            now = time.monotonic()
+            if now >= due:
+                # не уложились — пропускаем просроченные дедлайны, сохраняя сетку
+                due += (int((now - due) // period) + 1) * period
+    except KeyboardInterrupt:
+        pass
+    finally:
+        try:
+            client.close()
+        except Exception:
+            pass
+        del ring
+        shm.close()
+        print(f"[BusWorker {bus_id}] stopped")
@@ -1,9 +1,37 @@
 from typing import Literal, Dict, Any
-from pymodbus.client import ModbusSerialClient, ModbusTcpClient
+from pymodbus.client import (
+    ModbusSerialClient, ModbusTcpClient, ModbusUdpClient,
+    AsyncModbusSerialClient, AsyncModbusTcpClient, AsyncModbusUdpClient,
+)
 import serial
 import re
 
-ConnType = Literal["RTU", "TCP"]
+from .pipelined_tcp import PipelinedTcpClient
+from .lean_rtu import LeanRtuClient
+
+ConnType = Literal["RTU", "TCP", "RTU_OVER_TCP", "UDP"]
+# Сетевые типы: host/port вместо последовательного порта
+NETWORK_CONN_TYPES = ("TCP", "RTU_OVER_TCP", "UDP")
+
+
+def _rtu_framer():
+    """
+    RTU-фреймер для TCP-клиента pymodbus (кадры RTU с CRC внутри TCP-потока —
+    преобразователи интерфейсов «COM-порт по сети»). Имя зависит от версии:
+    3.7+ — FramerType.RTU, 3.6 — Framer.RTU, раньше — класс ModbusRtuFramer.
+    """
+    try:
+        from pymodbus import FramerType
+        return FramerType.RTU
+    except ImportError:
+        pass
+    try:
+        from pymodbus.framer import Framer
+        return Framer.RTU
+    except ImportError:
+        pass
+    from pymodbus.framer import ModbusRtuFramer
+    return ModbusRtuFramer
 
 def _normalize_serial_port(port: str) -> str:
     """
@@ -47,8 +75,9 @@ def _normalize_stopbits(value) -> float:
 
 def create_client(conn_type: ConnType, settings: Dict[str, Any]):
     """
-    settings RTU: {port, baudrate, parity, stopbits, unit_id, timeout?}
-    settings TCP: {host, port, unit_id, timeout?}
+    settings RTU: {port, baudrate, parity, stopbits, unit_id, timeout?, rtu_transport?}
+    settings TCP: {host, port, unit_id, timeout?, in_flight?}
+    settings RTU_OVER_TCP / UDP: {host, port, unit_id, timeout?}
 
     ВАЖНО: для pymodbus >= 3.x у ModbusSerialClient больше НЕТ параметра `method`.
     RTU-фреймер устанавливается по умолчанию.
@@ -61,6 +90,11 @@ def create_client(conn_type: ConnType, settings: Dict[str, Any]):
         parity = str(settings.get("parity", "N")).upper()[:1]  # 'N'/'E'/'O'
         stopbits = _normalize_stopbits(settings.get("stopbits", 1))
 
+        if str(settings.get("rtu_transport", "")).lower() == "lean":
+            # облегчённый транспорт без фреймера pymodbus (быстрые линии 115200+)
+            return LeanRtuClient(port=port, baudrate=baudrate, parity=parity, stopbits=stopbits,
+                                 bytesize=8, timeout=timeout)
+
         # В 3.x: НЕ передавать method="rtu"
         client = ModbusSerialClient(
             port=port,
@@ -69,24 +103,70 @@ def create_client(conn_type: ConnType, settings: Dict[str, Any]):
             stopbits=stopbits,        # pyserial STOPBITS_*
             bytesize=8,
             timeout=timeout,
+            # повторы — не здесь: pymodbus берёт retries только в конструкторе, а таймаут
+            # по RTT (TimeoutTuner) рассчитан на одну попытку
+            retries=0,
         )
-        # уменьшить внутренние повторные попытки (если поддерживается библиотекой)
-        try:
-            setattr(client, 'retries', 0)
-        except Exception:
-            pass
         try:
             setattr(client, 'retry_on_empty', False)
         except Exception:
             pass
         return client
 
-    # TCP
     host = settings["host"]
     port = int(settings.get("port", 502))
-    client = ModbusTcpClient(host=host, port=port, timeout=timeout)
+    if conn_type in ("RTU_OVER_TCP", "UDP"):
+        if conn_type == "UDP":
+            return ModbusUdpClient(host=host, port=port, timeout=timeout, retries=0)
+        return ModbusTcpClient(host=host, port=port, timeout=timeout, framer=_rtu_framer(), retries=0)
+
+    # TCP
+    in_flight = int(settings.get("in_flight", 1) or 1)
+    if in_flight > 1:
+        # конвейер: несколько запросов в полёте на одном сокете
+        return PipelinedTcpClient(host=host, port=port, timeout=timeout, max_in_flight=in_flight)
+    return ModbusTcpClient(host=host, port=port, timeout=timeout, retries=0)
+
+
+def create_async_client(conn_type: ConnType, settings: Dict[str, Any]):
+    """
+    То же, что create_client(), но AsyncModbus*Client — для AsyncSourceDriver / FleetPoller.
+    unit_id здесь не нужен: асинхронный драйвер передаёт адрес ведомого в каждом запросе.
+    """
+    timeout = float(settings.get("timeout", 1.0))
+
+    if conn_type == "RTU":
+        client = AsyncModbusSerialClient(
+            port=_normalize_serial_port(settings["port"]),
+            baudrate=int(settings.get("baudrate", 9600)),
+            parity=str(settings.get("parity", "N")).upper()[:1],
+            stopbits=_normalize_stopbits(settings.get("stopbits", 1)),
+            bytesize=8,
+            timeout=timeout,
+        )
+    elif conn_type == "UDP":
+        client = AsyncModbusUdpClient(
+            host=settings["host"],
+            port=int(settings.get("port", 502)),
+            timeout=timeout,
+        )
+    else:
+        extra = {"framer": _rtu_framer()} if conn_type == "RTU_OVER_TCP" else {}
+        client = AsyncModbusTcpClient(
+            host=settings["host"],
+            port=int(settings.get("port", 502)),
+            timeout=timeout,
+            **extra,
+        )
     try:
         setattr(client, 'retries', 0)
     except Exception:
         pass
     return client
+
+
+def endpoint_key(conn_type: ConnType, settings: Dict[str, Any]) -> tuple:
+    """Ключ физического канала: источники с одинаковым ключом делят один клиент."""
+    if conn_type == "RTU":
+        return ("RTU", _normalize_serial_port(settings["port"]))
+    return (conn_type, str(settings["host"]).strip().lower(), int(settings.get("port", 502)))
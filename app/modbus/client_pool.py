@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import socket
+import threading
+import time
+from typing import Optional, Dict, Any, List
+
+from .client_factory import create_client, endpoint_key
+
+# Сколько держать открытым сокет, которым никто не пользуется (быстрое переподключение)
+IDLE_EVICT_S = 60.0
+# Как часто фоновая проверка просматривает простаивающие клиенты
+HEALTH_CHECK_S = 10.0
+
+
+class _Entry:
+    __slots__ = ("key", "client", "lock", "refs", "idle_since")
+
+    def __init__(self, key: tuple, client):
+        self.key = key
+        self.client = client
+        # один запрос за раз на сокет — общий для всех драйверов этого клиента
+        self.lock = threading.RLock()
+        self.refs = 0
+        self.idle_since: Optional[float] = None
+
+
+class ClientPool:
+    """
+    Реестр Modbus TCP клиентов по адресу host:port. Источники за одним шлюзом (разные unit id)
+    получают один и тот же клиент с общим lock; release() не закрывает сокет сразу — он
+    остаётся «тёплым» IDLE_EVICT_S секунд, и повторное подключение обходится без рукопожатия.
+    Простаивающие клиенты с отвалившимся соединением выбрасываются фоновой проверкой.
+    """
+    def __init__(self, idle_evict_s: float = IDLE_EVICT_S, health_check_s: float = HEALTH_CHECK_S):
+        self.idle_evict_s = float(idle_evict_s)
+        self.health_check_s = float(health_check_s)
+        self._mx = threading.Lock()
+        self._entries: Dict[tuple, _Entry] = {}
+        self._by_client: Dict[int, _Entry] = {}
+        self._janitor: Optional[threading.Thread] = None
+        self._wake = threading.Event()
+
+    @staticmethod
+    def _key(settings: Dict[str, Any], conn_type: str = "TCP") -> tuple:
+        pipelined = conn_type == "TCP" and int(settings.get("in_flight", 1) or 1) > 1
+        return endpoint_key(conn_type, settings) + (pipelined,)
+
+    def acquire(self, settings: Dict[str, Any], conn_type: str = "TCP"):
+        """
+        Клиент для settings (host, port, timeout?, in_flight?) — общий или новый — и его lock.
+        conn_type — TCP, RTU_OVER_TCP или UDP (преобразователи интерфейсов часто принимают
+        только одно TCP-соединение — тем важнее делить его между приборами).
+        Возвращает (client, lock); соединение уже установлено. Ошибка — RuntimeError.
+        """
+        key = self._key(settings, conn_type)
+        with self._mx:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = _Entry(key, create_client(conn_type, settings))
+                self._entries[key] = entry
+                self._by_client[id(entry.client)] = entry
+            entry.refs += 1
+            entry.idle_since = None
+        # подключение — вне общего mutex: рукопожатие с одним шлюзом не держит остальные
+        with entry.lock:
+            ok = self._is_connected(entry.client) or self._reconnect(entry.client)
+        if not ok:
+            self.release(entry.client)
+            raise RuntimeError(f"Не удалось подключиться к {key[1]}:{key[2]}.")
+        return entry.client, entry.lock
+
+    def release(self, client):
+        """Вернуть клиент в пул. Последний отпустивший не закрывает сокет — его закроет вытеснение."""
+        with self._mx:
+            entry = self._by_client.get(id(client))
+            if entry is None:
+                return False
+            entry.refs = max(0, entry.refs - 1)
+            if entry.refs == 0:
+                entry.idle_since = time.monotonic()
+                self._ensure_janitor()
+        return True
+
+    def owns(self, client) -> bool:
+        with self._mx:
+            return id(client) in self._by_client
+
+    def stats(self) -> List[dict]:
+        now = time.monotonic()
+        with self._mx:
+            return [{
+                "conn_type": e.key[0],
+                "endpoint": f"{e.key[1]}:{e.key[2]}",
+                "pipelined": e.key[3],
+                "refs": e.refs,
+                "connected": self._is_connected(e.client),
+                "idle_s": round(now - e.idle_since, 1) if e.idle_since is not None else None,
+            } for e in self._entries.values()]
+
+    # ---------- проверка и вытеснение ----------
+    @staticmethod
+    def _is_connected(client) -> bool:
+        try:
+            return bool(getattr(client, "connected", False))
+        except Exception:
+            return False
+
+    @staticmethod
+    def _socket_alive(client) -> bool:
+        """Простаивающий сокет: пустое чтение без блокировки — удалённая сторона закрыла соединение."""
+        sock = getattr(client, "socket", None) or getattr(client, "_sock", None)
+        if not isinstance(sock, socket.socket):
+            return True
+        try:
+            return sock.recv(1, socket.MSG_PEEK | socket.MSG_DONTWAIT) != b""
+        except (BlockingIOError, InterruptedError):
+            return True
+        except (OSError, AttributeError, ValueError):
+            # MSG_DONTWAIT есть не везде (Windows) — тогда полагаемся на connected
+            return getattr(socket, "MSG_DONTWAIT", None) is None
+
+    @staticmethod
+    def _reconnect(client) -> bool:
+        try:
+            client.close()
+        except Exception:
+            pass
+        try:
+            return bool(client.connect())
+        except Exception:
+            return False
+
+    def maintain(self):
+        """Закрыть клиенты, простаивающие дольше idle_evict_s или потерявшие соединение."""
+        now = time.monotonic()
+        dead: List[_Entry] = []
+        with self._mx:
+            for key, e in list(self._entries.items()):
+                if e.refs > 0 or e.idle_since is None:
+                    continue
+                if (now - e.idle_since >= self.idle_evict_s or not self._is_connected(e.client)
+                        or not self._socket_alive(e.client)):
+                    del self._entries[key]
+                    self._by_client.pop(id(e.client), None)
+                    dead.append(e)
+        for e in dead:
+            print(f"[ClientPool] evict {e.key[1]}:{e.key[2]}")
+            with e.lock:
+                try:
+                    e.client.close()
+                except Exception:
+                    pass
+
+    def close_all(self):
+        with self._mx:
+            entries = list(self._entries.values())
+            self._entries.clear()
+            self._by_client.clear()
+        self._wake.set()
+        for e in entries:
+            try:
+                e.client.close()
+            except Exception:
+                pass
+
+    def _ensure_janitor(self):
+        # вызывается под self._mx
+        if self._janitor is not None and self._janitor.is_alive():
+            return
+        self._wake.clear()
+        self._janitor = threading.Thread(target=self._janitor_loop, name="modbus-client-pool", daemon=True)
+        self._janitor.start()
+
+    def _janitor_loop(self):
+        while not self._wake.wait(self.health_check_s):
+            self.maintain()
+            with self._mx:
+                if not any(e.refs == 0 for e in self._entries.values()):
+                    # простаивающих нет — поток не нужен до следующего release()
+                    self._janitor = None
+                    return
+
+
+# Общий пул процесса
+POOL = ClientPool()
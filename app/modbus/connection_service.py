@@ -1,83 +1,637 @@
 from __future__ import annotations
 
+import contextlib
+import heapq
+import itertools
+import math
+import random
+import threading
 import time
-from typing import Optional
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Optional, Callable, Any, List, Sequence
 from PySide6.QtCore import QObject, Signal, QThread, QMetaObject, Qt
-from app.modbus.driver import SourceDriver
+from app.modbus.driver import (
+    SourceDriver, BLOCK_FAST, BLOCK_COUNTERS, BLOCK_SETPOINTS, BLOCK_COILS, REPROBE_AFTER_MISSES,
+)
+
+# Приоритеты команд (меньше — важнее)
+PRIO_SAFETY = 0    # отключение питания и т.п. — всегда раньше опроса, без лимита
+PRIO_WRITE = 10    # уставки и команды оператора — раньше очередного опроса
+PRIO_READ = 20     # разовые чтения по запросу GUI
+
+_NOTHING = object()  # опрос группы прошёл, но публиковать ещё нечего
+
+# Сколько команд может ждать в очереди (кроме PRIO_SAFETY) — дальше submit отказывает
+MAX_PENDING = 32
+
+
+@dataclass(frozen=True)
+class PollGroup:
+    """
+    Группа опроса со своим периодом. blocks — имена из driver.POLL_BLOCKS;
+    пустой кортеж — полный снимок через driver.read_measurements().
+    """
+    name: str
+    interval_ms: int
+    blocks: tuple = ()
+
+
+# I/U часто, катушки и уставки — средне, А·ч и температуры — редко
+DEFAULT_POLL_GROUPS = (
+    PollGroup("fast", 100, (BLOCK_FAST,)),
+    PollGroup("control", 250, (BLOCK_COILS, BLOCK_SETPOINTS)),
+    PollGroup("slow", 2000, (BLOCK_COUNTERS,)),
+)
+
+
+class PollStats:
+    """
+    Статистика одной группы опроса (обновляется в потоке шины).
+    period — фактический интервал между стартами, lateness — опоздание старта от дедлайна.
+    """
+    def __init__(self, name: str, interval_s: float):
+        self.name = name
+        self.interval_s = interval_s
+        self.cycles = 0
+        self.overruns = 0      # циклов, когда опрос не уложился в период
+        self.skipped = 0       # пропущенных (не поставленных в очередь) дедлайнов
+        self.max_lateness = 0.0
+        self._last_start: Optional[float] = None
+        # Уэлфорд: среднее и дисперсия периода и опоздания
+        self._n_period = 0
+        self._mean_period = 0.0
+        self._m2_period = 0.0
+        self._mean_late = 0.0
+        self._m2_late = 0.0
+
+    def on_start(self, now: float, deadline: float):
+        late = max(0.0, now - deadline)
+        self.cycles += 1
+        d = late - self._mean_late
+        self._mean_late += d / self.cycles
+        self._m2_late += d * (late - self._mean_late)
+        self.max_lateness = max(self.max_lateness, late)
+        if self._last_start is not None:
+            period = now - self._last_start
+            self._n_period += 1
+            d = period - self._mean_period
+            self._mean_period += d / self._n_period
+            self._m2_period += d * (period - self._mean_period)
+        self._last_start = now
+
+    def on_overrun(self, skipped: int):
+        self.overruns += 1
+        self.skipped += skipped
+
+    def as_dict(self) -> dict:
+        n = self._n_period
+        return {
+            "group": self.name,
+            "interval_ms": round(self.interval_s * 1000.0, 1),
+            "cycles": self.cycles,
+            "period_ms": round(self._mean_period * 1000.0, 2) if n else None,
+            "jitter_ms": round(math.sqrt(self._m2_period / n) * 1000.0, 2) if n > 1 else None,
+            "lateness_ms": round(self._mean_late * 1000.0, 2),
+            "lateness_jitter_ms": round(math.sqrt(self._m2_late / self.cycles) * 1000.0, 2) if self.cycles > 1 else None,
+            "max_lateness_ms": round(self.max_lateness * 1000.0, 2),
+            "overruns": self.overruns,
+            "skipped": self.skipped,
+        }
+
+
+# Как часто поток шины публикует статистику опроса
+STATS_INTERVAL_S = 5.0
+
+# Состояния канала (поле "state" событий качества связи)
+LINK_OK = "ok"                      # опрос снова проходит после сбоев
+LINK_DEGRADED = "degraded"          # сбой цикла, бюджет ещё не исчерпан
+LINK_LOST = "lost"                  # бюджет исчерпан — начинаем переподключение
+LINK_RECONNECTING = "reconnecting"  # очередная попытка (attempt, delay_s)
+LINK_RESTORED = "restored"          # переподключились, опрос продолжается
+
+
+class _Command:
+    __slots__ = ("priority", "seq", "fn", "future")
+
+    def __init__(self, priority: int, seq: int, fn: Callable[[SourceDriver], Any], future: Future):
+        self.priority = priority
+        self.seq = seq
+        self.fn = fn
+        self.future = future
+
+    def __lt__(self, other: "_Command") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class _TokenBucket:
+    """Ограничение частоты команд: rate в секунду, burst — сколько можно подряд."""
+    def __init__(self, rate: float, burst: int):
+        self.rate = max(0.1, float(rate))
+        self.burst = max(1, int(burst))
+        self._tokens = float(self.burst)
+        self._stamp = time.monotonic()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+    def take(self, now: float) -> bool:
+        self._refill(now)
+        if self._tokens >= 1.0:
+            self._tokens -= 1.0
+            return True
+        return False
+
+    def wait_time(self, now: float) -> float:
+        self._refill(now)
+        return 0.0 if self._tokens >= 1.0 else (1.0 - self._tokens) / self.rate
+
+
+@dataclass(frozen=True)
+class AdaptivePolicy:
+    """
+    Адаптивный период опроса. Интервалы — для самой частой группы, остальные масштабируются
+    в той же пропорции (медленная группа остаётся во столько же раз медленнее).
+    Изменение I/U больше зоны нечувствительности, смена уставок, катушек или ошибок, а также
+    команда в очереди сразу возвращают период к floor_ms. Пока показания стоят на месте,
+    период растёт в backoff раз каждые settle_cycles циклов — до ceiling_ms.
+    Когда данные никто не видит (окно свёрнуто, UI заблокирован) — не чаще hidden_ms.
+    """
+    floor_ms: int = 100
+    ceiling_ms: int = 1000
+    hidden_ms: int = 2000
+    deadband_i: float = 0.2     # А
+    deadband_v: float = 0.2     # В
+    backoff: float = 1.5
+    settle_cycles: int = 3
+
+
+class _AdaptiveRate:
+    """Состояние адаптивного периода (меняется в потоке шины; visible — из GUI)."""
+    def __init__(self, policy: AdaptivePolicy, base_ms: float):
+        self.policy = policy
+        self.base_ms = max(1.0, float(base_ms))
+        self.floor_ms = max(10.0, float(policy.floor_ms))
+        self.ceiling_ms = max(self.floor_ms, float(policy.ceiling_ms))
+        self.interval_ms = self.floor_ms
+        self.visible = True
+        self.transients = 0
+        self._ref = None     # показания, от которых считается зона нечувствительности
+        self._stable = 0
+
+    @staticmethod
+    def _discrete(meas) -> tuple:
+        return (meas.current_i, meas.voltage_i, meas.revers, meas.errors_raw, meas.polarity,
+                meas.device_on, meas.inverter_on, meas.control_locked, meas.control_external)
+
+    def observe(self, meas) -> bool:
+        """Учесть новые показания. True — период уменьшился (дедлайны нужно подтянуть)."""
+        p = self.policy
+        ref = self._ref
+        moved = (ref is None or abs(meas.current - ref.current) > p.deadband_i
+                 or abs(meas.voltage - ref.voltage) > p.deadband_v
+                 or self._discrete(meas) != self._discrete(ref))
+        if moved:
+            self._ref = meas
+            self._stable = 0
+            return self.kick()
+        self._stable += 1
+        if self._stable >= max(1, p.settle_cycles):
+            self._stable = 0
+            self.interval_ms = min(self.ceiling_ms, self.interval_ms * max(1.0, p.backoff))
+        return False
+
+    def kick(self) -> bool:
+        """Переходный процесс (или команда) — сразу на floor_ms."""
+        faster = self.interval_ms > self.floor_ms
+        if faster:
+            self.transients += 1
+        self.interval_ms = self.floor_ms
+        self._stable = 0
+        return faster
+
+    def effective_ms(self) -> float:
+        if self.visible:
+            return self.interval_ms
+        return max(self.interval_ms, float(self.policy.hidden_ms))
+
+    def scale(self) -> float:
+        return self.effective_ms() / self.base_ms
+
+    def snapshot(self) -> dict:
+        return {
+            "interval_ms": round(self.effective_ms(), 1),
+            "visible": self.visible,
+            "transients": self.transients,
+        }
 
 
 class _PollerThread(QThread):
     """
-    Внутренний поток опроса Modbus. Завершается после первой ошибки.
+    Единственный поток, который ходит на шину: опрос групп + очередь команд.
+    Группы опроса чередуются по ближайшему сроку (EDF), каждая — со своим периодом.
+    Дедлайны идут с фиксированным шагом от старта (а не «период после конца чтения»),
+    опоздавшие циклы пропускаются, а не копятся.
+    Отсчёт публикует только самая частая группа, с меткой своего дедлайна: остальные лишь
+    обновляют образ регистров, иначе совпавшие дедлайны дали бы отсчёты с одинаковой меткой.
+    Команды PRIO_SAFETY выполняются сразу; остальные — раньше опроса, но с лимитом частоты
+    и не дольше, чем опрос опаздывает на целый период (иначе он «голодает»).
+    До max_failures неудачных циклов подряд терпим; дальше — переподключение на месте
+    (тот же драйвер со своей схемой адресации) с экспоненциальной задержкой и джиттером,
+    пока не получится или не вызовут stop().
+    С adaptive все периоды групп масштабируются по _AdaptiveRate (см. AdaptivePolicy).
     """
-    def __init__(self, driver: SourceDriver, interval_s: float = 0.5, max_failures: int = 1):
+    def __init__(self, driver: SourceDriver, interval_s: float = 0.5, max_failures: int = 3,
+                 cmd_rate: float = 10.0, cmd_burst: int = 4, groups: Optional[Sequence[PollGroup]] = None,
+                 reconnect_base_s: float = 0.5, reconnect_max_s: float = 30.0,
+                 adaptive: Optional[AdaptivePolicy] = None, visible: bool = True):
         super().__init__()
         self.driver = driver
         self.interval_s = float(interval_s)
-        self.max_failures = int(max_failures)
+        self.groups: List[PollGroup] = list(groups) if groups else [PollGroup("all", int(self.interval_s * 1000))]
+        self.max_failures = max(1, int(max_failures))
+        self.reconnect_base_s = max(0.05, float(reconnect_base_s))
+        self.reconnect_max_s = max(self.reconnect_base_s, float(reconnect_max_s))
         self._running = True
+        self._link_up = True
         self._measurements_cb = None
         self._error_cb = None
         self._crit_cb = None
+        self._stats_cb = None
+        self._link_cb = None
+        # качество связи
+        self._failures = 0          # неудачных циклов подряд
+        self.total_cycles = 0
+        self.total_failures = 0
+        self.reconnects = 0
+        self.last_error: Optional[str] = None
+        self.stats = [PollStats(g.name, g.interval_ms / 1000.0) for g in self.groups]
+        # группа, по сетке которой публикуются отсчёты (самая частая; при равенстве — первая)
+        self._publish_gi = min(range(len(self.groups)), key=lambda k: self.groups[k].interval_ms)
+        self.rate: Optional[_AdaptiveRate] = None
+        if adaptive is not None:
+            self.rate = _AdaptiveRate(adaptive, min(g.interval_ms for g in self.groups))
+            self.rate.visible = bool(visible)
+        self._rate_faster = False   # период уменьшился — дедлайны остальных групп подтянуть
+
+        self._cv = threading.Condition()
+        self._heap: List[_Command] = []
+        self._seq = itertools.count()
+        self._bucket = _TokenBucket(cmd_rate, cmd_burst)
+
+    # ---------- очередь команд ----------
+    def submit(self, fn: Callable[[SourceDriver], Any], priority: int = PRIO_WRITE) -> Future:
+        """Поставить fn(driver) в очередь. Результат/исключение — через Future."""
+        fut: Future = Future()
+        with self._cv:
+            if not self._running:
+                fut.set_exception(RuntimeError("Опрос остановлен — команда не отправлена"))
+                return fut
+            if not self._link_up:
+                fut.set_exception(RuntimeError("Нет связи с устройством — идёт переподключение"))
+                return fut
+            if priority > PRIO_SAFETY and len(self._heap) >= MAX_PENDING:
+                fut.set_exception(RuntimeError("Очередь команд переполнена — шина не успевает"))
+                return fut
+            heapq.heappush(self._heap, _Command(priority, next(self._seq), fn, fut))
+            if self.rate is not None and self.rate.kick():
+                # оператор что-то меняет — следим за откликом с максимальной частотой
+                self._rate_faster = True
+            self._cv.notify()
+        return fut
 
+    def set_visible(self, visible: bool):
+        """Видит ли кто-нибудь данные (GUI-поток). Без adaptive — ничего не меняет."""
+        if self.rate is None or self.rate.visible == bool(visible):
+            return
+        with self._cv:
+            self.rate.visible = bool(visible)
+            self._rate_faster = bool(visible)
+            self._cv.notify()
+        print(f"[Poller] data {'visible' if visible else 'hidden'}: interval {self.rate.effective_ms():.0f} ms")
+
+    def _period(self, group: PollGroup) -> float:
+        period = group.interval_ms / 1000.0
+        return period * self.rate.scale() if self.rate is not None else period
+
+    def _take_command(self, now: float, poll_starved: bool) -> Optional[_Command]:
+        with self._cv:
+            if not self._heap:
+                return None
+            top = self._heap[0]
+            if top.priority > PRIO_SAFETY:
+                if poll_starved or not self._bucket.take(now):
+                    return None
+            return heapq.heappop(self._heap)
+
+    def _command_wait(self, now: float) -> Optional[float]:
+        """Через сколько можно будет выполнить голову очереди (None — очередь пуста)."""
+        with self._cv:
+            if not self._heap:
+                return None
+            if self._heap[0].priority <= PRIO_SAFETY:
+                return 0.0
+        return self._bucket.wait_time(now)
+
+    def _execute(self, cmd: _Command):
+        if not cmd.future.set_running_or_notify_cancel():
+            return
+        try:
+            cmd.future.set_result(cmd.fn(self.driver))
+        except Exception as e:
+            cmd.future.set_exception(e)
+
+    def _fail_pending(self, reason: str):
+        with self._cv:
+            pending, self._heap = self._heap, []
+        for cmd in pending:
+            if cmd.future.set_running_or_notify_cancel():
+                cmd.future.set_exception(RuntimeError(reason))
+
+    # ---------- цикл ----------
     def run(self):
         print("[Poller] started")  # отладка: гарантирует, что run() запущен
+        start = time.monotonic()
+        # монотонное время дедлайна -> настенное время метки отсчёта
+        wall0 = time.time() - start
+        due = [start] * len(self.groups)
+        next_stats = start + STATS_INTERVAL_S
         while self._running:
+            now = time.monotonic()
+            if self._rate_faster:
+                # период сократился — дальние дедлайны подтягиваем, ближние не трогаем
+                self._rate_faster = False
+                due = [min(d, now + self._period(g)) for d, g in zip(due, self.groups)]
+            # ближайшая по сроку группа (при равенстве — первая в списке, т.е. самая частая)
+            gi = min(range(len(self.groups)), key=lambda k: due[k])
+            group = self.groups[gi]
+            period = self._period(group)
+            poll_due = now >= due[gi]
+            # опрос опоздал на целый период — сначала он, потом команды (кроме SAFETY)
+            poll_starved = poll_due and (now - due[gi]) >= period
+
+            cmd = self._take_command(now, poll_starved)
+            if cmd is not None:
+                self._execute(cmd)
+                continue
+
+            if poll_due:
+                self.stats[gi].on_start(now, due[gi])
+                ok = self._poll(group, timestamp=wall0 + due[gi], publish=gi == self._publish_gi)
+                if not ok and self._failures >= self.max_failures:
+                    if not self._reconnect():
+                        break
+                    # сетку дедлайнов начинаем заново — пропущенное за время обрыва не догоняем
+                    start = time.monotonic()
+                    wall0 = time.time() - start
+                    due = [start] * len(self.groups)
+                    continue
+                # адаптивный период мог измениться по итогам этого опроса
+                period = self._period(group)
+                self.stats[gi].interval_s = period
+                due[gi] += period
+                after = time.monotonic()
+                if after >= due[gi]:
+                    # не уложились: пропускаем просроченные дедлайны, сохраняя сетку
+                    skipped = int((after - due[gi]) // period) + 1
+                    due[gi] += skipped * period
+                    self.stats[gi].on_overrun(skipped)
+                if after >= next_stats:
+                    next_stats = after + STATS_INTERVAL_S
+                    self._publish_stats()
+                continue
+
+            timeout = due[gi] - now
+            cmd_wait = self._command_wait(now)
+            if cmd_wait is not None:
+                timeout = min(timeout, cmd_wait)
+            with self._cv:
+                if self._running:
+                    self._cv.wait(max(0.0, timeout))
+
+        self._fail_pending("Опрос остановлен — команда не выполнена")
+        print("[Poller] stopped")  # отладка
+
+    def _read_group(self, group: PollGroup):
+        if not group.blocks:
+            return self.driver.read_measurements()
+        # с конвейерным TCP-клиентом блоки группы уходят одной пачкой
+        failed = self.driver.read_blocks(group.blocks)
+        if failed:
+            raise RuntimeError(f"No data received from device (block '{failed[0]}')")
+        # пока не прочитаны все обязательные блоки (первый проход) — публиковать нечего
+        return self.driver.measurements_from_image() or _NOTHING
+
+    def _publish_stats(self):
+        if callable(self._stats_cb):
             try:
-                meas = self.driver.read_measurements()
-                if meas is not None:
-                    if callable(self._measurements_cb):
-                        try:
-                            self._measurements_cb(meas)
-                        except Exception:
-                            pass
-                else:
-                    raise RuntimeError("No data received from device")
+                self._stats_cb(self.stats_snapshot())
+            except Exception:
+                pass
 
-            except Exception as e:
-                # ⚠️ первая ошибка — немедленно выходим
-                print(f"[Poller] critical: {e}")
-                if callable(self._error_cb):
-                    try:
-                        self._error_cb(str(e))
-                    except Exception:
-                        pass
+    def stats_snapshot(self) -> List[dict]:
+        return [st.as_dict() for st in self.stats]
 
-                if callable(self._crit_cb):
+    def _poll(self, group: PollGroup, timestamp: Optional[float] = None, publish: bool = True) -> bool:
+        try:
+            meas = self._read_group(group)
+            if meas is _NOTHING or (meas is not None and not publish):
+                # образ обновлён; отсчёт уйдёт со следующим опросом публикующей группы
+                self._on_poll_ok()
+                return True
+            if meas is not None:
+                # метка — дедлайн цикла: ряды в логе равномерны, даже если шина «дрожит»
+                if timestamp is not None:
+                    meas.timestamp = timestamp
+                if self.rate is not None and self.rate.observe(meas):
+                    self._rate_faster = True
+                if callable(self._measurements_cb):
                     try:
-                        self._crit_cb(f"No response received: {e}")
+                        self._measurements_cb(meas)
                     except Exception:
                         pass
+            else:
+                raise RuntimeError("No data received from device")
+            self._on_poll_ok()
+            return True
 
-                # Закрываем клиент, чтобы Modbus не завис
-                try:
-                    if hasattr(self.driver, "client") and self.driver.client:
-                        self.driver.client.close()
-                except Exception:
-                    pass
+        except Exception as e:
+            self._on_poll_failed(e)
+            return False
 
-                self._running = False
-                break
+    def _on_poll_ok(self):
+        self.total_cycles += 1
+        if self._failures:
+            self._failures = 0
+            self._link_event(LINK_OK)
 
-            time.sleep(self.interval_s)
+    def _on_poll_failed(self, e: Exception):
+        self.total_cycles += 1
+        self.total_failures += 1
+        self._failures += 1
+        self.last_error = str(e)
+        if self._failures == REPROBE_AFTER_MISSES and self._failures < self.max_failures:
+            # до переподключения (там перебор делает ping()) — один раз за серию сбоев
+            self._reprobe()
+        if self._failures < self.max_failures:
+            # одиночный битый кадр — не повод рвать сессию
+            print(f"[Poller] cycle failed ({self._failures}/{self.max_failures}): {e}")
+            self._link_event(LINK_DEGRADED)
+            return
 
-        print("[Poller] stopped")  # отладка
+        print(f"[Poller] critical: {e}")
+        self._link_event(LINK_LOST)
+        if callable(self._error_cb):
+            try:
+                self._error_cb(str(e))
+            except Exception:
+                pass
+
+        if callable(self._crit_cb):
+            try:
+                self._crit_cb(f"No response received: {e}")
+            except Exception:
+                pass
+
+    def _reprobe(self):
+        try:
+            if self.driver.reprobe():
+                print(f"[Poller] addressing re-probed: {self.driver.addressing}")
+        except Exception:
+            pass
+
+    # ---------- переподключение ----------
+    def _backoff(self, attempt: int) -> float:
+        """Экспоненциальная задержка с джиттером (половина — случайная), чтобы не долбить шину синхронно."""
+        delay = min(self.reconnect_max_s, self.reconnect_base_s * (2 ** min(attempt, 16)))
+        return delay * random.uniform(0.5, 1.0)
+
+    def _reconnect(self) -> bool:
+        """
+        Переоткрыть клиент и проверить устройство. Драйвер не пересоздаётся — схема адресации
+        остаётся известной, и ping() обходится одной транзакцией.
+        Возвращает False, только если поток останавливают.
+        """
+        with self._cv:
+            self._link_up = False
+        self._fail_pending("Нет связи с устройством — идёт переподключение")
+        attempt = 0
+        while self._running:
+            delay = self._backoff(attempt)
+            attempt += 1
+            self._link_event(LINK_RECONNECTING, attempt=attempt, delay_s=round(delay, 2))
+            deadline = time.monotonic() + delay
+            with self._cv:
+                while self._running:
+                    left = deadline - time.monotonic()
+                    if left <= 0:
+                        break
+                    self._cv.wait(left)
+            if not self._running:
+                return False
+
+            client = getattr(self.driver, "client", None)
+            try:
+                if client is not None:
+                    # клиент может быть общим (ClientPool) — переоткрываем под его lock
+                    with getattr(self.driver, "lock", contextlib.nullcontext()):
+                        try:
+                            client.close()
+                        except Exception:
+                            pass
+                        if not client.connect():
+                            raise RuntimeError("не удалось открыть соединение")
+                if not self.driver.ping():
+                    raise RuntimeError("устройство не отвечает")
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"[Poller] reconnect attempt {attempt} failed: {e}")
+                continue
+
+            self.reconnects += 1
+            self._failures = 0
+            with self._cv:
+                self._link_up = True
+            print(f"[Poller] reconnected after {attempt} attempt(s)")
+            self._link_event(LINK_RESTORED, attempt=attempt)
+            return True
+        return False
+
+    def link_snapshot(self) -> dict:
+        return {
+            "failures": self._failures,
+            "max_failures": self.max_failures,
+            "total_cycles": self.total_cycles,
+            "total_failures": self.total_failures,
+            "reconnects": self.reconnects,
+            "last_error": self.last_error,
+        }
+
+    def _link_event(self, state: str, **extra):
+        if not callable(self._link_cb):
+            return
+        info = self.link_snapshot()
+        info["state"] = state
+        info.update(extra)
+        try:
+            self._link_cb(info)
+        except Exception:
+            pass
 
     def stop(self):
-        self._running = False
+        with self._cv:
+            self._running = False
+            self._cv.notify_all()
         self.wait(500)  # подождём завершения
 
 
 class ConnectionService(QObject):
     measurements = Signal(object)
     error = Signal(str)
+    pollStats = Signal(object)   # list[dict] — PollStats.as_dict() по группам, раз в STATS_INTERVAL_S
+    linkChanged = Signal(object)  # dict: state (LINK_*), failures, reconnects, last_error, ...
 
-    def __init__(self, driver: SourceDriver, interval_ms: int = 500, parent: Optional[QObject] = None):
+    def __init__(self, driver: SourceDriver, interval_ms: int = 500, parent: Optional[QObject] = None,
+                 cmd_rate: float = 10.0, cmd_burst: int = 4, poll_groups: Optional[Sequence[PollGroup]] = None,
+                 max_failures: int = 3, reconnect_base_s: float = 0.5, reconnect_max_s: float = 30.0,
+                 adaptive: Optional[AdaptivePolicy] = None):
+        """
+        poll_groups — многоскоростной опрос (см. DEFAULT_POLL_GROUPS); без них — один полный
+        снимок каждые interval_ms.
+        max_failures — сколько неудачных циклов подряд терпим до переподключения;
+        reconnect_base_s/reconnect_max_s — границы экспоненциальной задержки между попытками.
+        adaptive — адаптивный период опроса (AdaptivePolicy); None — фиксированные периоды.
+        """
         super().__init__(parent)
         self.driver = driver
         self.interval_ms = max(10, int(interval_ms))
+        self.poll_groups = [g for g in (poll_groups or ()) if g.interval_ms >= 10]
+        self.cmd_rate = float(cmd_rate)
+        self.cmd_burst = int(cmd_burst)
+        self.max_failures = max(1, int(max_failures))
+        self.reconnect_base_s = float(reconnect_base_s)
+        self.reconnect_max_s = float(reconnect_max_s)
+        self.adaptive = adaptive
+        self._visible = True
         self._thread: Optional[_PollerThread] = None
         self._started = False  # ⚠️ предотвращает повторный запуск
+        self._listeners: List[Callable[[Any], None]] = []
+
+    def add_listener(self, fn: Callable[[Any], None]):
+        """
+        fn(meas) вызывается прямо в потоке шины, до сигнала measurements.
+        Для потребителей, которым важен порядок относительно команд (тени уставок и т.п.).
+        """
+        self._listeners.append(fn)
+
+    def _publish(self, meas):
+        for fn in list(self._listeners):
+            try:
+                fn(meas)
+            except Exception as e:
+                print(f"[Service] listener failed: {e}")
+        self.measurements.emit(meas)
 
     def start(self):
         """Запускает поток опроса (если он ещё не работает)."""
@@ -86,9 +640,17 @@ class ConnectionService(QObject):
             return
 
         print("[Service] Starting polling thread...")
-        self._thread = _PollerThread(self.driver, interval_s=self.interval_ms / 1000.0, max_failures=1)
-        self._thread._measurements_cb = lambda m: self.measurements.emit(m)
+        self._thread = _PollerThread(self.driver, interval_s=self.interval_ms / 1000.0,
+                                     max_failures=self.max_failures,
+                                     cmd_rate=self.cmd_rate, cmd_burst=self.cmd_burst,
+                                     groups=self.poll_groups,
+                                     reconnect_base_s=self.reconnect_base_s,
+                                     reconnect_max_s=self.reconnect_max_s,
+                                     adaptive=self.adaptive, visible=self._visible)
+        self._thread._measurements_cb = self._publish
         self._thread._error_cb = lambda e: self.error.emit(e)
+        self._thread._stats_cb = self._on_stats
+        self._thread._link_cb = lambda info: self.linkChanged.emit(info)
 
         def _crit(e: str):
             try:
@@ -112,6 +674,48 @@ class ConnectionService(QObject):
         self._thread.start()
         self._started = True
 
+    def _on_stats(self, stats: List[dict]):
+        for st in stats:
+            if st["overruns"]:
+                print(f"[Service] group '{st['group']}' overruns: {st['overruns']} (skipped {st['skipped']}), "
+                      f"period {st['period_ms']} ms, jitter {st['jitter_ms']} ms")
+        self.pollStats.emit(stats)
+
+    def set_visible(self, visible: bool):
+        """Окно свёрнуто / UI заблокирован — данные никто не видит, опрос можно замедлить."""
+        self._visible = bool(visible)
+        if self._thread:
+            self._thread.set_visible(self._visible)
+
+    def poll_rate(self) -> dict:
+        """Текущий адаптивный период (пусто, если adaptive не задан)."""
+        if not self._thread or self._thread.rate is None:
+            return {}
+        return self._thread.rate.snapshot()
+
+    def link_quality(self) -> dict:
+        """Счётчики сбоев/переподключений (на момент вызова)."""
+        if not self._thread:
+            return {}
+        return self._thread.link_snapshot()
+
+    def poll_stats(self) -> List[dict]:
+        """Период, джиттер и перегрузки по группам опроса (на момент вызова)."""
+        if not self._thread:
+            return []
+        return self._thread.stats_snapshot()
+
+    def submit(self, fn: Callable[[SourceDriver], Any], priority: int = PRIO_WRITE) -> Future:
+        """
+        Выполнить fn(driver) в потоке шины. Все обращения к клиенту Modbus после start()
+        должны идти только сюда — иначе кадры GUI-потока и опроса перемешиваются.
+        """
+        if not self._thread or not self._thread.isRunning():
+            fut: Future = Future()
+            fut.set_exception(RuntimeError("Нет активного подключения к устройству"))
+            return fut
+        return self._thread.submit(fn, priority)
+
     def stop(self):
         """Останавливает поток опроса."""
         if not self._thread:
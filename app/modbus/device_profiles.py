@@ -0,0 +1,350 @@
+"""
+Профили моделей приборов: карта регистров как данные (адрес, тип, масштаб, знак,
+порядок слов, битовые поля), компилируемая один раз в план чтения и декодер.
+Новая модель — новый профиль (словарь или JSON-файл в DEVICE_PROFILES_DIR), без кода драйвера.
+Адреса — 1-based, как в документации (30002, 40003, 00001).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import struct
+import threading
+from dataclasses import dataclass, fields as dc_fields
+from typing import Optional, Dict, List, Tuple, Any
+
+from .registry import Coils, InputRegs, HoldingRegs, ErrorBits, Measurements
+
+TABLES = ("input", "holding", "coils")
+_TABLE_BASE = {"input": 30001, "holding": 40001, "coils": 1}
+# Наибольшее окно одного чтения: FC03/FC04 — 125 регистров, FC01 — 2000 катушек
+_MAX_WINDOW = {"input": 125, "holding": 125, "coils": 2000}
+# Блоки многоскоростного опроса (имена — как driver.BLOCK_*, по ним настроены группы опроса)
+BLOCKS = ("fast", "counters", "setpoints", "coils")
+_DEFAULT_BLOCK = {"input": "fast", "holding": "setpoints", "coils": "coils"}
+
+# тип -> (формат struct, число регистров)
+FIELD_TYPES = {
+    "u16": ("H", 1),
+    "s16": ("h", 1),
+    "u32": ("I", 2),
+    "s32": ("i", 2),
+    "f32": ("f", 2),
+    "bit": ("", 0),     # только для катушек
+}
+WORD_ORDERS = ("big", "little")   # big — старшее слово первым (ABCD), little — младшее (CDAB)
+
+# Поля Measurements, которые всегда float (как делал ручной декод)
+_FLOAT_FIELDS = frozenset(("current", "voltage", "current_i", "voltage_i", "temp1", "temp2"))
+# Значения обязательных полей Measurements, которых нет в профиле
+_MISSING = {
+    "current": 0.0, "voltage": 0.0, "current_i": 0.0, "voltage_i": 0.0,
+    "polarity": 0, "ah_counter": 0, "temp1": None, "temp2": None,
+    "errors_raw": 0, "error_overheat": False, "error_mains": False,
+}
+_MEAS_FIELDS = frozenset(f.name for f in dc_fields(Measurements)) - {"timestamp"}
+
+DEFAULT_MODEL = "rectifier"
+
+
+@dataclass(frozen=True)
+class FieldSpec:
+    name: str                       # поле Measurements
+    table: str                      # input | holding | coils
+    address: int                    # 1-based адрес из документации
+    type: str = "u16"
+    scale: float = 1.0
+    word_order: str = "big"
+    block: str = ""                 # блок многоскоростного опроса; пусто — по таблице
+    optional: bool = False          # поштучный fallback: не прочиталось — None, а не отказ снимка
+    bits: Tuple[Tuple[str, int], ...] = ()   # битовые поля: (поле Measurements, номер бита)
+
+    @property
+    def width(self) -> int:
+        return FIELD_TYPES[self.type][1]
+
+    @property
+    def offset(self) -> int:
+        """0-based смещение внутри таблицы."""
+        return self.address - _TABLE_BASE[self.table]
+
+
+@dataclass(frozen=True)
+class DeviceProfile:
+    name: str
+    title: str = ""
+    fields: Tuple[FieldSpec, ...] = ()
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "DeviceProfile":
+        """Профиль из словаря (формат JSON-файла); ValueError — при ошибке в описании."""
+        try:
+            name = str(data["name"]).strip()
+            specs = []
+            for f in data.get("fields", ()):
+                bits = f.get("bits") or {}
+                specs.append(FieldSpec(
+                    name=str(f["name"]),
+                    table=str(f.get("table", "input")),
+                    address=int(f["address"]),
+                    type=str(f.get("type", "bit" if f.get("table") == "coils" else "u16")),
+                    scale=float(f.get("scale", 1.0)),
+                    word_order=str(f.get("word_order", "big")),
+                    block=str(f.get("block", "")),
+                    optional=bool(f.get("optional", False)),
+                    bits=tuple((str(k), int(v)) for k, v in dict(bits).items()),
+                ))
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"некорректное описание профиля: {e}") from None
+        if not name:
+            raise ValueError("у профиля нет имени")
+        return cls(name=name, title=str(data.get("title", name)), fields=tuple(specs))
+
+
+def _build_decoder(name: str, specs: List[FieldSpec], windows: Dict[str, Tuple[int, int]],
+                   missing: Dict[str, Any]):
+    """
+    Декодер окон input/holding — одна функция без ветвлений, сгенерированная при компиляции
+    (как это делает namedtuple): слова окон в порядке полей (32-битные CDAB разворачиваются
+    в ABCD), один struct.pack в байты и один unpack всех полей сразу, масштаб — константой.
+    Имена полей проверены _validate (только поля Measurements), поэтому в код попадают безопасно.
+    """
+    words: List[str] = []
+    fmt = []
+    for s in specs:
+        var = "inp" if s.table == "input" else "hold"
+        o = s.address - windows[s.table][0]
+        order = range(o + s.width - 1, o - 1, -1) if s.word_order == "little" else range(o, o + s.width)
+        words.extend(f"{var}[{k}]" for k in order)
+        fmt.append(FIELD_TYPES[s.type][0])
+    args = []
+    for i, s in enumerate(specs):
+        expr = f"v[{i}]"
+        # масштаб (и приведение к float) — только там, где он нужен
+        if s.scale != 1.0 or s.type == "f32" or s.name in _FLOAT_FIELDS:
+            expr = f"{expr} * {float(s.scale)!r}"
+        args.append(f"{s.name}={expr}")
+        args.extend(f"{bit_name}=bool(v[{i}] >> {bit} & 1)" for bit_name, bit in s.bits)
+    args.extend(f"{k}={v!r}" for k, v in missing.items())
+    ns = {
+        "_pack": struct.Struct(f">{len(words)}H").pack,
+        "_unpack": struct.Struct(">" + "".join(fmt)).unpack,
+        "_M": Measurements,
+    }
+    src = (f"def decode(inp, hold):\n"
+           f"    v = _unpack(_pack({', '.join(words)}))\n"
+           f"    return _M({', '.join(args)})\n")
+    if not specs:
+        src = f"def decode(inp, hold):\n    return _M({', '.join(args)})\n"
+    exec(compile(src, f"<device profile {name}>", "exec"), ns)
+    return ns["decode"]
+
+
+class CompiledProfile:
+    """
+    Результат компиляции профиля:
+      windows — окно снимка по таблице: table -> (первый 1-based адрес, количество);
+      blocks  — блоки многоскоростного опроса: имя -> (table, первый адрес, количество),
+                как driver.POLL_BLOCKS;
+      decode(inp, hold) -> Measurements — одна сгенерированная функция; apply_coils(meas, bits).
+    Не меняется после компиляции — один экземпляр на модель, общий для всех драйверов.
+    """
+    def __init__(self, profile: DeviceProfile):
+        self.profile = profile
+        self.name = profile.name
+        self.windows: Dict[str, Tuple[int, int]] = {}
+        self.blocks: Dict[str, Tuple[str, int, int]] = {}
+        self._validate(profile)
+
+        by_table: Dict[str, List[FieldSpec]] = {t: [] for t in TABLES}
+        by_block: Dict[str, List[FieldSpec]] = {}
+        for s in profile.fields:
+            by_table[s.table].append(s)
+            by_block.setdefault(s.block or _DEFAULT_BLOCK[s.table], []).append(s)
+
+        for table, specs in by_table.items():
+            if not specs:
+                continue
+            lo = min(s.address for s in specs)
+            hi = max(s.address + max(1, s.width) for s in specs)
+            if hi - lo > _MAX_WINDOW[table]:
+                raise ValueError(f"{profile.name}: окно {table} {lo}..{hi - 1} длиннее {_MAX_WINDOW[table]}")
+            self.windows[table] = (lo, hi - lo)
+        for block, specs in by_block.items():
+            tables = {s.table for s in specs}
+            if len(tables) != 1:
+                raise ValueError(f"{profile.name}: блок '{block}' смешивает таблицы {sorted(tables)}")
+            lo = min(s.address for s in specs)
+            hi = max(s.address + max(1, s.width) for s in specs)
+            self.blocks[block] = (tables.pop(), lo, hi - lo)
+
+        declared = {s.name for s in profile.fields} | {b[0] for s in profile.fields for b in s.bits}
+        missing = {k: v for k, v in _MISSING.items() if k not in declared}
+        self.decode = _build_decoder(profile.name, by_table["input"] + by_table["holding"],
+                                     self.windows, missing)
+        coil_start = self.windows.get("coils", (0, 0))[0]
+        self._coils = tuple((s.name, s.address - coil_start) for s in by_table["coils"])
+        self._specs = profile.fields
+
+    @staticmethod
+    def _validate(profile: DeviceProfile):
+        seen = set()
+        for s in profile.fields:
+            if s.table not in TABLES:
+                raise ValueError(f"{profile.name}.{s.name}: неизвестная таблица '{s.table}'")
+            if s.type not in FIELD_TYPES or (s.type == "bit") != (s.table == "coils"):
+                raise ValueError(f"{profile.name}.{s.name}: тип '{s.type}' не подходит для таблицы {s.table}")
+            if s.word_order not in WORD_ORDERS:
+                raise ValueError(f"{profile.name}.{s.name}: порядок слов '{s.word_order}'")
+            if s.table == "coils" and s.block not in ("", "coils"):
+                raise ValueError(f"{profile.name}.{s.name}: катушки читаются только блоком 'coils'")
+            if s.block and s.block not in BLOCKS:
+                raise ValueError(f"{profile.name}.{s.name}: блок '{s.block}' — не из {BLOCKS}")
+            if s.offset < 0:
+                raise ValueError(f"{profile.name}.{s.name}: адрес {s.address} вне таблицы {s.table}")
+            for name in (s.name,) + tuple(b[0] for b in s.bits):
+                if name not in _MEAS_FIELDS:
+                    raise ValueError(f"{profile.name}: '{name}' — не поле Measurements")
+                if name in seen:
+                    raise ValueError(f"{profile.name}: поле '{name}' описано дважды")
+                seen.add(name)
+
+    # ---------- окна и блоки ----------
+    def split(self, table: str, window: List) -> Dict[str, List]:
+        """Окно снимка -> образы блоков этой таблицы (для многоскоростного опроса)."""
+        start = self.windows[table][0]
+        return {name: list(window[a - start:a - start + n])
+                for name, (t, a, n) in self.blocks.items() if t == table}
+
+    def compose(self, table: str, image: Dict[str, List]) -> Optional[List[int]]:
+        """Окно таблицы из образов её блоков; None — какой-то блок ещё не прочитан."""
+        if table not in self.windows:
+            return []
+        start, count = self.windows[table]
+        window = [0] * count
+        for name, (t, a, n) in self.blocks.items():
+            if t != table:
+                continue
+            regs = image.get(name)
+            if regs is None:
+                return None
+            window[a - start:a - start + n] = regs[:n]
+        return window
+
+    # ---------- декод ----------
+    # decode(inp, hold) -> Measurements: inp, hold — окна windows["input"] / windows["holding"]
+    # (пустые, если таблицы нет); функция генерируется в __init__ (_build_decoder)
+
+    def apply_coils(self, meas: Measurements, bits: Optional[List[bool]]):
+        # катушки не обязательны для валидного снимка — при ошибке поля остаются None
+        if not bits:
+            return
+        for name, i in self._coils:
+            setattr(meas, name, bool(bits[i]))
+
+    def fields_of(self, table: str) -> List[FieldSpec]:
+        return [s for s in self._specs if s.table == table]
+
+
+# ---------- встроенные профили ----------
+# Базовый выпрямитель — те же адреса, что в registry (по ним же идёт запись уставок и катушек)
+RECTIFIER = {
+    "name": DEFAULT_MODEL,
+    "title": "Выпрямитель (базовая модель)",
+    "fields": [
+        {"name": "errors_raw", "address": InputRegs.ERROR_FLAGS, "block": "fast",
+         "bits": {"error_overheat": ErrorBits.OVERHEAT, "error_mains": ErrorBits.MAINS_MONITOR}},
+        {"name": "current", "address": InputRegs.OUTPUT_CURRENT, "type": "s16", "scale": 0.1, "block": "fast"},
+        {"name": "voltage", "address": InputRegs.OUTPUT_VOLTAGE, "type": "s16", "scale": 0.1, "block": "fast"},
+        {"name": "polarity", "address": InputRegs.POLARITY, "block": "fast"},
+        {"name": "ah_counter", "address": InputRegs.AH_COUNTER_LO, "type": "u32", "word_order": "little",
+         "block": "counters"},
+        {"name": "temp1", "address": InputRegs.TEMP1, "block": "counters", "optional": True},
+        {"name": "temp2", "address": InputRegs.TEMP2, "block": "counters", "optional": True},
+        {"name": "current_i", "table": "holding", "address": HoldingRegs.CURRENT_SETPOINT},
+        {"name": "voltage_i", "table": "holding", "address": HoldingRegs.VOLTAGE_SETPOINT},
+        {"name": "revers", "table": "holding", "address": HoldingRegs.REVERS, "optional": True},
+        {"name": "device_on", "table": "coils", "address": Coils.ENABLE_DEVICE},
+        {"name": "inverter_on", "table": "coils", "address": Coils.INVERTER_ENABLE},
+        {"name": "control_locked", "table": "coils", "address": Coils.CONTROL_MODE_LOCK},
+        {"name": "control_external", "table": "coils", "address": Coils.CONTROL_MODE_INFO},
+    ],
+}
+
+_mx = threading.Lock()
+_profiles: Dict[str, DeviceProfile] = {}
+_compiled: Dict[str, CompiledProfile] = {}
+_dir_loaded = False
+
+
+def register_profile(profile) -> CompiledProfile:
+    """Зарегистрировать профиль (DeviceProfile или словарь) и сразу скомпилировать его."""
+    if isinstance(profile, dict):
+        profile = DeviceProfile.from_dict(profile)
+    compiled = CompiledProfile(profile)
+    with _mx:
+        _profiles[profile.name] = profile
+        _compiled[profile.name] = compiled
+    return compiled
+
+
+def load_profiles(directory: str) -> List[str]:
+    """*.json из каталога — по профилю на файл. Ошибочные пропускаются с сообщением."""
+    names = []
+    try:
+        entries = sorted(os.listdir(directory))
+    except OSError:
+        return names
+    for fn in entries:
+        if not fn.lower().endswith(".json"):
+            continue
+        path = os.path.join(directory, fn)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                names.append(register_profile(json.load(f)).name)
+        except (OSError, ValueError) as e:
+            print(f"[DeviceProfiles] {path}: {e}")
+    return names
+
+
+def _ensure_loaded():
+    global _dir_loaded
+    if _dir_loaded:
+        return
+    _dir_loaded = True
+    try:
+        from resources import DEVICE_PROFILES_DIR
+    except ImportError:
+        return
+    loaded = load_profiles(DEVICE_PROFILES_DIR)
+    if loaded:
+        print(f"[DeviceProfiles] loaded: {loaded}")
+
+
+def profile_names() -> List[str]:
+    _ensure_loaded()
+    with _mx:
+        return list(_profiles)
+
+
+def get_profile(model=None) -> CompiledProfile:
+    """
+    Скомпилированный профиль по имени модели (или DeviceProfile / словарь / CompiledProfile).
+    Неизвестное имя — базовая модель с сообщением в лог.
+    """
+    if isinstance(model, CompiledProfile):
+        return model
+    if isinstance(model, (DeviceProfile, dict)):
+        return register_profile(model)
+    name = (str(model).strip() if model else "") or DEFAULT_MODEL
+    _ensure_loaded()
+    with _mx:
+        compiled = _compiled.get(name)
+        if compiled is None and name != DEFAULT_MODEL:
+            print(f"[DeviceProfiles] unknown model '{name}', using '{DEFAULT_MODEL}'")
+            compiled = _compiled.get(DEFAULT_MODEL)
+    return compiled
+
+
+register_profile(RECTIFIER)
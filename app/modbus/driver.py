@@ -1,71 +1,133 @@
 from __future__ import annotations
 
-from typing import Optional, List
+import contextlib
+import inspect
+import threading
+import time
+from typing import Optional, List, Dict, Any, Callable
 from pymodbus.client import ModbusSerialClient, ModbusTcpClient
+from .pipelined_tcp import FC_READ_COILS, FC_READ_HOLDING, FC_READ_INPUT
+from .rtt import TimeoutTuner, METHOD_FC, apply_timeout, discard_stale, is_no_response, STALE_QUIET_S
 from .registry import (
-    Coils, InputRegs, HoldingRegs, ErrorBits,
-    coil, input_reg, holding_reg, u32_from_words, Measurements
+    Coils, InputRegs, HoldingRegs,
+    coil, input_reg, holding_reg, Measurements, Setpoints
 )
+from .device_profiles import get_profile, CompiledProfile
 
 ModbusClientT = ModbusSerialClient | ModbusTcpClient
 
-# Твой прибор отдаёт десятые доли -> масштабирую к «человеческим» единицам
+# Твой прибор отдаёт десятые доли -> масштабирую к «человеческим» единицам.
+# Для записи уставок; при чтении масштаб берётся из профиля модели (device_profiles).
 SCALE_I = 0.1
 SCALE_V = 0.1
 
 ADDR_MIN = 0
 ADDR_MAX = 65535  # верхняя граница (исключая)
 
-
-class SourceDriver:
-    def __init__(self, client: ModbusClientT, unit_id: int = 1, swap_iv: Optional[bool] = None):
-        self.client = client
+# Варианты схемы адресации, которые перебирает _read_block_smart
+ADDR_READERS = ("input", "holding")
+ADDR_BASES = ("offset", "absolute")
+
+# Снимок за две транзакции: FC04 30001–30011 и FC03 40002–40004
+SNAPSHOT_INPUT_START = InputRegs.ERROR_FLAGS
+SNAPSHOT_INPUT_COUNT = InputRegs.TEMP2 - InputRegs.ERROR_FLAGS + 1
+SNAPSHOT_HOLD_START = HoldingRegs.CURRENT_SETPOINT
+SNAPSHOT_HOLD_COUNT = HoldingRegs.REVERS - HoldingRegs.CURRENT_SETPOINT + 1
+# Блоки многоскоростного опроса: имя -> (таблица, первый 1-based адрес, количество).
+# FAST + COUNTERS вместе покрывают окно снимка 30001–30011.
+BLOCK_FAST = "fast"             # ошибки, I, U, полярность
+BLOCK_COUNTERS = "counters"     # А·ч, температуры
+BLOCK_SETPOINTS = "setpoints"   # 40002–40004
+BLOCK_COILS = "coils"           # 00001–00005
+
+# Допустимые сырые значения уставок (как ограничивает прибор)
+SETPOINT_LIMITS = {
+    HoldingRegs.CURRENT_SETPOINT: (1, 5000),
+    HoldingRegs.VOLTAGE_SETPOINT: (1, 120),
+}
+
+COILS_COUNT = Coils.CONTROL_MODE_INFO - Coils.ENABLE_DEVICE + 1
+# Блоки базовой модели; драйвер читает блоки своего профиля (self.profile.blocks)
+POLL_BLOCKS = get_profile().blocks
+# Сдвиг адреса катушек: 0 — как в документации, -1 — устройство считает с единицы
+COIL_SHIFTS = (0, -1)
+# сколько раз подряд блок должен не прочитаться (при живом устройстве), чтобы выключить снимок
+SNAPSHOT_MAX_MISSES = 3
+# После стольких неудачных циклов опроса подряд — один перебор схем адресации (reprobe()):
+# прибор могли перенастроить, а опрос читает только по закэшированной схеме
+REPROBE_AFTER_MISSES = 2
+
+
+def clamp_setpoint(addr_1based: int, value: int) -> int:
+    lo, hi = SETPOINT_LIMITS.get(addr_1based, (0, 0xFFFF))
+    return max(lo, min(hi, int(value)))
+
+
+_UNIT_KWARGS = ("device_id", "slave", "unit")
+_unit_kwarg_cache: Dict[Any, Optional[str]] = {}
+
+
+def unit_kwarg(method) -> Optional[str]:
+    """
+    Как у этого метода клиента pymodbus называется адрес ведомого: device_id (3.9+),
+    slave (3.0–3.8) или unit (2.x). None — передать нельзя (остаётся атрибут клиента).
+    """
+    func = getattr(method, "__func__", method)
+    if func in _unit_kwarg_cache:
+        return _unit_kwarg_cache[func]
+    name = None
+    try:
+        params = inspect.signature(method).parameters
+        name = next((k for k in _UNIT_KWARGS if k in params), None)
+    except (TypeError, ValueError):
+        pass
+    _unit_kwarg_cache[func] = name
+    return name
+
+
+class _DriverCore:
+    """
+    Всё, что не зависит от транспорта: схема адресации, образ регистров и декод в Measurements.
+    Общая часть SourceDriver (синхронный pymodbus) и AsyncSourceDriver (asyncio).
+    Окна снимка, блоки опроса и декодер — из скомпилированного профиля модели (profile:
+    имя модели, словарь или DeviceProfile; None — базовая модель).
+    """
+    def __init__(self, unit_id: int = 1, swap_iv: Optional[bool] = None,
+                 snapshot: bool = True, addressing: Optional[Dict[str, Any]] = None, profile=None):
         self.unit = unit_id
+        self.profile: CompiledProfile = get_profile(profile)
         self._swap_iv: Optional[bool] = swap_iv  # None — автоопределение
+        # Снимок: все измерения за две транзакции вместо 6+
+        self._snapshot = bool(snapshot)
+        self._snapshot_misses = 0
+        # образ регистров по блокам профиля (для многоскоростного опроса)
+        self._image: Dict[str, List] = {}
         # Критично: начинаем сдвиг с +1 (по твоему дампу это «правильное окно»)
         self._addr_shift = 1
-
-        for attr in ("unit_id", "unit", "slave"):
-            try:
-                setattr(self.client, attr, self.unit)
-            except Exception:
-                pass
-
-    # ---------- совместимые обёртки ----------
-    def _read_input_registers(self, address: int, count: int = 1):
-        try:
-            return self.client.read_input_registers(address, count=count)
-        except Exception:
-            return None
-
-    def _read_holding_registers(self, address: int, count: int = 1):
-        try:
-            return self.client.read_holding_registers(address, count=count)
-        except Exception:
-            return None
-
-    def _read_coils(self, address: int, count: int = 1):
-        try:
-            return self.client.read_coils(address, count=count)
-        except Exception:
-            return None
-
-    def _write_coil_raw(self, address: int, value: bool):
-        try:
-            return self.client.write_coil(address, bool(value))
-        except Exception:
-            return None
-
-    def _write_register(self, address: int, value: int):
-        try:
-            return self.client.write_register(address, int(value))
-        except Exception:
-            return None
-
-    # ---------- утилиты чтения ----------
-    @staticmethod
-    def _s16(x: int) -> int:
-        return x - 0x10000 if x & 0x8000 else x
+        self._reader_kind = "input"
+        self._base_kind = "offset"
+        self._coil_shift: Optional[int] = None  # None — ещё не проверяли записью
+        # вызывается при смене удачной схемы (контроллер сохраняет её в профиль)
+        self.addressing_cb: Optional[Callable[[Dict[str, Any]], None]] = None
+        # ответил ли прибор хоть чем-то (пусть ошибкой) на последний запрос — см. ping()
+        self._answered = False
+        if addressing:
+            self.set_addressing(addressing)
+
+    def _image_written(self, addr_1based: int, values: List[int]):
+        """
+        Удачная запись holding-регистров (FC06/FC16) — сразу в образ, как у катушек: иначе
+        быстрая группа до следующего чтения блока уставок публикует старые значения.
+        Блоки, которых ещё нет в образе, не трогаем — их заполнит первое чтение.
+        """
+        for name, (table, start, count) in self.profile.blocks.items():
+            regs = self._image.get(name)
+            if table != "holding" or regs is None:
+                continue
+            for i, v in enumerate(values):
+                j = addr_1based + i - start
+                if 0 <= j < min(count, len(regs)):
+                    regs[j] = int(v)
 
     @staticmethod
     def _pair_addrs_input(addr_1based: int) -> tuple[int, int]:
@@ -79,25 +141,43 @@ class SourceDriver:
         return offset, absolute
 
     @staticmethod
-    def _ok_regs(rr, need: int) -> Optional[List[int]]:
+    def _ok_regs(rr, need: int, fc: Optional[int] = None) -> Optional[List[int]]:
+        """
+        Регистры ответа, если это ответ на наш запрос: тот же код функции и ровно need
+        регистров. Чужой (опоздавший) ответ с тем же адресом ведомого так не пройдёт.
+        """
         if getattr(rr, "isError", lambda: True)():
             return None
+        if fc is not None and getattr(rr, "function_code", fc) != fc:
+            return None
         regs = getattr(rr, "registers", None)
-        return regs if regs and len(regs) >= need else None
+        return regs if regs and len(regs) == need else None
 
     @staticmethod
-    def _addr_is_ok(start: int, count: int) -> bool:
-        return start >= ADDR_MIN and (start + count - 1) < ADDR_MAX
-
-    def _read_inp_mode(self, base_addr: int, count: int) -> Optional[List[int]]:
-        if not self._addr_is_ok(base_addr, count):
+    def _ok_bits(rr, count: int) -> Optional[List[bool]]:
+        """Катушки ответа FC01: count бит, дополненных до целого байта, — не больше и не меньше."""
+        if getattr(rr, "isError", lambda: True)():
             return None
-        return self._ok_regs(self._read_input_registers(base_addr, count=count), count)
-
-    def _read_hold_mode(self, base_addr: int, count: int) -> Optional[List[int]]:
-        if not self._addr_is_ok(base_addr, count):
+        if getattr(rr, "function_code", FC_READ_COILS) != FC_READ_COILS:
+            return None
+        bits = getattr(rr, "bits", None)
+        if not bits or not count <= len(bits) < count + 8:
             return None
-        return self._ok_regs(self._read_holding_registers(base_addr, count=count), count)
+        return [bool(b) for b in bits[:count]]
+
+    def _coil_window(self, start: int, count: int) -> tuple[int, int, int]:
+        """
+        Окно катушек start..start+count-1 на шине с учётом выученного сдвига (_coil_shift):
+        (адрес, сколько читать, pad). pad — первые катушки, которые при сдвиге -1 ушли бы
+        ниже нулевого адреса: их не читаем, в ответе они False.
+        """
+        first = coil(start) + (self._coil_shift or 0)
+        pad = max(0, ADDR_MIN - first)
+        return first + pad, count - pad, pad
+
+    @staticmethod
+    def _addr_is_ok(start: int, count: int) -> bool:
+        return start >= ADDR_MIN and (start + count - 1) < ADDR_MAX
 
     def _shifts_for(self) -> List[int]:
         """
@@ -114,81 +194,314 @@ class SourceDriver:
                 seen.add(x); res.append(x)
         return res
 
+    @property
+    def addressing(self) -> Dict[str, Any]:
+        """Текущая (последняя удачная) схема адресации — то, что кэшируется в профиле."""
+        scheme = {"reader": self._reader_kind, "base": self._base_kind, "shift": self._addr_shift}
+        if self._coil_shift is not None:
+            scheme["coil_shift"] = self._coil_shift
+        return scheme
+
+    def set_addressing(self, scheme: Optional[Dict[str, Any]]) -> bool:
+        """Применить сохранённую схему. Некорректную — молча игнорируем (останется умолчание)."""
+        if not isinstance(scheme, dict):
+            return False
+        reader = scheme.get("reader")
+        base = scheme.get("base")
+        try:
+            shift = int(scheme.get("shift"))
+        except Exception:
+            return False
+        if reader not in ADDR_READERS or base not in ADDR_BASES or shift not in (0, 1):
+            return False
+        self._reader_kind, self._base_kind, self._addr_shift = reader, base, shift
+        coil_shift = scheme.get("coil_shift")
+        self._coil_shift = coil_shift if coil_shift in COIL_SHIFTS else None
+        return True
+
+    def _schemes(self):
+        """Все комбинации reader/base/shift; закэшированная — первой."""
+        cur = (self._reader_kind, self._base_kind, self._addr_shift)
+        yield cur
+        for reader in ADDR_READERS:
+            for base in ADDR_BASES:
+                for sh in self._shifts_for():
+                    if (reader, base, sh) != cur:
+                        yield reader, base, sh
+
+    def _remember_scheme(self, reader: str, base: str, shift: int):
+        if (reader, base, shift) == (self._reader_kind, self._base_kind, self._addr_shift):
+            return
+        self._reader_kind, self._base_kind, self._addr_shift = reader, base, shift
+        self._addressing_changed()
+
+    def _addressing_changed(self):
+        print(f"[Driver] addressing scheme: {self.addressing}")
+        if callable(self.addressing_cb):
+            try:
+                self.addressing_cb(self.addressing)
+            except Exception:
+                pass
+
+    def _apply_coils(self, meas: Measurements, bits: Optional[List[bool]]):
+        self.profile.apply_coils(meas, bits)
+
+    def _decode_buffers(self, inp: List[int], hold: List[int]) -> Measurements:
+        """inp, hold — окна снимка профиля (input и holding): весь декод — один вызов."""
+        return self.profile.decode(inp, hold)
+
+    def measurements_from_image(self) -> Optional[Measurements]:
+        """Measurements из последних прочитанных блоков; None — пока не прочитан хоть один обязательный."""
+        inp = self.profile.compose("input", self._image)
+        hold = self.profile.compose("holding", self._image)
+        if inp is None or hold is None:
+            return None
+        try:
+            meas = self._decode_buffers(inp, hold)
+        except Exception:
+            return None
+        self._apply_coils(meas, self._image.get(BLOCK_COILS))
+        return meas
+
+    def _scheme_start(self, base: str, shift: int, addr_1based: int) -> int:
+        """Адрес на шине для 1-based регистра 3xxxx по схеме base/shift."""
+        off_base, abs_base = self._pair_addrs_input(addr_1based)
+        return (off_base if base == "offset" else abs_base) + shift
+
+    def _store_snapshot(self, inp: List[int], hold: List[int]):
+        # снимок заодно обновляет образ регистров для многоскоростного опроса
+        for table, window in (("input", inp), ("holding", hold)):
+            if table in self.profile.windows:
+                self._image.update(self.profile.split(table, window))
+
+
+class SourceDriver(_DriverCore):
+    def __init__(self, client: ModbusClientT, unit_id: int = 1, swap_iv: Optional[bool] = None,
+                 snapshot: bool = True, addressing: Optional[Dict[str, Any]] = None,
+                 lock: Optional[threading.RLock] = None, timeouts: Optional[TimeoutTuner] = None,
+                 profile=None):
+        super().__init__(unit_id, swap_iv=swap_iv, snapshot=snapshot, addressing=addressing, profile=profile)
+        self.client = client
+        # общий на клиент (ClientPool), если этим сокетом пользуются и другие драйверы
+        self.lock = lock or contextlib.nullcontext()
+        # адаптивный таймаут по RTT (общий на клиент); None — таймаут клиента как есть
+        self.timeouts = timeouts
+
+        for attr in ("unit_id", "unit", "slave"):
+            try:
+                setattr(self.client, attr, self.unit)
+            except Exception:
+                pass
+
+    # ---------- совместимые обёртки ----------
+    def _call(self, name: str, *args, **kwargs):
+        """
+        Вызов метода клиента с адресом ведомого в самом запросе (slave=/device_id=), чтобы
+        один клиент (общая линия RS-485, шлюз) можно было делить между драйверами.
+        Старые клиенты без такого аргумента — через атрибуты клиента, как раньше.
+        С timeouts таймаут ответа на каждую транзакцию берётся из оценки RTT прибора.
+        """
+        try:
+            method = getattr(self.client, name)
+        except Exception:
+            return None
+        kw = unit_kwarg(method)
+        fc = METHOD_FC.get(name) if self.timeouts is not None else None
+        with self.lock:
+            timeout = STALE_QUIET_S
+            if fc is not None:
+                timeout = self.timeouts.timeout_for(self.unit, fc)
+                apply_timeout(self.client, timeout)
+            t0 = time.monotonic()
+            try:
+                if kw:
+                    kwargs[kw] = self.unit
+                    rr = method(*args, **kwargs)
+                else:
+                    for attr in ("unit_id", "unit", "slave"):
+                        try:
+                            setattr(self.client, attr, self.unit)
+                        except Exception:
+                            pass
+                    rr = method(*args, **kwargs)
+            except Exception:
+                rr = None
+            if fc is not None:
+                self._on_rtt(fc, rr, time.monotonic() - t0)
+            self._answered = not is_no_response(rr)
+            if not self._answered:
+                # опоздавший ответ на этот запрос не должен достаться следующему
+                discard_stale(self.client, timeout)
+        return rr
+
+    def _on_rtt(self, fc: int, rr, rtt: Optional[float]):
+        if is_no_response(rr) or rtt is None:
+            self.timeouts.on_timeout(self.unit, fc)
+        else:
+            self.timeouts.on_reply(self.unit, fc, rtt)
+
+    def _read_input_registers(self, address: int, count: int = 1):
+        # count — только именованным: в новых pymodbus он keyword-only
+        return self._call("read_input_registers", address, count=count)
+
+    def _read_holding_registers(self, address: int, count: int = 1):
+        return self._call("read_holding_registers", address, count=count)
+
+    def _read_coils(self, address: int, count: int = 1):
+        return self._call("read_coils", address, count=count)
+
+    def _write_coil_raw(self, address: int, value: bool):
+        return self._call("write_coil", address, bool(value))
+
+    def _write_coils_raw(self, address: int, values: List[bool]):
+        return self._call("write_coils", address, [bool(v) for v in values])
+
+    def _write_register(self, address: int, value: int):
+        return self._call("write_register", address, int(value))
+
+    def _write_registers(self, address: int, values: List[int]):
+        return self._call("write_registers", address, [int(v) for v in values])
+
+    # ---------- утилиты чтения ----------
+    def _read_inp_mode(self, base_addr: int, count: int) -> Optional[List[int]]:
+        if not self._addr_is_ok(base_addr, count):
+            return None
+        return self._ok_regs(self._read_input_registers(base_addr, count=count), count, FC_READ_INPUT)
+
+    def _read_hold_mode(self, base_addr: int, count: int) -> Optional[List[int]]:
+        if not self._addr_is_ok(base_addr, count):
+            return None
+        return self._ok_regs(self._read_holding_registers(base_addr, count=count), count, FC_READ_HOLDING)
+
+    # ---------- схема адресации (reader/base/shift) ----------
+    def _read_scheme(self, reader: str, base: str, shift: int, addr_1based: int, count: int) -> Optional[List[int]]:
+        start = self._scheme_start(base, shift, addr_1based)
+        read = self._read_inp_mode if reader == "input" else self._read_hold_mode
+        return read(start, count)
+
+    def _read_cached(self, addr_1based: int, count: int) -> Optional[List[int]]:
+        """Одно чтение по закэшированной схеме, без перебора."""
+        return self._read_scheme(self._reader_kind, self._base_kind, self._addr_shift, addr_1based, count)
+
     def _read_block_smart(self, addr_1based_start: int, count: int) -> Optional[List[int]]:
         """
-        Пробуем две схемы адресации (offset/absolute).
-        В каждой — безопасные сдвиги: [self._addr_shift, 0, +1], без отрицательных адресов.
+        Сначала — закэшированная схема (одна транзакция).
+        Перебор reader (input/holding) × base (offset/absolute) × сдвиг — только если она перестала отвечать.
         """
-        off_base, abs_base = self._pair_addrs_input(addr_1based_start)
-        for reader in (self._read_inp_mode, self._read_hold_mode):
-            for base in (off_base, abs_base):
-                for sh in self._shifts_for():
-                    start = base + sh
-                    regs = reader(start, count)
-                    if regs is not None:
-                        if self._addr_shift != sh:
-                            self._addr_shift = sh
-                        return regs
+        for reader, base, sh in self._schemes():
+            regs = self._read_scheme(reader, base, sh, addr_1based_start, count)
+            if regs is not None:
+                self._remember_scheme(reader, base, sh)
+                return regs
         return None
 
     def _read_single_smart(self, addr_1based: int) -> Optional[int]:
+        # одиночные чтения (ping, поштучный fallback) не перебирают схемы — только текущая
         try:
-            off_base, abs_base = self._pair_addrs_input(addr_1based)
-            for reader in (self._read_inp_mode, self._read_hold_mode):
-                for base in (off_base, abs_base):
-                    for sh in self._shifts_for():
-                        start = base + sh
-                        regs = reader(start, 1)
-                        if regs is not None:
-                            if self._addr_shift != sh:
-                                self._addr_shift = sh
-                            return regs[0]
-                        else:
-                            return None
+            regs = self._read_cached(addr_1based, 1)
+            return regs[0] if regs is not None else None
         except Exception:
             pass
         return None
 
     # ---------- запись катушек с верификацией ----------
-    def _verify_coil(self, address: int, value: bool) -> bool:
-        rr = self._read_coils(address, count=1)
-        bits = getattr(rr, "bits", None)
+    def _coil_shifts(self) -> List[int]:
+        # адресация катушек уже известна — запасной address-1 больше не пробуем
+        return [self._coil_shift] if self._coil_shift is not None else list(COIL_SHIFTS)
+
+    def _write_coil_steps(self, steps: List[tuple[int, bool]], shift: int) -> bool:
+        """
+        Шаги (1-based катушка, значение) в заданном порядке.
+        Разные катушки подряд по возрастанию адреса — одним FC15 (прибор применяет их в этом же
+        порядке); иначе (обратный порядок, импульс на одной катушке) — по FC05 на шаг.
+        """
+        addrs = [coil(c) + shift for c, _ in steps]
+        if not all(self._addr_is_ok(a, 1) for a in addrs):
+            return False
+        if len(steps) > 1 and all(b == a + 1 for a, b in zip(addrs, addrs[1:])):
+            rr = self._write_coils_raw(addrs[0], [v for _, v in steps])
+            return hasattr(rr, "isError") and not rr.isError()
+        for a, (_, v) in zip(addrs, steps):
+            rr = self._write_coil_raw(a, v)
+            if not (hasattr(rr, "isError") and not rr.isError()):
+                return False
+        return True
+
+    def _verify_coils(self, expected: Dict[int, bool], shift: int) -> bool:
+        """Одно FC01-чтение окна 00001–00005 и сравнение конечных состояний."""
+        start = max(ADDR_MIN, coil(Coils.ENABLE_DEVICE) + shift)
+        count = coil(Coils.CONTROL_MODE_INFO) + shift - start + 1
+        rr = self._read_coils(start, count=count)
         if hasattr(rr, "isError") and rr.isError():
             return False
+        bits = getattr(rr, "bits", None)
         if bits is None:
             # некоторые реализации не возвращают bits — считаем успех по отсутствию ошибки записи
-            return True
-        return bool(bits[0]) == bool(value)
-
-    def _write_coil_flex(self, address: int, value: bool) -> bool:
+            return rr is not None
+        for c, value in expected.items():
+            i = coil(c) + shift - start
+            if i < 0 or i >= len(bits) or bool(bits[i]) != bool(value):
+                return False
+        return True
+
+    def write_coils_verified(self, steps: List[tuple[int, bool]]) -> bool:
         """
-        Пишем катушку и подтверждаем чтением.
-        Если подтверждение не прошло — пробуем address-1 (на случай 1-based адресации на стороне устройства).
+        Запись набора катушек с одной проверкой. Если адресация катушек ещё неизвестна —
+        пробуем address, затем address-1 (1-based на стороне устройства); удачный вариант запоминаем.
         """
-        r = self._write_coil_raw(address, value)
-        ok = hasattr(r, "isError") and not r.isError()
-        if ok and self._verify_coil(address, value):
-            return True
-
-        # fallback: адрес-1
-        r2 = self._write_coil_raw(address - 1, value)
-        ok2 = hasattr(r2, "isError") and not r2.isError()
-        return ok2 and self._verify_coil(address - 1, value)
+        expected: Dict[int, bool] = {}
+        for c, v in steps:
+            expected[c] = bool(v)
+        steps = [(c, bool(v)) for c, v in steps]
+        for shift in self._coil_shifts():
+            if self._write_coil_steps(steps, shift) and self._verify_coils(expected, shift):
+                if self._coil_shift != shift:
+                    self._coil_shift = shift
+                    self._addressing_changed()
+                return True
+        return False
 
     # ---------- Coils ----------
+    def set_power(self, on: bool) -> bool:
+        """
+        Безопасный порядок:
+          ON:  питание устройства -> инвертор (по возрастанию адреса — один FC15)
+          OFF: инвертор -> питание устройства (два FC05)
+        плюс одно FC01 на проверку.
+        """
+        if on:
+            return self.write_coils_verified([(Coils.ENABLE_DEVICE, True), (Coils.INVERTER_ENABLE, True)])
+        return self.write_coils_verified([(Coils.INVERTER_ENABLE, False), (Coils.ENABLE_DEVICE, False)])
+
     def set_device_power(self, on: bool) -> bool:
-        return self._write_coil_flex(coil(Coils.ENABLE_DEVICE), bool(on))
+        return self.write_coils_verified([(Coils.ENABLE_DEVICE, bool(on))])
 
     def set_inverter_enable(self, on: bool) -> bool:
-        return self._write_coil_flex(coil(Coils.INVERTER_ENABLE), bool(on))
+        return self.write_coils_verified([(Coils.INVERTER_ENABLE, bool(on))])
 
     def reset_ah_counter(self) -> bool:
-        ok1 = self._write_coil_flex(coil(Coils.AH_RESET), True)
-        ok2 = self._write_coil_flex(coil(Coils.AH_RESET), False)
-        return ok1 and ok2
+        # импульс 1 -> 0 на одной катушке: две записи, одна проверка
+        return self.write_coils_verified([(Coils.AH_RESET, True), (Coils.AH_RESET, False)])
 
     def set_control_mode_lock(self, locked: bool) -> bool:
-        return self._write_coil_flex(coil(Coils.CONTROL_MODE_LOCK), bool(locked))
+        return self.write_coils_verified([(Coils.CONTROL_MODE_LOCK, bool(locked))])
+
+    def read_coil(self, address: int):
+        """Сырое FC01 одной катушки (0-based адрес на шине) — ответ клиента или None."""
+        return self._read_coils(address, count=1)
+
+    def write_coil(self, address: int, value: bool):
+        """Сырое FC05 (0-based адрес на шине) — ответ клиента или None."""
+        return self._write_coil_raw(address, value)
+
+    def read_coil_states(self) -> Optional[List[bool]]:
+        """Окно катушек профиля одним FC01 (у базовой модели 00001–00005); индекс = катушка - первая."""
+        window = self.profile.windows.get("coils")
+        if window is None:
+            return None
+        address, n, pad = self._coil_window(*window)
+        bits = self._ok_bits(self._read_coils(address, count=n), n)
+        return None if bits is None else [False] * pad + bits
 
     def read_control_mode_info(self) -> Optional[int]:
         rr = self._read_coils(coil(Coils.CONTROL_MODE_INFO), count=1)
@@ -212,12 +525,53 @@ class SourceDriver:
     def set_voltage(self, value: float):
         # масштабировать и записать в регистр напряжения
         scaled = int(value / SCALE_V)
-        self._write_register(HoldingRegs.VOLTAGE_SETPOINT, scaled)
+        self._write_register(holding_reg(HoldingRegs.VOLTAGE_SETPOINT), scaled)
 
     def set_current(self, value: float):
         # масштабировать и записать в регистр тока
         scaled = int(value / SCALE_I)
-        self._write_register(HoldingRegs.CURRENT_SETPOINT, scaled)
+        self._write_register(holding_reg(HoldingRegs.CURRENT_SETPOINT), scaled)
+
+    # ---------- Рабочая точка одним FC16 ----------
+    def write_setpoints(self, sp: Setpoints, verify: bool = False) -> bool:
+        """
+        Уставка тока, напряжения и REVERS одним Write Multiple Registers (FC16):
+        одна транзакция вместо трёх, и прибор не видит «наполовину применённое» состояние.
+        verify=True — одно FC03-чтение 40002–40004 и сравнение.
+        """
+        regs = [
+            clamp_setpoint(HoldingRegs.CURRENT_SETPOINT, sp.current),
+            clamp_setpoint(HoldingRegs.VOLTAGE_SETPOINT, sp.voltage),
+            clamp_setpoint(HoldingRegs.REVERS, sp.revers),
+        ]
+        rr = self._write_registers(holding_reg(SNAPSHOT_HOLD_START), regs)
+        success = (rr is not None) and (not getattr(rr, 'isError', lambda: False)())
+        if not success:
+            print(f"Ошибка записи рабочей точки {regs} в регистры {SNAPSHOT_HOLD_START}..")
+            return False
+        self._image_written(SNAPSHOT_HOLD_START, regs)
+        if not verify:
+            return True
+        back = self._read_hold_mode(holding_reg(SNAPSHOT_HOLD_START), SNAPSHOT_HOLD_COUNT)
+        return back is not None and [int(x) for x in back[:SNAPSHOT_HOLD_COUNT]] == regs
+
+    def write_holdings(self, addr_1based: int, values: List[int]) -> bool:
+        """Подряд идущие holding-регистры одним FC16 (с ограничением уставок), без проверки чтением."""
+        regs = [clamp_setpoint(addr_1based + i, v) for i, v in enumerate(values)]
+        rr = self._write_registers(holding_reg(addr_1based), regs)
+        success = (rr is not None) and (not getattr(rr, 'isError', lambda: False)())
+        if not success:
+            print(f"Ошибка записи {regs} в регистры {addr_1based}..")
+            return False
+        self._image_written(addr_1based, regs)
+        return True
+
+    def set_operating_point(self, current: float, voltage: float, revers: int, verify: bool = False) -> bool:
+        """То же, что write_setpoints(), но ток/напряжение в единицах А/В (масштаб SCALE_I/SCALE_V)."""
+        return self.write_setpoints(
+            Setpoints(current=int(current / SCALE_I), voltage=int(voltage / SCALE_V), revers=int(revers)),
+            verify=verify,
+        )
 
     def read_40001_and_40002(self):
         from .registry import HoldingRegs  # Импортируем внутри метода или в начале файла
@@ -253,6 +607,8 @@ class SourceDriver:
         success = hasattr(rr, "isError") and not rr.isError()
         if not success:
             print(f"Ошибка записи {value} в регистр {HoldingRegs.REVERS}")
+        else:
+            self._image_written(HoldingRegs.REVERS, [int(value)])
 
         return success
         # --- Чтение/запись конкретных регистров ---
@@ -268,14 +624,13 @@ class SourceDriver:
         return None
 
     def write_voltage_register(self, value: int) -> bool:
-        if value > 120:
-            value = 120
-        if value < 1:
-            value = 1
+        value = clamp_setpoint(HoldingRegs.VOLTAGE_SETPOINT, value)
         rr = self._write_register(holding_reg(HoldingRegs.VOLTAGE_SETPOINT), int(value))
         success = (rr is not None) and (not getattr(rr, 'isError', lambda: False)())
         if not success:
             print(f"Ошибка записи {value} в регистр напряжения {HoldingRegs.VOLTAGE_SETPOINT}")
+        else:
+            self._image_written(HoldingRegs.VOLTAGE_SETPOINT, [value])
 
         return success
 
@@ -289,82 +644,256 @@ class SourceDriver:
         return None
 
     def write_current_register(self, value: int) -> bool:
-        if value > 5000:
-            value = 5000
-        if value < 1:
-            value = 1
+        value = clamp_setpoint(HoldingRegs.CURRENT_SETPOINT, value)
         rr = self._write_register(holding_reg(HoldingRegs.CURRENT_SETPOINT), int(value))
         success = (rr is not None) and (not getattr(rr, 'isError', lambda: False)())
         if not success:
             print(f"Ошибка записи {value} в регистр тока {HoldingRegs.CURRENT_SETPOINT}")
+        else:
+            self._image_written(HoldingRegs.CURRENT_SETPOINT, [value])
+        return success
+
+    def write_holding(self, addr_1based: int, value: int) -> bool:
+        """Запись одного holding-регистра (40002..) по 1-based адресу, с ограничением уставок."""
+        value = clamp_setpoint(addr_1based, value)
+        rr = self._write_register(holding_reg(addr_1based), int(value))
+        success = (rr is not None) and (not getattr(rr, 'isError', lambda: False)())
+        if not success:
+            print(f"Ошибка записи {value} в регистр {addr_1based}")
+        else:
+            self._image_written(addr_1based, [value])
         return success
 
     # ---------- Inputs ----------
     def read_measurements(self) -> Optional[Measurements]:
+        """
+        Снимок измерений. По умолчанию — по транзакции на окно профиля (у базовой модели
+        FC04 30001–30011, FC03 40002–40004 и FC01 00001–00005); если устройство не отдаёт окно
+        целиком — поштучный путь.
+        С конвейерным клиентом все три уходят одной пачкой.
+        """
+        if self._snapshot and self._pipelined():
+            meas = self._read_snapshot_pipelined()
+            if meas is not None:
+                self._snapshot_misses = 0
+                return meas
+        meas = self.read_snapshot() if self._snapshot else None
+        if meas is not None:
+            self._snapshot_misses = 0
+        elif self._snapshot and not self._answered:
+            # прибор молчит совсем — поштучный путь добавил бы только таймаутов
+            return None
+        else:
+            meas = self._read_measurements_legacy()
+            if meas is not None and self._snapshot:
+                # блок не прочитался, а поштучно — да: похоже, устройство не любит длинные окна
+                self._snapshot_misses += 1
+                if self._snapshot_misses >= SNAPSHOT_MAX_MISSES:
+                    self._snapshot = False
+                    print("[Driver] snapshot mode disabled: block read not supported by device")
+        if meas is not None:
+            bits = self.read_coil_states()
+            if bits is not None:
+                self._image[BLOCK_COILS] = bits
+            self._apply_coils(meas, bits)
+        return meas
+
+    def read_snapshot(self) -> Optional[Measurements]:
+        """По одному чтению на окно input и holding профиля, декод из буферов."""
+        windows = self.profile.windows
         try:
-            # I/U
-            i_raw = self._read_single_smart(InputRegs.OUTPUT_CURRENT)
-            u_raw = self._read_single_smart(InputRegs.OUTPUT_VOLTAGE)
-
-            i, v = self.read_40001_and_40002()
-
-            if i_raw is None or u_raw is None:
-                return None
+            inp = hold = []
+            if "input" in windows:
+                inp = self._read_cached(*windows["input"])
+                if inp is None:
+                    return None
+            if "holding" in windows:
+                start, count = windows["holding"]
+                hold = self._read_hold_mode(holding_reg(start), count)
+                if hold is None:
+                    return None
+            self._store_snapshot(inp, hold)
+            return self._decode_buffers(inp, hold)
+        except Exception:
+            return None
 
-            curr = self._s16(int(i_raw)) * SCALE_I
-            volt = self._s16(int(u_raw)) * SCALE_V
-
-            # Остальные поля — блочно 30001.., при необходимости — поштучно
-            regs1 = self._read_block_smart(InputRegs.ERROR_FLAGS, 6)
-            err = pol = ah_lo = ah_hi = None
-            if regs1 and len(regs1) >= 6:
-                base_off = input_reg(InputRegs.ERROR_FLAGS)
-                idx = lambda a1: input_reg(a1) - base_off
-                try:
-                    err   = regs1[idx(InputRegs.ERROR_FLAGS)]
-                    pol   = regs1[idx(InputRegs.POLARITY)]
-                    ah_lo = regs1[idx(InputRegs.AH_COUNTER_LO)]
-                    ah_hi = regs1[idx(InputRegs.AH_COUNTER_HI)]
-                except Exception:
-                    pass
-
-            if err   is None: err   = self._read_single_smart(InputRegs.ERROR_FLAGS)
-            if pol   is None: pol   = self._read_single_smart(InputRegs.POLARITY)
-            if ah_lo is None: ah_lo = self._read_single_smart(InputRegs.AH_COUNTER_LO)
-            if ah_hi is None: ah_hi = self._read_single_smart(InputRegs.AH_COUNTER_HI)
-            if None in (err, pol, ah_lo, ah_hi):
+    # ---------- Конвейер (PipelinedTcpClient): несколько запросов в полёте ----------
+    def _pipelined(self) -> bool:
+        return callable(getattr(self.client, "execute_many", None)) and getattr(self.client, "max_in_flight", 1) > 1
+
+    def _execute_many(self, requests: List[tuple]) -> List:
+        """execute_many под lock; таймаут пачки — самый длинный из оценок её запросов."""
+        with self.lock:
+            if self.timeouts is not None:
+                self.client.timeout = max(self.timeouts.timeout_for(unit, fc) for fc, _a, _c, unit in requests)
+            responses = self.client.execute_many(requests)
+            if self.timeouts is not None:
+                rtts = getattr(self.client, "last_rtts", None) or [None] * len(requests)
+                for (fc, _a, _c, _unit), rr, rtt in zip(requests, responses, rtts):
+                    self._on_rtt(fc, rr, rtt)
+        return responses
+
+    def _block_request(self, kind: str, start: int, count: int) -> tuple:
+        """Запрос конвейера для блока по текущей схеме адресации (без перебора)."""
+        if kind == "input":
+            fc = FC_READ_INPUT if self._reader_kind == "input" else FC_READ_HOLDING
+            return fc, self._scheme_start(self._base_kind, self._addr_shift, start), count, self.unit
+        if kind == "holding":
+            return FC_READ_HOLDING, holding_reg(start), count, self.unit
+        address, n, _pad = self._coil_window(start, count)
+        return FC_READ_COILS, address, n, self.unit
+
+    def _block_values(self, block: tuple, request: tuple, rr) -> Optional[List]:
+        """Значения блока (kind, start, count) из ответа конвейера на request (_block_request)."""
+        fc, _address, n, _unit = request
+        if fc != FC_READ_COILS:
+            return self._ok_regs(rr, n, fc)
+        bits = self._ok_bits(rr, n)
+        return None if bits is None else [False] * (block[2] - n) + bits
+
+    def _read_snapshot_pipelined(self) -> Optional[Measurements]:
+        """Все окна профиля (input, holding, катушки) — одной пачкой запросов."""
+        reqs = [(t,) + w for t, w in self.profile.windows.items()]
+        try:
+            requests = [self._block_request(*r) for r in reqs]
+            responses = self._execute_many(requests)
+            got = {r[0]: self._block_values(r, q, rr) for r, q, rr in zip(reqs, requests, responses)}
+            inp, hold, bits = got.get("input", []), got.get("holding", []), got.get("coils")
+            if inp is None or hold is None:
                 return None
+            self._store_snapshot(inp, hold)
+            meas = self._decode_buffers(inp, hold)
+        except Exception:
+            return None
+        if bits is not None:
+            self._image[BLOCK_COILS] = bits
+        self._apply_coils(meas, bits)
+        return meas
 
-            ah32 = u32_from_words(int(ah_hi), int(ah_lo))
-
-            # Температуры
-            t_regs = self._read_block_smart(InputRegs.TEMP1, 2)
-            if t_regs and len(t_regs) >= 2:
-                t1, t2 = t_regs[0], t_regs[1]
+    def read_blocks(self, names) -> List[str]:
+        """
+        Прочитать несколько блоков профиля, вернуть имена непрочитанных.
+        Блоков, которых у модели нет, не читаем и непрочитанными не считаем.
+        С конвейерным клиентом — одной пачкой; то, что не прочиталось, — ещё раз по одному
+        через read_block().
+        """
+        blocks = self.profile.blocks
+        names = [n for n in names if n in blocks]
+        if len(names) > 1 and self._pipelined():
+            requests = [self._block_request(*blocks[n]) for n in names]
+            try:
+                responses = self._execute_many(requests)
+            except Exception:
+                responses = [None] * len(names)
+            failed = []
+            for name, request, rr in zip(names, requests, responses):
+                values = self._block_values(blocks[name], request, rr)
+                if values is None:
+                    failed.append(name)
+                else:
+                    self._image[name] = list(values)
+            names = failed
+        return [n for n in names if not self.read_block(n)]
+
+    # ---------- Многоскоростной опрос: блоки и образ регистров ----------
+    def read_block(self, name: str) -> bool:
+        """
+        Прочитать один блок профиля (одна транзакция) и обновить образ регистров.
+        Только по закэшированной схеме: потерянный кадр не должен запускать перебор схем.
+        """
+        block = self.profile.blocks.get(name)
+        if block is None:
+            return True     # у этой модели такого блока нет — читать нечего
+        kind, start, count = block
+        try:
+            if kind == "input":
+                regs = self._read_cached(start, count)
+            elif kind == "holding":
+                regs = self._read_hold_mode(holding_reg(start), count)
             else:
-                t1 = self._read_single_smart(InputRegs.TEMP1)
-                t2 = self._read_single_smart(InputRegs.TEMP2)
-
-            return Measurements(
-                current=float(curr),
-                voltage=float(volt),
-                current_i=float(i),
-                voltage_i=float(v),
-                polarity=int(pol),
-                ah_counter=int(ah32),
-                temp1=(float(t1) if t1 is not None else None),
-                temp2=(float(t2) if t2 is not None else None),
-                errors_raw=int(err),
-                error_overheat=bool((int(err) >> ErrorBits.OVERHEAT) & 1),
-                error_mains=bool((int(err) >> ErrorBits.MAINS_MONITOR) & 1),
-            )
+                regs = self.read_coil_states()
+        except Exception:
+            regs = None
+        if regs is None:
+            return False
+        self._image[name] = list(regs[:count])
+        return True
+
+    def _read_measurements_legacy(self) -> Optional[Measurements]:
+        """
+        Поштучный путь для приборов, не отдающих окно снимка целиком: input — блоками профиля,
+        что не прочиталось — по регистру; holding — по регистру. Необязательное поле (optional)
+        без ответа — None в Measurements, обязательное — отказ всего снимка.
+        """
+        try:
+            missing: set = set()
+            windows = []
+            for table in ("input", "holding"):
+                window = self._legacy_window(table, missing) if table in self.profile.windows else []
+                if window is None:
+                    return None
+                windows.append(window)
+            meas = self._decode_buffers(*windows)
+            for name in missing:
+                setattr(meas, name, None)
+            return meas
         except Exception:
             return None
 
+    def _legacy_window(self, table: str, missing: set) -> Optional[List]:
+        start, count = self.profile.windows[table]
+        window: List = [None] * count
+        if table == "input":
+            for kind, a, n in self.profile.blocks.values():
+                if kind == "input":
+                    regs = self._read_cached(a, n)
+                    if regs is not None:
+                        window[a - start:a - start + n] = regs[:n]
+        # чего нет — по одному регистру (как старый поштучный путь: А·ч — двумя чтениями)
+        for spec in self.profile.fields_of(table):
+            o = spec.address - start
+            for k in range(o, o + spec.width):
+                if window[k] is not None:
+                    continue
+                if table == "input":
+                    window[k] = self._read_single_smart(start + k)
+                else:
+                    regs = self._read_hold_mode(holding_reg(start + k), 1)
+                    window[k] = regs[0] if regs is not None else None
+            if None in window[o:o + spec.width]:
+                if not spec.optional:
+                    return None
+                missing.add(spec.name)
+                window[o:o + spec.width] = [0] * spec.width
+        return window
+
     # ---------- Пинг ----------
     def ping(self) -> bool:
         try:
-        # Самый надёжный быстрый ping — одиночное чтение 30001
-            return self._read_single_smart(InputRegs.ERROR_FLAGS) is not None
+            # Самый надёжный быстрый ping — одиночное чтение первого input-регистра (30001)
+            window = self.profile.windows.get("input")
+            if window is None:
+                start = self.profile.windows["holding"][0]
+                return self._read_hold_mode(holding_reg(start), 1) is not None
+            if self._read_single_smart(window[0]) is not None:
+                return True
+            # прибор ответил, но не по этой схеме (перенастроили или схема ещё не найдена) —
+            # полный перебор; молчащий прибор перебирать незачем
+            return self._answered and self.reprobe()
         except:
             return False
+
+    def reprobe(self) -> bool:
+        """
+        Полный перебор схем адресации по первому регистру окна input. Опрос читает только
+        по закэшированной схеме; перебор зовут ping() и потоки опроса после
+        REPROBE_AFTER_MISSES пропусков подряд. Если прибор на последний запрос промолчал,
+        дело не в схеме — перебор (таймаут на каждую) только занял бы линию.
+        """
+        window = self.profile.windows.get("input")
+        if window is None or not self._answered:
+            return False
+        try:
+            return self._read_block_smart(window[0], 1) is not None
+        except Exception:
+            return False
@@ -0,0 +1,254 @@
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Optional, Dict, Any, List, Callable
+from PySide6.QtCore import QObject, Signal, QThread
+
+from app.modbus.async_driver import AsyncSourceDriver
+from app.modbus.driver import REPROBE_AFTER_MISSES
+from app.modbus.client_factory import create_async_client, endpoint_key
+from app.modbus.connection_service import (
+    LINK_OK, LINK_DEGRADED, LINK_LOST, LINK_RECONNECTING, LINK_RESTORED,
+)
+
+
+@dataclass
+class FleetSource:
+    """
+    Один источник парка. settings — как у профиля подключения (port/baudrate/... или host/port)
+    плюс unit_id; источники с одним портом/шлюзом делят одного клиента.
+    """
+    source_id: str
+    conn_type: str                  # "RTU" | "TCP"
+    settings: Dict[str, Any] = field(default_factory=dict)
+    interval_ms: int = 500
+    addressing: Optional[Dict[str, Any]] = None
+
+
+class _Endpoint:
+    """Общий async-клиент физического канала и всё, что его сериализует."""
+    def __init__(self, client):
+        self.client = client
+        self.lock = asyncio.Lock()            # один запрос за раз на канал
+        self.reconnect_lock = asyncio.Lock()  # переподключает одна задача, остальные ждут
+        self.generation = 0                   # +1 на каждое удачное переподключение
+        self.last_ok = 0.0                    # когда любой источник канала последний раз ответил
+        self.refs = 0
+
+
+class _LoopThread(QThread):
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        super().__init__()
+        self.loop = loop
+
+    def run(self):
+        print("[Fleet] loop started")
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+        print("[Fleet] loop stopped")
+
+
+class FleetPoller(QObject):
+    """
+    Опрос многих источников на одном event loop в одном рабочем потоке — вместо
+    ConnectionService (QThread) на каждый. На каждый источник — одна корутина с фиксированной
+    сеткой дедлайнов, бюджетом сбоев и переподключением канала с экспоненциальной задержкой.
+    Результаты — сигналами (source_id, ...), если передан store — прямо в AppStore.
+    """
+    measurements = Signal(str, object)
+    linkChanged = Signal(str, object)
+
+    def __init__(self, store=None, parent: Optional[QObject] = None, max_failures: int = 3,
+                 reconnect_base_s: float = 0.5, reconnect_max_s: float = 30.0):
+        super().__init__(parent)
+        self.max_failures = max(1, int(max_failures))
+        self.reconnect_base_s = max(0.05, float(reconnect_base_s))
+        self.reconnect_max_s = max(self.reconnect_base_s, float(reconnect_max_s))
+        self._sources: Dict[str, FleetSource] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[_LoopThread] = None
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._endpoints: Dict[tuple, _Endpoint] = {}
+        # вызывается из потока опроса при смене схемы адресации источника
+        self.addressing_cb: Optional[Callable[[str, Dict[str, Any]], None]] = None
+        # вызывается из потока опроса на каждый отсчёт, до сигнала (например, TelemetryWriter.submit)
+        self.measurements_cb: Optional[Callable[[str, Any], None]] = None
+        if store is not None:
+            self.measurements.connect(store.set_source_measurements)
+            self.linkChanged.connect(store.set_source_link)
+
+    # ---------- публичный API (GUI-поток) ----------
+    def add_source(self, src: FleetSource):
+        self._sources[src.source_id] = src
+        if self._loop is not None:
+            asyncio.run_coroutine_threadsafe(self._spawn(src), self._loop)
+
+    def remove_source(self, source_id: str):
+        self._sources.pop(source_id, None)
+        if self._loop is not None:
+            asyncio.run_coroutine_threadsafe(self._drop(source_id), self._loop)
+
+    def sources(self) -> List[str]:
+        return list(self._sources)
+
+    def start(self):
+        if self._thread and self._thread.isRunning():
+            print("[Fleet] Already running")
+            return
+        self._loop = asyncio.new_event_loop()
+        self._thread = _LoopThread(self._loop)
+        self._thread.start()
+        for src in list(self._sources.values()):
+            asyncio.run_coroutine_threadsafe(self._spawn(src), self._loop)
+
+    def stop(self):
+        if self._loop is None:
+            return
+        print("[Fleet] Stopping...")
+        try:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result(timeout=3.0)
+        except Exception as e:
+            print(f"[Fleet] shutdown: {e}")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        if self._thread:
+            self._thread.wait(1500)
+        self._loop.close()
+        self._loop = None
+        self._thread = None
+
+    # ---------- внутри event loop ----------
+    async def _spawn(self, src: FleetSource):
+        if src.source_id in self._tasks:
+            return
+        key = endpoint_key(src.conn_type, src.settings)
+        ep = self._endpoints.get(key)
+        if ep is None:
+            ep = self._endpoints[key] = _Endpoint(create_async_client(src.conn_type, src.settings))
+        ep.refs += 1
+        self._tasks[src.source_id] = asyncio.get_running_loop().create_task(self._run_source(src, key, ep))
+
+    async def _drop(self, source_id: str):
+        task = self._tasks.pop(source_id, None)
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def _shutdown(self):
+        tasks = list(self._tasks.values())
+        self._tasks.clear()
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for ep in self._endpoints.values():
+            try:
+                ep.client.close()
+            except Exception:
+                pass
+        self._endpoints.clear()
+
+    def _release(self, key: tuple, ep: _Endpoint):
+        ep.refs -= 1
+        if ep.refs <= 0 and self._endpoints.get(key) is ep:
+            del self._endpoints[key]
+            try:
+                ep.client.close()
+            except Exception:
+                pass
+
+    async def _run_source(self, src: FleetSource, key: tuple, ep: _Endpoint):
+        sid = src.source_id
+        driver = AsyncSourceDriver(ep.client, unit_id=int(src.settings.get("unit_id", 1)),
+                                   addressing=src.addressing, lock=ep.lock,
+                                   profile=src.settings.get("device_model"))
+        if callable(self.addressing_cb):
+            driver.addressing_cb = lambda scheme, sid=sid: self.addressing_cb(sid, scheme)
+        period = max(10, int(src.interval_ms)) / 1000.0
+        failures = 0
+        try:
+            if not getattr(ep.client, "connected", False):
+                await self._reconnect(sid, ep, driver, ep.generation, time.monotonic())
+            due = time.monotonic()
+            wall0 = time.time() - due
+            while True:
+                delay = due - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                gen = ep.generation
+                meas = await driver.read_measurements()
+                if meas is not None:
+                    ep.last_ok = time.monotonic()
+                    if failures:
+                        failures = 0
+                        self._link(sid, LINK_OK)
+                    # метка — дедлайн цикла, как в ConnectionService
+                    meas.timestamp = wall0 + due
+                    if self.measurements_cb is not None:
+                        try:
+                            self.measurements_cb(sid, meas)
+                        except Exception as e:
+                            print(f"[Fleet] measurements_cb failed for {sid}: {e}")
+                    self.measurements.emit(sid, meas)
+                else:
+                    failures += 1
+                    if failures == REPROBE_AFTER_MISSES and failures < self.max_failures:
+                        await driver.reprobe()
+                    if failures < self.max_failures:
+                        self._link(sid, LINK_DEGRADED, failures=failures)
+                    else:
+                        self._link(sid, LINK_LOST, failures=failures)
+                        await self._reconnect(sid, ep, driver, gen, time.monotonic())
+                        failures = 0
+                        due = time.monotonic()
+                        wall0 = time.time() - due
+                        continue
+                due += period
+                now = time.monotonic()
+                if now >= due:
+                    # не уложились — пропускаем просроченные дедлайны, сохраняя сетку
+                    due += (int((now - due) // period) + 1) * period
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._release(key, ep)
+
+    async def _reconnect(self, sid: str, ep: _Endpoint, driver: AsyncSourceDriver, gen: int, since: float):
+        """
+        Переподключение с экспоненциальной задержкой и джиттером. Канал переоткрывается, только
+        если он закрыт или с момента since не ответил ни один его источник (иначе молчит только
+        наш прибор, и рвать соседям общий порт незачем). Если канал уже переподключила другая
+        задача — только проверяем свой источник.
+        """
+        attempt = 0
+        while True:
+            async with ep.reconnect_lock:
+                connected = getattr(ep.client, "connected", False)
+                if ep.generation == gen and (not connected or ep.last_ok < since):
+                    try:
+                        ep.client.close()
+                    except Exception:
+                        pass
+                    try:
+                        ok = bool(await ep.client.connect())
+                    except Exception:
+                        ok = False
+                    if ok:
+                        ep.generation += 1
+                gen = ep.generation
+                since = time.monotonic()
+            if getattr(ep.client, "connected", True) and await driver.ping():
+                ep.last_ok = time.monotonic()
+                self._link(sid, LINK_RESTORED, attempt=attempt)
+                return
+            delay = min(self.reconnect_max_s, self.reconnect_base_s * (2 ** min(attempt, 16)))
+            delay *= random.uniform(0.5, 1.0)
+            attempt += 1
+            self._link(sid, LINK_RECONNECTING, attempt=attempt, delay_s=round(delay, 2))
+            await asyncio.sleep(delay)
+
+    def _link(self, sid: str, state: str, **extra):
+        info = {"state": state}
+        info.update(extra)
+        self.linkChanged.emit(sid, info)
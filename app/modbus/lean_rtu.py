@@ -0,0 +1,246 @@
+from __future__ import annotations
+
+import struct
+import time
+from typing import Optional, Dict, Tuple
+
+import serial
+
+from .pipelined_tcp import (
+    ModbusResponse, FC_READ_COILS, FC_READ_HOLDING, FC_READ_INPUT,
+    FC_WRITE_COIL, FC_WRITE_REGISTER, FC_WRITE_COILS, FC_WRITE_REGISTERS,
+)
+from .serial_line import interframe_silence
+
+
+def _crc_table() -> Tuple[int, ...]:
+    table = []
+    for b in range(256):
+        crc = b
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0xA001 if crc & 1 else crc >> 1
+        table.append(crc)
+    return tuple(table)
+
+
+_CRC_TABLE = _crc_table()
+
+
+def crc16(data, length: Optional[int] = None) -> int:
+    """CRC-16/MODBUS по таблице (байт за шаг вместо 8 сдвигов)."""
+    crc = 0xFFFF
+    tbl = _CRC_TABLE
+    for i in range(len(data) if length is None else length):
+        crc = (crc >> 8) ^ tbl[(crc ^ data[i]) & 0xFF]
+    return crc
+
+
+_REQ = struct.Struct(">BBHH")      # unit, fc, адрес, count | значение
+_REQ_MULTI = struct.Struct(">BBHHB")
+_CRC = struct.Struct("<H")         # CRC передаётся младшим байтом вперёд
+_MAX_ADU = 256
+_MIN_RESPONSE = 5                  # unit, fc, байт, CRC — короче кадра не бывает
+_REGS: Dict[int, struct.Struct] = {}
+
+
+def _regs_struct(count: int) -> struct.Struct:
+    st = _REGS.get(count)
+    if st is None:
+        st = _REGS[count] = struct.Struct(f">{count}H")
+    return st
+
+
+class LeanRtuClient:
+    """
+    Облегчённый Modbus RTU клиент для тех немногих запросов, что делает SourceDriver
+    (FC01/03/04/05/06/15/16), прямо поверх pyserial — без фреймера pymodbus.
+    Кадры чтения строятся один раз и кэшируются по (unit, fc, адрес, count) вместе с CRC;
+    ответ читается в заранее выделенный bytearray и разбирается struct-ом прямо из
+    memoryview. CRC — по таблице. Между кадрами выдерживается t3.5.
+    Методы read_*/write_* совместимы с ModbusSerialClient (slave= — адрес ведомого).
+    """
+    def __init__(self, port: str, baudrate: int = 9600, parity: str = "N", stopbits=serial.STOPBITS_ONE,
+                 bytesize: int = 8, timeout: float = 1.0, unit_id: int = 1, port_factory=None):
+        self.port = port
+        self.baudrate = int(baudrate)
+        self.parity = parity
+        self.stopbits = stopbits
+        self.bytesize = bytesize
+        self.timeout = float(timeout)
+        self.unit_id = int(unit_id)
+        self.silence = interframe_silence(self.baudrate)
+        # port_factory() -> объект с интерфейсом serial.Serial (подмена порта в бенчмарке)
+        self._port_factory = port_factory
+        self._serial = None
+        self._frames: Dict[tuple, bytes] = {}
+        self._tx = bytearray(_MAX_ADU)
+        self._rx = bytearray(_MAX_ADU)
+        self._rxv = memoryview(self._rx)
+        self._last_end = 0.0
+
+    @property
+    def unit(self) -> int:
+        return self.unit_id
+
+    @unit.setter
+    def unit(self, value: int):
+        self.unit_id = int(value)
+
+    slave = unit
+
+    # ---------- соединение ----------
+    @property
+    def connected(self) -> bool:
+        return self._serial is not None and bool(getattr(self._serial, "is_open", True))
+
+    @property
+    def socket(self):
+        # apply_timeout() выставляет таймаут ответа прямо порту
+        return self._serial
+
+    def connect(self) -> bool:
+        if self.connected:
+            return True
+        try:
+            if self._port_factory is not None:
+                self._serial = self._port_factory()
+            else:
+                self._serial = serial.Serial(port=self.port, baudrate=self.baudrate, parity=self.parity,
+                                             stopbits=self.stopbits, bytesize=self.bytesize, timeout=self.timeout)
+        except (serial.SerialException, OSError, ValueError) as e:
+            print(f"[LeanRtu] open {self.port} failed: {e}")
+            self._serial = None
+            return False
+        return True
+
+    def close(self):
+        port, self._serial = self._serial, None
+        if port is not None:
+            try:
+                port.close()
+            except Exception:
+                pass
+
+    # ---------- кадры ----------
+    def _read_frame(self, unit: int, fc: int, address: int, count: int) -> bytes:
+        key = (unit, fc, address, count)
+        frame = self._frames.get(key)
+        if frame is None:
+            body = _REQ.pack(unit, fc, address, count)
+            frame = self._frames[key] = body + _CRC.pack(crc16(body))
+        return frame
+
+    def _write_frame(self, unit: int, fc: int, address: int, arg) -> memoryview:
+        tx = self._tx
+        if fc in (FC_WRITE_COIL, FC_WRITE_REGISTER):
+            _REQ.pack_into(tx, 0, unit, fc, address, arg)
+            n = _REQ.size
+        elif fc == FC_WRITE_REGISTERS:
+            values = [int(v) & 0xFFFF for v in arg]
+            _REQ_MULTI.pack_into(tx, 0, unit, fc, address, len(values), 2 * len(values))
+            _regs_struct(len(values)).pack_into(tx, _REQ_MULTI.size, *values)
+            n = _REQ_MULTI.size + 2 * len(values)
+        else:  # FC_WRITE_COILS
+            values = [bool(v) for v in arg]
+            nbytes = (len(values) + 7) // 8
+            _REQ_MULTI.pack_into(tx, 0, unit, fc, address, len(values), nbytes)
+            for i in range(nbytes):
+                tx[_REQ_MULTI.size + i] = 0
+            for i, v in enumerate(values):
+                if v:
+                    tx[_REQ_MULTI.size + i // 8] |= 1 << (i % 8)
+            n = _REQ_MULTI.size + nbytes
+        _CRC.pack_into(tx, n, crc16(tx, n))
+        return memoryview(tx)[:n + 2]
+
+    def _read_exact(self, start: int, n: int) -> bool:
+        view = self._rxv
+        got = start
+        end = start + n
+        port = self._serial
+        while got < end:
+            k = port.readinto(view[got:end])
+            if not k:
+                return False    # таймаут порта
+            got += k
+        return True
+
+    def _transact(self, frame, unit: int, fc: int, expect: int) -> Optional[ModbusResponse]:
+        """Отправить кадр, принять ответ длиной expect (или 5 байт исключения) в self._rx."""
+        if self._serial is None and not self.connect():
+            return None
+        port = self._serial
+        gap = self._last_end + self.silence - time.monotonic()
+        if gap > 0:
+            time.sleep(gap)
+        try:
+            if port.in_waiting:
+                port.reset_input_buffer()   # хвост прошлого (опоздавшего) ответа
+            port.write(frame)
+            ok = self._read_exact(0, _MIN_RESPONSE)
+            rx = self._rx
+            if ok and rx[1] == (fc | 0x80):
+                n = _MIN_RESPONSE
+            else:
+                n = expect
+                ok = ok and self._read_exact(_MIN_RESPONSE, expect - _MIN_RESPONSE)
+        except (serial.SerialException, OSError) as e:
+            print(f"[LeanRtu] {e}")
+            self.close()
+            return None
+        finally:
+            self._last_end = time.monotonic()
+        if not ok or rx[0] != unit or (rx[1] & 0x7F) != fc:
+            return None
+        if _CRC.unpack_from(rx, n - 2)[0] != crc16(rx, n - 2):
+            return None
+        if rx[1] & 0x80:
+            return ModbusResponse(rx[1], exception_code=rx[2])
+        return self._decode(fc, n)
+
+    def _decode(self, fc: int, n: int) -> Optional[ModbusResponse]:
+        rx = self._rx
+        if fc in (FC_READ_COILS, FC_READ_HOLDING, FC_READ_INPUT) and rx[2] != n - 5:
+            return None     # счётчик байт не тот, что запрошен: чужой или битый кадр
+        if fc in (FC_READ_HOLDING, FC_READ_INPUT):
+            count = rx[2] // 2
+            return ModbusResponse(fc, registers=list(_regs_struct(count).unpack_from(rx, 3)))
+        if fc == FC_READ_COILS:
+            bits = []
+            for b in self._rxv[3:3 + rx[2]]:
+                bits.extend(bool((b >> i) & 1) for i in range(8))
+            return ModbusResponse(fc, bits=bits)
+        return ModbusResponse(fc, address=(rx[2] << 8) | rx[3])
+
+    def _read(self, fc: int, address: int, count: int, slave: Optional[int]) -> Optional[ModbusResponse]:
+        unit = self.unit_id if slave is None else int(slave)
+        count = int(count)
+        nbytes = (count + 7) // 8 if fc == FC_READ_COILS else 2 * count
+        return self._transact(self._read_frame(unit, fc, int(address), count), unit, fc, 3 + nbytes + 2)
+
+    def _write(self, fc: int, address: int, arg, slave: Optional[int]) -> Optional[ModbusResponse]:
+        unit = self.unit_id if slave is None else int(slave)
+        # ответ на запись — всегда 8 байт (эхо адреса и значения/количества)
+        return self._transact(self._write_frame(unit, fc, int(address), arg), unit, fc, 8)
+
+    # ---------- API как у ModbusSerialClient ----------
+    def read_coils(self, address: int, count: int = 1, slave: Optional[int] = None):
+        return self._read(FC_READ_COILS, address, count, slave)
+
+    def read_holding_registers(self, address: int, count: int = 1, slave: Optional[int] = None):
+        return self._read(FC_READ_HOLDING, address, count, slave)
+
+    def read_input_registers(self, address: int, count: int = 1, slave: Optional[int] = None):
+        return self._read(FC_READ_INPUT, address, count, slave)
+
+    def write_coil(self, address: int, value: bool, slave: Optional[int] = None):
+        return self._write(FC_WRITE_COIL, address, 0xFF00 if value else 0x0000, slave)
+
+    def write_register(self, address: int, value: int, slave: Optional[int] = None):
+        return self._write(FC_WRITE_REGISTER, address, int(value) & 0xFFFF, slave)
+
+    def write_coils(self, address: int, values, slave: Optional[int] = None):
+        return self._write(FC_WRITE_COILS, address, list(values), slave)
+
+    def write_registers(self, address: int, values, slave: Optional[int] = None):
+        return self._write(FC_WRITE_REGISTERS, address, list(values), slave)
@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import socket
+import struct
+import time
+from typing import Optional, List, Dict, Tuple, Sequence
+
+# Коды функций, которые использует драйвер
+FC_READ_COILS = 0x01
+FC_READ_HOLDING = 0x03
+FC_READ_INPUT = 0x04
+FC_WRITE_COIL = 0x05
+FC_WRITE_REGISTER = 0x06
+FC_WRITE_COILS = 0x0F
+FC_WRITE_REGISTERS = 0x10
+
+_MBAP = struct.Struct(">HHHB")   # transaction id, protocol id (0), длина (unit + PDU), unit id
+_MAX_IN_FLIGHT = 16
+
+# Запрос конвейера: (код функции, адрес, count | значение | список значений, unit id или None)
+Request = Tuple[int, int, object, Optional[int]]
+
+
+class ModbusResponse:
+    """Ответ в той же форме, что у pymodbus: isError(), registers, bits."""
+    __slots__ = ("function_code", "exception_code", "registers", "bits", "address")
+
+    def __init__(self, function_code: int, exception_code: int = 0, registers=None, bits=None, address=None):
+        self.function_code = function_code
+        self.exception_code = exception_code
+        self.registers: List[int] = registers or []
+        self.bits: List[bool] = bits or []
+        self.address = address
+
+    def isError(self) -> bool:
+        return bool(self.exception_code) or self.function_code >= 0x80
+
+    def __repr__(self):
+        if self.isError():
+            return f"ModbusResponse(fc={self.function_code:#x}, exception={self.exception_code})"
+        return f"ModbusResponse(fc={self.function_code}, registers={self.registers}, bits={self.bits})"
+
+
+def _encode_pdu(fc: int, address: int, arg) -> bytes:
+    if fc in (FC_READ_COILS, FC_READ_HOLDING, FC_READ_INPUT):
+        return struct.pack(">BHH", fc, address, int(arg))
+    if fc == FC_WRITE_COIL:
+        return struct.pack(">BHH", fc, address, 0xFF00 if arg else 0x0000)
+    if fc == FC_WRITE_REGISTER:
+        return struct.pack(">BHH", fc, address, int(arg) & 0xFFFF)
+    if fc == FC_WRITE_COILS:
+        values = [bool(v) for v in arg]
+        packed = bytearray((len(values) + 7) // 8)
+        for i, v in enumerate(values):
+            if v:
+                packed[i // 8] |= 1 << (i % 8)
+        return struct.pack(">BHHB", fc, address, len(values), len(packed)) + bytes(packed)
+    if fc == FC_WRITE_REGISTERS:
+        values = [int(v) & 0xFFFF for v in arg]
+        return struct.pack(">BHHB", fc, address, len(values), 2 * len(values)) + struct.pack(f">{len(values)}H", *values)
+    raise ValueError(f"Функция {fc} не поддерживается")
+
+
+def _decode_pdu(pdu: bytes) -> ModbusResponse:
+    fc = pdu[0]
+    if fc & 0x80:
+        return ModbusResponse(fc, exception_code=pdu[1] if len(pdu) > 1 else 0xFF)
+    if fc in (FC_READ_COILS,):
+        n = pdu[1]
+        bits = [bool((b >> i) & 1) for b in pdu[2:2 + n] for i in range(8)]
+        return ModbusResponse(fc, bits=bits)
+    if fc in (FC_READ_HOLDING, FC_READ_INPUT):
+        n = pdu[1] // 2
+        return ModbusResponse(fc, registers=list(struct.unpack_from(f">{n}H", pdu, 2)))
+    # запись: эхо адреса
+    address = struct.unpack_from(">H", pdu, 1)[0] if len(pdu) >= 3 else None
+    return ModbusResponse(fc, address=address)
+
+
+class PipelinedTcpClient:
+    """
+    Синхронный Modbus TCP клиент с конвейером: до max_in_flight запросов уходят в сокет,
+    не дожидаясь ответов, ответы сопоставляются по transaction id (в т.ч. от разных unit id
+    за одним шлюзом). Время пачки ≈ самый медленный ответ, а не сумма RTT.
+    Методы read_*/write_* совместимы с тем, что SourceDriver вызывает у ModbusTcpClient;
+    execute_many() — конвейер целиком.
+    max_in_flight=1 — обычный Modbus TCP «запрос — ответ».
+    """
+    def __init__(self, host: str, port: int = 502, timeout: float = 2.0, max_in_flight: int = 4, unit_id: int = 1):
+        self.host = host
+        self.port = int(port)
+        self.timeout = float(timeout)
+        self.max_in_flight = max(1, min(_MAX_IN_FLIGHT, int(max_in_flight)))
+        self.unit_id = int(unit_id)
+        self._sock: Optional[socket.socket] = None
+        self._rx = bytearray()
+        self._tid = 0
+        # RTT каждого запроса последней пачки (None — ответа не было)
+        self.last_rtts: List[Optional[float]] = []
+
+    # SourceDriver проставляет адрес ведомого атрибутами unit_id / unit / slave
+    @property
+    def unit(self) -> int:
+        return self.unit_id
+
+    @unit.setter
+    def unit(self, value: int):
+        self.unit_id = int(value)
+
+    slave = unit
+
+    # ---------- соединение ----------
+    @property
+    def connected(self) -> bool:
+        return self._sock is not None
+
+    def connect(self) -> bool:
+        if self._sock is not None:
+            return True
+        try:
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        except OSError as e:
+            print(f"[PipelinedTcp] connect {self.host}:{self.port} failed: {e}")
+            return False
+        self._sock = sock
+        self._rx.clear()
+        return True
+
+    def close(self):
+        sock, self._sock = self._sock, None
+        self._rx.clear()
+        if sock is not None:
+            try:
+                sock.close()
+            except OSError:
+                pass
+
+    # ---------- конвейер ----------
+    def _next_tid(self) -> int:
+        self._tid = (self._tid + 1) & 0xFFFF
+        return self._tid
+
+    def execute_many(self, requests: Sequence[Request]) -> List[Optional[ModbusResponse]]:
+        """
+        Выполнить пачку запросов, держа в полёте не больше max_in_flight.
+        Результат — по позиции запроса; None — нет ответа за timeout (или сокет упал).
+        Опоздавшие ответы прошлых пачек отбрасываются по transaction id.
+        """
+        results: List[Optional[ModbusResponse]] = [None] * len(requests)
+        self.last_rtts = rtts = [None] * len(requests)
+        if not requests or (self._sock is None and not self.connect()):
+            return results
+        pending: Dict[int, int] = {}   # tid -> индекс запроса
+        sent_at: List[float] = [0.0] * len(requests)
+        next_i = 0
+        deadline = time.monotonic() + self.timeout
+        try:
+            while next_i < len(requests) or pending:
+                # дослать, пока есть место в окне
+                frames = []
+                while next_i < len(requests) and len(pending) < self.max_in_flight:
+                    fc, address, arg, unit = requests[next_i]
+                    pdu = _encode_pdu(fc, address, arg)
+                    tid = self._next_tid()
+                    frames.append(_MBAP.pack(tid, 0, len(pdu) + 1, self.unit_id if unit is None else int(unit)) + pdu)
+                    pending[tid] = next_i
+                    next_i += 1
+                if frames:
+                    self._sock.sendall(b"".join(frames))
+                    now = time.monotonic()
+                    for i in range(next_i - len(frames), next_i):
+                        sent_at[i] = now
+                    # таймаут считается от последней отправки — длинная пачка не «съедает» его
+                    deadline = now + self.timeout
+
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    break
+                self._sock.settimeout(left)
+                chunk = self._sock.recv(4096)
+                if not chunk:
+                    raise OSError("соединение закрыто устройством")
+                self._rx += chunk
+                now = time.monotonic()
+                for tid, pdu in self._frames():
+                    i = pending.pop(tid, None)
+                    if i is not None:
+                        results[i] = _decode_pdu(pdu)
+                        rtts[i] = now - sent_at[i]
+        except socket.timeout:
+            pass
+        except (OSError, ValueError, struct.error) as e:
+            print(f"[PipelinedTcp] {e}")
+            self.close()
+        return results
+
+    def _frames(self):
+        """Вынуть из буфера все целые кадры MBAP."""
+        while len(self._rx) >= _MBAP.size:
+            tid, pid, length, _unit = _MBAP.unpack_from(self._rx, 0)
+            end = 6 + length
+            if pid != 0 or length < 2:
+                # поток рассинхронизирован — начать заново
+                raise ValueError("битый заголовок MBAP")
+            if len(self._rx) < end:
+                return
+            pdu = bytes(self._rx[_MBAP.size:end])
+            del self._rx[:end]
+            yield tid, pdu
+
+    def _one(self, fc: int, address: int, arg, slave: Optional[int]) -> Optional[ModbusResponse]:
+        return self.execute_many([(fc, int(address), arg, slave)])[0]
+
+    # ---------- API как у ModbusTcpClient (slave= — адрес ведомого на этот запрос) ----------
+    def read_coils(self, address: int, count: int = 1, slave: Optional[int] = None):
+        return self._one(FC_READ_COILS, address, count, slave)
+
+    def read_holding_registers(self, address: int, count: int = 1, slave: Optional[int] = None):
+        return self._one(FC_READ_HOLDING, address, count, slave)
+
+    def read_input_registers(self, address: int, count: int = 1, slave: Optional[int] = None):
+        return self._one(FC_READ_INPUT, address, count, slave)
+
+    def write_coil(self, address: int, value: bool, slave: Optional[int] = None):
+        return self._one(FC_WRITE_COIL, address, bool(value), slave)
+
+    def write_register(self, address: int, value: int, slave: Optional[int] = None):
+        return self._one(FC_WRITE_REGISTER, address, int(value), slave)
+
+    def write_coils(self, address: int, values, slave: Optional[int] = None):
+        return self._one(FC_WRITE_COILS, address, list(values), slave)
+
+    def write_registers(self, address: int, values, slave: Optional[int] = None):
+        return self._one(FC_WRITE_REGISTERS, address, list(values), slave)
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import atexit
+import multiprocessing as mp
+from dataclasses import dataclass, field
+from multiprocessing import shared_memory
+from typing import Optional, Dict, Any, List
+
+from .bus_worker import run_bus_worker
+from .shm_ring import ring_size, init_ring, RingReader
+
+
+@dataclass
+class BusSpec:
+    """
+    Одна физическая линия (порт RS-485 или шлюз) со своими приборами.
+    settings — как у профиля подключения; unit_ids — адреса приборов на линии.
+    """
+    bus_id: str
+    conn_type: str                      # "RTU" | "TCP"
+    settings: Dict[str, Any] = field(default_factory=dict)
+    unit_ids: List[int] = field(default_factory=lambda: [1])
+    interval_ms: int = 250
+    addressing: Optional[Dict[str, Any]] = None
+    max_failures: int = 3
+    slots: int = 1024                   # ёмкость кольца (записей)
+    device_model: Optional[Any] = None  # имя модели или словарь профиля (device_profiles)
+
+
+class _BusProcess:
+    __slots__ = ("spec", "shm", "reader", "process")
+
+    def __init__(self, spec: BusSpec, shm: shared_memory.SharedMemory, reader: RingReader, process):
+        self.spec = spec
+        self.shm = shm
+        self.reader = reader
+        self.process = process
+
+
+class BusProcessPool:
+    """
+    Опрос линий в отдельных процессах — по процессу на линию, со своим GIL: работа GUI
+    и соседних линий не добавляет джиттер опросу. Процесс публикует декодированные
+    Measurements в кольцо в разделяемой памяти; AppStore забирает их таймером из GUI-потока
+    (attach_ring) — без pickle и очередей. Источник в AppStore — "<bus_id>:<unit_id>".
+    Процессы только читают: команды и уставки по-прежнему идут через ConnectionService.
+    """
+    def __init__(self, store=None):
+        self.store = store
+        self._specs: Dict[str, BusSpec] = {}
+        self._buses: Dict[str, _BusProcess] = {}
+        self._ctx = mp.get_context("spawn")   # без fork: в дочернем процессе не должно быть Qt
+        self._stop = None
+        self._atexit = False
+
+    def add_bus(self, spec: BusSpec):
+        self._specs[spec.bus_id] = spec
+
+    def buses(self) -> List[str]:
+        return list(self._specs)
+
+    def start(self):
+        if self._buses:
+            print("[BusPool] Already running")
+            return
+        self._stop = self._ctx.Event()
+        if not self._atexit:
+            # процессы и сегменты памяти не должны пережить приложение
+            atexit.register(self.stop)
+            self._atexit = True
+        for spec in self._specs.values():
+            try:
+                self._start_bus(spec)
+            except Exception as e:
+                print(f"[BusPool] {spec.bus_id}: не удалось запустить процесс: {e}")
+
+    def _start_bus(self, spec: BusSpec):
+        nslots = max(16, int(spec.slots))
+        shm = shared_memory.SharedMemory(create=True, size=ring_size(nslots))
+        init_ring(shm.buf, nslots)
+        worker_spec = {
+            "bus_id": spec.bus_id,
+            "conn_type": spec.conn_type,
+            "settings": dict(spec.settings),
+            "unit_ids": [int(u) for u in spec.unit_ids],
+            "interval_ms": int(spec.interval_ms),
+            "addressing": spec.addressing,
+            "max_failures": int(spec.max_failures),
+            # словарь профиля передаётся как есть — в дочернем процессе он компилируется заново
+            "device_model": spec.device_model,
+        }
+        proc = self._ctx.Process(target=run_bus_worker, args=(worker_spec, shm.name, self._stop),
+                                 name=f"modbus-bus-{spec.bus_id}", daemon=True)
+        proc.start()
+        reader = RingReader(shm.buf)
+        self._buses[spec.bus_id] = _BusProcess(spec, shm, reader, proc)
+        if self.store is not None:
+            self.store.attach_ring(spec.bus_id, reader)
+        print(f"[BusPool] {spec.bus_id}: pid={proc.pid}, units={list(spec.unit_ids)}")
+
+    def alive(self) -> Dict[str, bool]:
+        return {bid: b.process.is_alive() for bid, b in self._buses.items()}
+
+    def stats(self) -> List[dict]:
+        return [{
+            "bus_id": bid,
+            "pid": b.process.pid,
+            "alive": b.process.is_alive(),
+            "published": b.reader.pos,
+            "dropped": b.reader.dropped,
+        } for bid, b in self._buses.items()]
+
+    def stop(self):
+        if not self._buses:
+            return
+        print("[BusPool] Stopping...")
+        if self._stop is not None:
+            self._stop.set()
+        buses, self._buses = self._buses, {}
+        for bid, b in buses.items():
+            b.process.join(3.0)
+            if b.process.is_alive():
+                b.process.terminate()
+                b.process.join(1.0)
+            if self.store is not None:
+                self.store.detach_ring(bid)
+            b.reader = None
+            try:
+                b.shm.close()
+                b.shm.unlink()
+            except Exception as e:
+                print(f"[BusPool] {bid}: {e}")
@@ -50,6 +50,18 @@ def holding_reg(addr_1based: int) -> int:
 def u32_from_words(hi: int, lo: int) -> int:
     return ((hi & 0xFFFF) << 16) | (lo & 0xFFFF)
 
+@dataclass
+class Setpoints:
+    """Рабочая точка (сырые значения 40002–40004) — пишется одним FC16."""
+    current: int
+    voltage: int
+    revers: int
+
+    def as_registers(self) -> list[int]:
+        # порядок = порядок адресов 40002, 40003, 40004
+        return [int(self.current), int(self.voltage), int(self.revers)]
+
+
 @dataclass
 class Measurements:
     current: float
@@ -63,3 +75,10 @@ class Measurements:
     errors_raw: int
     error_overheat: bool
     error_mains: bool
+    revers: int | None = None  # 40004, есть только в режиме снимка
+    # Coils 00001–00005 — читаются тем же циклом опроса одним FC01 (None — не прочитались)
+    device_on: bool | None = None
+    inverter_on: bool | None = None
+    control_locked: bool | None = None
+    control_external: bool | None = None
+    timestamp: float = 0.0  # time.time() запланированного момента опроса (0 — не задан)
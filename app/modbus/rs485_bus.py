@@ -0,0 +1,418 @@
+from __future__ import annotations
+
+import contextlib
+import heapq
+import itertools
+import random
+import threading
+import time
+from concurrent.futures import Future
+from typing import Optional, Callable, Any, List, Dict
+from PySide6.QtCore import QObject, Signal, QThread
+
+from app.modbus.driver import SourceDriver, REPROBE_AFTER_MISSES
+from app.modbus.serial_line import SilentBusClient
+from app.modbus.rtt import TimeoutTuner
+from app.modbus.connection_service import (
+    _Command, PRIO_SAFETY, PRIO_WRITE, MAX_PENDING, STATS_INTERVAL_S,
+    LINK_OK, LINK_DEGRADED, LINK_LOST, LINK_RECONNECTING, LINK_RESTORED,
+)
+
+# Сколько команд подряд можно выполнить, прежде чем отдать слот опросу
+CMD_BURST = 4
+# Прибор, исчерпавший бюджет сбоев, опрашиваем всё реже — до этого периода
+OFFLINE_RETRY_MAX_S = 30.0
+# Молчат все приборы — переоткрываем порт с экспоненциальной задержкой от этой
+REOPEN_BASE_S = 0.5
+
+
+class UnitStats:
+    """Пропускная способность одного прибора на общей линии."""
+    def __init__(self, unit_id: int, weight: int):
+        self.unit_id = unit_id
+        self.weight = weight
+        self.polls = 0
+        self.failures = 0
+        self.transactions = 0
+        self.busy_s = 0.0       # сколько времени линия была занята этим прибором
+        self.last_ms: Optional[float] = None
+        self._since = time.monotonic()
+
+    def on_poll(self, ok: bool, duration: float, transactions: int):
+        self.polls += 1
+        if not ok:
+            self.failures += 1
+        self.transactions += transactions
+        self.busy_s += duration
+        self.last_ms = duration * 1000.0
+
+    def as_dict(self) -> dict:
+        elapsed = max(1e-6, time.monotonic() - self._since)
+        return {
+            "unit_id": self.unit_id,
+            "weight": self.weight,
+            "polls": self.polls,
+            "failures": self.failures,
+            "polls_per_s": round(self.polls / elapsed, 2),
+            "transactions_per_s": round(self.transactions / elapsed, 2),
+            "bus_share": round(self.busy_s / elapsed, 3),
+            "avg_poll_ms": round(self.busy_s * 1000.0 / self.polls, 1) if self.polls else None,
+            "last_poll_ms": round(self.last_ms, 1) if self.last_ms is not None else None,
+        }
+
+
+class _Unit:
+    __slots__ = ("unit_id", "driver", "weight", "current", "period", "next_due", "failures",
+                 "offline", "retry_s", "stats")
+
+    def __init__(self, unit_id: int, driver: SourceDriver, weight: int, period: float):
+        self.unit_id = unit_id
+        self.driver = driver
+        self.weight = max(1, int(weight))
+        self.current = 0          # текущий вес плавного взвешенного round-robin
+        self.period = period      # не чаще одного опроса за period
+        self.next_due = 0.0
+        self.failures = 0
+        self.offline = False
+        self.retry_s = 0.0
+        self.stats = UnitStats(unit_id, self.weight)
+
+
+class _BusThread(QThread):
+    """
+    Единственный поток линии RS-485: команды (по приоритету) и опрос приборов по очереди.
+    Очередь приборов — плавный взвешенный round-robin (вес 3 — в три раза чаще, без «пачек»),
+    среди тех, чей минимальный период уже прошёл. Прибор, не ответивший max_failures раз
+    подряд, считается выпавшим и опрашивается с растущей паузой, чтобы не съедать линию.
+    Выпали все — переоткрываем порт (_reopen_port).
+    """
+    def __init__(self, units: List[_Unit], max_failures: int = 3):
+        super().__init__()
+        self.units = units
+        self.max_failures = max(1, int(max_failures))
+        self._running = True
+        self._measurements_cb = None   # (unit_id, meas)
+        self._link_cb = None           # (unit_id, info)
+        self._stats_cb = None          # (list[dict])
+        self.bus_client: Optional[SilentBusClient] = None
+        self._cv = threading.Condition()
+        self._heap: List[_Command] = []
+        self._seq = itertools.count()
+        self._drivers = {u.unit_id: u.driver for u in units}
+        self._reopen_attempt = 0
+        self._reopen_due = 0.0
+        self.lock = None    # lock общего клиента (ClientPool), если линия за сетевым преобразователем
+
+    # ---------- очередь команд ----------
+    def submit(self, unit_id: int, fn: Callable[[SourceDriver], Any], priority: int = PRIO_WRITE) -> Future:
+        fut: Future = Future()
+        driver = self._drivers.get(unit_id)
+        with self._cv:
+            if not self._running:
+                fut.set_exception(RuntimeError("Опрос остановлен — команда не отправлена"))
+                return fut
+            if driver is None:
+                fut.set_exception(RuntimeError(f"Прибор {unit_id} не подключён к линии"))
+                return fut
+            if priority > PRIO_SAFETY and len(self._heap) >= MAX_PENDING:
+                fut.set_exception(RuntimeError("Очередь команд переполнена — шина не успевает"))
+                return fut
+            heapq.heappush(self._heap, _Command(priority, next(self._seq), lambda _d, f=fn, d=driver: f(d), fut))
+            self._cv.notify()
+        return fut
+
+    def _pop_command(self, allow_normal: bool) -> Optional[_Command]:
+        with self._cv:
+            if not self._heap:
+                return None
+            if self._heap[0].priority > PRIO_SAFETY and not allow_normal:
+                return None
+            return heapq.heappop(self._heap)
+
+    def _fail_pending(self, reason: str):
+        with self._cv:
+            pending, self._heap = self._heap, []
+        for cmd in pending:
+            if cmd.future.set_running_or_notify_cancel():
+                cmd.future.set_exception(RuntimeError(reason))
+
+    # ---------- выбор прибора ----------
+    def _pick(self, now: float) -> Optional[_Unit]:
+        ready = [u for u in self.units if u.next_due <= now]
+        if not ready:
+            return None
+        total = sum(u.weight for u in ready)
+        for u in ready:
+            u.current += u.weight
+        best = max(ready, key=lambda u: u.current)
+        best.current -= total
+        return best
+
+    # ---------- цикл ----------
+    def run(self):
+        print("[Bus] started")
+        burst = 0
+        next_stats = time.monotonic() + STATS_INTERVAL_S
+        while self._running:
+            cmd = self._pop_command(allow_normal=burst < CMD_BURST)
+            if cmd is not None:
+                burst += 1
+                if cmd.future.set_running_or_notify_cancel():
+                    try:
+                        cmd.future.set_result(cmd.fn(None))
+                    except Exception as e:
+                        cmd.future.set_exception(e)
+                continue
+
+            now = time.monotonic()
+            unit = self._pick(now)
+            if unit is None:
+                burst = 0
+                wake = min(u.next_due for u in self.units) if self.units else now + 0.5
+                with self._cv:
+                    if self._running and not self._heap:
+                        self._cv.wait(max(0.0, wake - now))
+                continue
+
+            burst = 0
+            self._poll(unit, now)
+            if time.monotonic() >= next_stats:
+                next_stats = time.monotonic() + STATS_INTERVAL_S
+                if callable(self._stats_cb):
+                    try:
+                        self._stats_cb(self.stats_snapshot())
+                    except Exception:
+                        pass
+
+        self._fail_pending("Опрос остановлен — команда не выполнена")
+        print("[Bus] stopped")
+
+    def _poll(self, unit: _Unit, now: float):
+        tx0 = self.bus_client.transactions if self.bus_client else 0
+        t0 = time.monotonic()
+        try:
+            meas = unit.driver.read_measurements()
+        except Exception:
+            meas = None
+        t1 = time.monotonic()
+        tx = (self.bus_client.transactions - tx0) if self.bus_client else 0
+        unit.stats.on_poll(meas is not None, t1 - t0, tx)
+
+        if meas is not None:
+            unit.next_due = now + unit.period
+            if unit.offline:
+                unit.offline = False
+                unit.retry_s = 0.0
+                print(f"[Bus] unit {unit.unit_id} is back")
+                self._link(unit, LINK_RESTORED)
+            elif unit.failures:
+                self._link(unit, LINK_OK)
+            unit.failures = 0
+            self._reopen_attempt = 0
+            meas.timestamp = time.time() - (t1 - t0) / 2.0
+            if callable(self._measurements_cb):
+                try:
+                    self._measurements_cb(unit.unit_id, meas)
+                except Exception:
+                    pass
+            return
+
+        unit.failures += 1
+        if unit.failures == REPROBE_AFTER_MISSES and unit.failures < self.max_failures:
+            # один перебор схем адресации за серию сбоев (см. ConnectionService)
+            unit.driver.reprobe()
+        if unit.failures < self.max_failures:
+            unit.next_due = now + unit.period
+            self._link(unit, LINK_DEGRADED)
+            return
+        if not unit.offline:
+            unit.offline = True
+            print(f"[Bus] unit {unit.unit_id} is not responding")
+            self._link(unit, LINK_LOST)
+        unit.retry_s = min(OFFLINE_RETRY_MAX_S, max(unit.period, unit.retry_s * 2 or 1.0))
+        unit.next_due = now + unit.retry_s
+        self._link(unit, LINK_RECONNECTING, delay_s=round(unit.retry_s, 2))
+        if all(u.offline for u in self.units) and now >= self._reopen_due:
+            self._reopen_port(now)
+
+    def _reopen_port(self, now: float):
+        """
+        Молчат все приборы линии — дело, скорее всего, в порте (адаптер переподключили,
+        драйвер USB-RS485 «завис»), а не в приборах. Переоткрываем его, как ConnectionService
+        при переподключении: с экспоненциальной задержкой и джиттером между попытками.
+        """
+        delay = min(OFFLINE_RETRY_MAX_S, REOPEN_BASE_S * (2 ** min(self._reopen_attempt, 16)))
+        self._reopen_due = now + delay * random.uniform(0.5, 1.0)
+        self._reopen_attempt += 1
+        client = self.bus_client
+        if client is None:
+            return
+        with self.lock or contextlib.nullcontext():
+            try:
+                client.close()
+            except Exception:
+                pass
+            try:
+                ok = bool(client.connect())
+            except Exception:
+                ok = False
+        print(f"[Bus] all units silent: port reopen attempt {self._reopen_attempt} {'ok' if ok else 'failed'}")
+
+    def _link(self, unit: _Unit, state: str, **extra):
+        if not callable(self._link_cb):
+            return
+        info = {"state": state, "failures": unit.failures, "unit_id": unit.unit_id}
+        info.update(extra)
+        try:
+            self._link_cb(unit.unit_id, info)
+        except Exception:
+            pass
+
+    def stats_snapshot(self) -> List[dict]:
+        return [u.stats.as_dict() for u in self.units]
+
+    def stop(self):
+        with self._cv:
+            self._running = False
+            self._cv.notify_all()
+        self.wait(500)
+
+
+class Rs485Bus(QObject):
+    """
+    Одна линия RS-485 (один открытый порт) и много приборов на ней, каждый со своим
+    SourceDriver. Все кадры идут из одного потока с паузой t3.5 между ними.
+    unit_service(unit_id) — фасад с интерфейсом ConnectionService для SourceController.
+    """
+    measurements = Signal(int, object)   # (unit_id, Measurements)
+    linkChanged = Signal(int, object)    # (unit_id, dict)
+    busStats = Signal(object)            # list[dict] — UnitStats.as_dict(), раз в STATS_INTERVAL_S
+
+    def __init__(self, client, baudrate: int, parent: Optional[QObject] = None, max_failures: int = 3,
+                 timeouts: Optional[TimeoutTuner] = None, lock=None):
+        super().__init__(parent)
+        self.client = client
+        self.bus_client = SilentBusClient(client, baudrate)
+        self.max_failures = max_failures
+        self.timeouts = timeouts   # таймаут ответа по RTT каждого прибора (общий на линию)
+        self.lock = lock           # клиент из ClientPool (RTU поверх TCP) — его lock
+        self._units: Dict[int, _Unit] = {}
+        self._services: Dict[int, "_UnitService"] = {}
+        self._thread: Optional[_BusThread] = None
+        print(f"[Bus] inter-frame silence {self.bus_client.silence * 1000:.2f} ms @ {baudrate} baud")
+
+    def add_unit(self, unit_id: int, weight: int = 1, interval_ms: int = 250,
+                 addressing: Optional[Dict[str, Any]] = None, profile=None) -> SourceDriver:
+        """
+        Добавить прибор до start(). Возвращает его драйвер (общий клиент, свой unit id).
+        profile — модель прибора (device_profiles); None — базовая.
+        """
+        if self._thread is not None:
+            raise RuntimeError("Приборы добавляются до запуска опроса линии")
+        driver = SourceDriver(self.bus_client, unit_id=int(unit_id), addressing=addressing,
+                              lock=self.lock, timeouts=self.timeouts, profile=profile)
+        self._units[int(unit_id)] = _Unit(int(unit_id), driver, weight, max(10, int(interval_ms)) / 1000.0)
+        return driver
+
+    def driver(self, unit_id: int) -> Optional[SourceDriver]:
+        u = self._units.get(int(unit_id))
+        return u.driver if u else None
+
+    def unit_ids(self) -> List[int]:
+        return list(self._units)
+
+    def unit_service(self, unit_id: int) -> "_UnitService":
+        svc = self._services.get(unit_id)
+        if svc is None:
+            svc = self._services[unit_id] = _UnitService(self, unit_id)
+        return svc
+
+    def start(self):
+        if self._thread and self._thread.isRunning():
+            print("[Bus] Already running")
+            return
+        self._thread = _BusThread(list(self._units.values()), max_failures=self.max_failures)
+        self._thread.bus_client = self.bus_client
+        self._thread.lock = self.lock
+        self._thread._measurements_cb = self._publish
+        self._thread._link_cb = lambda uid, info: self.linkChanged.emit(uid, info)
+        self._thread._stats_cb = lambda st: self.busStats.emit(st)
+        self._thread.start()
+
+    def _publish(self, unit_id: int, meas):
+        svc = self._services.get(unit_id)
+        if svc is not None:
+            svc._publish(meas)
+        self.measurements.emit(unit_id, meas)
+
+    def submit(self, unit_id: int, fn: Callable[[SourceDriver], Any], priority: int = PRIO_WRITE) -> Future:
+        if not self._thread or not self._thread.isRunning():
+            fut: Future = Future()
+            fut.set_exception(RuntimeError("Нет активного подключения к устройству"))
+            return fut
+        return self._thread.submit(int(unit_id), fn, priority)
+
+    def stats(self) -> List[dict]:
+        """Пропускная способность по приборам (на момент вызова)."""
+        if not self._thread:
+            return []
+        return self._thread.stats_snapshot()
+
+    def stop(self):
+        if not self._thread:
+            return
+        print("[Bus] Stopping...")
+        try:
+            self._thread.stop()
+        except Exception:
+            pass
+        self._thread.wait(1500)
+        self._thread = None
+
+
+class _UnitService(QObject):
+    """Один прибор линии глазами SourceController — тот же интерфейс, что у ConnectionService."""
+    measurements = Signal(object)
+    error = Signal(str)
+    pollStats = Signal(object)
+    linkChanged = Signal(object)
+
+    def __init__(self, bus: Rs485Bus, unit_id: int):
+        super().__init__(None)
+        self.bus = bus
+        self.unit_id = unit_id
+        self._listeners: List[Callable[[Any], None]] = []
+        bus.linkChanged.connect(self._on_link)
+
+    def add_listener(self, fn: Callable[[Any], None]):
+        self._listeners.append(fn)
+
+    def _publish(self, meas):
+        for fn in list(self._listeners):
+            try:
+                fn(meas)
+            except Exception as e:
+                print(f"[Bus] listener failed: {e}")
+        self.measurements.emit(meas)
+
+    def _on_link(self, unit_id: int, info):
+        if unit_id != self.unit_id:
+            return
+        self.linkChanged.emit(info)
+        if (info or {}).get("state") == LINK_LOST:
+            self.error.emit(f"Прибор {unit_id} не отвечает")
+
+    def start(self):
+        self.bus.start()
+
+    def stop(self):
+        self.bus.stop()
+
+    def submit(self, fn: Callable[[SourceDriver], Any], priority: int = PRIO_WRITE) -> Future:
+        return self.bus.submit(self.unit_id, fn, priority)
+
+    def poll_stats(self) -> List[dict]:
+        return [st for st in self.bus.stats() if st["unit_id"] == self.unit_id]
+
+    def link_quality(self) -> dict:
+        return {}
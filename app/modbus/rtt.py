@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Optional, Dict, Tuple, List
+
+# Границы таймаута по умолчанию (профиль может переопределить timeout_min_ms / timeout_max_ms)
+TIMEOUT_MIN_S = 0.05
+TIMEOUT_MAX_S = 2.0
+# После таймаута по последовательной линии ждём тишины столько (но не дольше истёкшего таймаута)
+STALE_QUIET_S = 0.05
+
+# Коэффициенты Jacobson/Karels (RFC 6298): SRTT += (R - SRTT)/8, RTTVAR += (|SRTT - R| - RTTVAR)/4
+_ALPHA = 1.0 / 8.0
+_BETA = 1.0 / 4.0
+_K = 4.0
+
+# Имя метода клиента -> код функции Modbus
+METHOD_FC = {
+    "read_coils": 0x01,
+    "read_holding_registers": 0x03,
+    "read_input_registers": 0x04,
+    "write_coil": 0x05,
+    "write_register": 0x06,
+    "write_coils": 0x0F,
+    "write_registers": 0x10,
+}
+
+
+class _Rto:
+    __slots__ = ("srtt", "rttvar", "rto", "samples", "timeouts", "last_rtt")
+
+    def __init__(self, initial: float):
+        self.srtt: Optional[float] = None
+        self.rttvar = 0.0
+        self.rto = initial
+        self.samples = 0
+        self.timeouts = 0
+        self.last_rtt: Optional[float] = None
+
+
+class TimeoutTuner:
+    """
+    Таймаут транзакции как RTO у TCP: сглаженное RTT и его разброс отдельно по каждой паре
+    (unit id, код функции); таймаут = SRTT + 4·RTTVAR в границах [min_s, max_s].
+    Пока замеров нет — max_s. Потерянный кадр (Karn): замер не берём, таймаут удваиваем,
+    чтобы медленный прибор не терялся раз за разом; первый же ответ вернёт оценку к RTT.
+    Потокобезопасен — один на клиент, общий для всех драйверов этого клиента.
+    """
+    def __init__(self, min_s: float = TIMEOUT_MIN_S, max_s: float = TIMEOUT_MAX_S):
+        self.min_s = max(0.001, float(min_s))
+        self.max_s = max(self.min_s, float(max_s))
+        self._mx = threading.Lock()
+        self._keys: Dict[Tuple[int, int], _Rto] = {}
+
+    @classmethod
+    def from_settings(cls, settings: dict) -> "TimeoutTuner":
+        """Границы из профиля: timeout_min_ms / timeout_max_ms (пусто — по умолчанию)."""
+        def _ms(key: str, default: float) -> float:
+            try:
+                return float(settings.get(key) or default * 1000.0) / 1000.0
+            except (TypeError, ValueError):
+                return default
+        return cls(_ms("timeout_min_ms", TIMEOUT_MIN_S), _ms("timeout_max_ms", TIMEOUT_MAX_S))
+
+    def _get(self, unit: int, fc: int) -> _Rto:
+        key = (int(unit), int(fc))
+        st = self._keys.get(key)
+        if st is None:
+            st = self._keys[key] = _Rto(self.max_s)
+        return st
+
+    def timeout_for(self, unit: int, fc: int) -> float:
+        with self._mx:
+            return self._get(unit, fc).rto
+
+    def on_reply(self, unit: int, fc: int, rtt: float):
+        """Ответ получен (в т.ч. исключение Modbus — это тоже ответ) за rtt секунд."""
+        rtt = max(0.0, float(rtt))
+        with self._mx:
+            st = self._get(unit, fc)
+            if st.srtt is None:
+                st.srtt = rtt
+                st.rttvar = rtt / 2.0
+            else:
+                st.rttvar += _BETA * (abs(st.srtt - rtt) - st.rttvar)
+                st.srtt += _ALPHA * (rtt - st.srtt)
+            st.samples += 1
+            st.last_rtt = rtt
+            st.rto = min(self.max_s, max(self.min_s, st.srtt + _K * st.rttvar))
+
+    def on_timeout(self, unit: int, fc: int):
+        with self._mx:
+            st = self._get(unit, fc)
+            st.timeouts += 1
+            st.rto = min(self.max_s, st.rto * 2.0)
+
+    def stats(self) -> List[dict]:
+        with self._mx:
+            return [{
+                "unit_id": unit,
+                "fc": fc,
+                "srtt_ms": round(st.srtt * 1000.0, 2) if st.srtt is not None else None,
+                "rttvar_ms": round(st.rttvar * 1000.0, 2),
+                "timeout_ms": round(st.rto * 1000.0, 1),
+                "last_rtt_ms": round(st.last_rtt * 1000.0, 2) if st.last_rtt is not None else None,
+                "samples": st.samples,
+                "timeouts": st.timeouts,
+            } for (unit, fc), st in sorted(self._keys.items())]
+
+
+def apply_timeout(client, seconds: float):
+    """
+    Выставить таймаут ответа на следующую транзакцию. У pymodbus он живёт в разных местах
+    в зависимости от версии (comm_params / params) и у самого порта/сокета — ставим везде,
+    где нашли.
+    """
+    if hasattr(client, "max_in_flight"):
+        # PipelinedTcpClient
+        client.timeout = seconds
+        return
+    for holder_name, attr in (("comm_params", "timeout_connect"), ("params", "timeout")):
+        holder = getattr(client, holder_name, None)
+        if holder is not None and hasattr(holder, attr):
+            try:
+                setattr(holder, attr, seconds)
+            except Exception:
+                pass
+    sock = getattr(client, "socket", None)
+    if sock is None:
+        return
+    try:
+        if hasattr(sock, "settimeout"):
+            sock.settimeout(seconds)      # socket.socket (TCP)
+        else:
+            sock.timeout = seconds        # serial.Serial (RTU)
+    except Exception:
+        pass
+
+
+def is_no_response(rr) -> bool:
+    """Нет ответа: None или ModbusIOException (pymodbus возвращает его вместо исключения)."""
+    return rr is None or type(rr).__name__ == "ModbusIOException"
+
+
+def discard_stale(client, timeout_s: float = STALE_QUIET_S):
+    """
+    После таймаута опоздавший ответ не должен достаться следующему запросу: pymodbus сверяет
+    только адрес ведомого. Порт RS-485 — вычитываем, пока линия не замолчит; сокет (TCP, UDP,
+    RTU поверх TCP) — закрываем, pymodbus откроет новый на следующей транзакции, и старый
+    ответ уйдёт в закрытый. PipelinedTcpClient сам сверяет transaction id — его не трогаем.
+    """
+    if hasattr(client, "max_in_flight"):
+        return
+    sock = getattr(client, "socket", None)
+    if sock is None:
+        return
+    try:
+        if hasattr(sock, "reset_input_buffer"):
+            quiet = max(0.0, min(float(timeout_s), STALE_QUIET_S))
+            deadline = time.monotonic() + max(quiet, float(timeout_s))
+            while True:
+                time.sleep(quiet)
+                if not sock.in_waiting:
+                    return
+                sock.reset_input_buffer()
+                if time.monotonic() >= deadline:
+                    return
+        else:
+            client.close()
+    except Exception:
+        pass
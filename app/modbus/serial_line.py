@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import functools
+import time
+from typing import Callable, Dict
+
+# Методы клиента, между кадрами которых выдерживается тишина t3.5
+_BUS_METHODS = (
+    "read_coils", "read_input_registers", "read_holding_registers",
+    "write_coil", "write_coils", "write_register", "write_registers",
+)
+
+
+def interframe_silence(baudrate: int) -> float:
+    """
+    Тишина между кадрами Modbus RTU (t3.5): 3.5 символа по 11 бит (старт + 8 + чётность/стоп + стоп).
+    Выше 19200 бод — фиксированные 1.75 мс, как требует спецификация Modbus over Serial Line.
+    """
+    baudrate = max(1, int(baudrate))
+    if baudrate > 19200:
+        return 0.00175
+    return 3.5 * 11.0 / baudrate
+
+
+class SilentBusClient:
+    """
+    Обёртка общего последовательного клиента: перед каждым кадром ждёт, чтобы с конца
+    предыдущего прошло не меньше t3.5, и считает транзакции. Остальное — как у клиента.
+    """
+    def __init__(self, client, baudrate: int):
+        self._client = client
+        self.silence = interframe_silence(baudrate)
+        self.transactions = 0
+        self._last_end = 0.0
+        self._wrapped: Dict[str, Callable] = {}
+
+    def __getattr__(self, name: str):
+        if name not in _BUS_METHODS:
+            return getattr(self._client, name)
+        fn = self._wrapped.get(name)
+        if fn is None:
+            method = getattr(self._client, name)
+
+            # functools.wraps сохраняет сигнатуру (slave=/device_id=) для driver.unit_kwarg
+            @functools.wraps(method)
+            def fn(*args, **kwargs):
+                gap = self._last_end + self.silence - time.monotonic()
+                if gap > 0:
+                    time.sleep(gap)
+                try:
+                    return method(*args, **kwargs)
+                finally:
+                    self.transactions += 1
+                    self._last_end = time.monotonic()
+            self._wrapped[name] = fn
+        return fn
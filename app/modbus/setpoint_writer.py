@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import threading
+from concurrent.futures import Future
+from typing import Optional, Callable, Dict, Set
+
+from app.modbus.driver import SourceDriver, clamp_setpoint
+from .registry import HoldingRegs, Measurements, Setpoints
+
+SHADOW_REGS = (HoldingRegs.CURRENT_SETPOINT, HoldingRegs.VOLTAGE_SETPOINT, HoldingRegs.REVERS)
+
+
+class SetpointWriter:
+    """
+    Теневые копии holding 40002–40004 и запись по принципу «последнее значение побеждает».
+
+    • Тень обновляется из опроса и после удачной записи.
+    • adjust()/set() меняют значение локально и сразу возвращают его — без чтения с шины.
+    • В очереди шины всегда не больше одной команды записи: пока она ждёт своей очереди,
+      новые значения просто перезаписывают pending, и уходит только самое свежее.
+    """
+    def __init__(self, submit: Callable[..., Future]):
+        self._submit = submit
+        self._lock = threading.Lock()
+        self._shadow: Dict[int, int] = {}
+        self._pending: Dict[int, int] = {}
+        self._in_flight: Set[int] = set()
+        self._flush_queued = False
+        # (addr_1based, value) после удачной записи; вызывается в потоке шины
+        self.written_cb: Optional[Callable[[int, int], None]] = None
+
+    # ---------- данные опроса ----------
+    def on_measurements(self, meas: Measurements):
+        """Вызывается в потоке шины после каждого опроса."""
+        values = {
+            HoldingRegs.CURRENT_SETPOINT: meas.current_i,
+            HoldingRegs.VOLTAGE_SETPOINT: meas.voltage_i,
+            HoldingRegs.REVERS: meas.revers,
+        }
+        with self._lock:
+            for reg, val in values.items():
+                # локальное значение, которое ещё не дошло до прибора, опрос не перетирает
+                if val is None or reg in self._pending or reg in self._in_flight:
+                    continue
+                self._shadow[reg] = int(val)
+
+    # ---------- API для GUI ----------
+    def value(self, addr_1based: int) -> Optional[int]:
+        """Значение уставки с учётом ещё не отправленных изменений."""
+        with self._lock:
+            if addr_1based in self._pending:
+                return self._pending[addr_1based]
+            return self._shadow.get(addr_1based)
+
+    def adjust(self, addr_1based: int, delta: int) -> Optional[int]:
+        """Сдвинуть уставку на delta. None — тень ещё пуста (не было ни одного опроса)."""
+        with self._lock:
+            base = self._pending.get(addr_1based, self._shadow.get(addr_1based))
+            if base is None:
+                return None
+            value = clamp_setpoint(addr_1based, base + int(delta))
+            self._pending[addr_1based] = value
+        self._schedule()
+        return value
+
+    def set(self, addr_1based: int, value: int) -> int:
+        value = clamp_setpoint(addr_1based, value)
+        with self._lock:
+            self._pending[addr_1based] = value
+        self._schedule()
+        return value
+
+    def reset(self):
+        with self._lock:
+            self._shadow.clear()
+            self._pending.clear()
+            self._in_flight.clear()
+            self._flush_queued = False
+
+    # ---------- поток шины ----------
+    def _schedule(self):
+        with self._lock:
+            if self._flush_queued:
+                return
+            self._flush_queued = True
+        fut = self._submit(self._flush)
+        if fut.done() and fut.exception() is not None:
+            # не подключены / очередь переполнена — локальные изменения отбрасываем
+            print(f"[Setpoints] write not queued: {fut.exception()}")
+            with self._lock:
+                self._flush_queued = False
+                self._pending.clear()
+
+    def _flush(self, driver: SourceDriver) -> bool:
+        with self._lock:
+            batch, self._pending = self._pending, {}
+            self._flush_queued = False
+            self._in_flight.update(batch)
+
+        # несколько подряд идущих уставок — одна транзакция FC16 ровно по ним: регистры
+        # вне batch (REVERS, который переключают мимо writer) из тени не переписываем
+        regs = sorted(batch)
+        if len(regs) > 1 and regs == list(range(regs[0], regs[0] + len(regs))):
+            return self._flush_block(driver, batch)
+
+        ok_all = True
+        for reg, value in batch.items():
+            ok = False
+            try:
+                ok = driver.write_holding(reg, value)
+            except Exception as e:
+                print(f"[Setpoints] write {reg} failed: {e}")
+            with self._lock:
+                self._in_flight.discard(reg)
+                if ok:
+                    self._shadow[reg] = value
+            ok_all = ok_all and ok
+            if ok:
+                self._notify(reg, value)
+        return ok_all
+
+    def _flush_block(self, driver: SourceDriver, batch: Dict[int, int]) -> bool:
+        regs = sorted(batch)
+        ok = False
+        try:
+            ok = driver.write_holdings(regs[0], [batch[r] for r in regs])
+        except Exception as e:
+            print(f"[Setpoints] block write failed: {e}")
+        with self._lock:
+            self._in_flight.difference_update(batch)
+            if ok:
+                self._shadow.update(batch)
+        if ok:
+            for reg, value in batch.items():
+                self._notify(reg, value)
+        return ok
+
+    def note_written(self, sp: Setpoints):
+        """Запись рабочей точки прошла мимо writer (apply_setpoints) — обновить тень."""
+        with self._lock:
+            for reg, value in zip(SHADOW_REGS, sp.as_registers()):
+                if reg not in self._pending:
+                    self._shadow[reg] = int(value)
+
+    def _notify(self, reg: int, value: int):
+        if callable(self.written_cb):
+            try:
+                self.written_cb(reg, value)
+            except Exception:
+                pass
@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import math
+import struct
+from multiprocessing import shared_memory
+from typing import Optional, List, Tuple
+
+from .registry import Measurements, ErrorBits
+
+# Кольцо измерений в разделяемой памяти: один писатель (процесс линии), один читатель (GUI).
+# Заголовок: magic, версия, размер слота, число слотов, резерв, write_seq (сколько записей
+# опубликовано всего; u64 по смещению 16 — выровнен, пишется одной операцией).
+_HEADER = struct.Struct("<IHHIIQ")
+_HEADER_SIZE = 64
+_WRITE_SEQ_OFFSET = 16
+_MAGIC = 0x4D52494E   # "MRIN"
+_VERSION = 1
+
+# Слот: u32 seqlock + запись. seqlock = 2*i+1 пока запись i пишется, 2*i+2 — когда готова.
+_SEQ = struct.Struct("<I")
+# unit, flags, failures, timestamp, current, voltage, current_i, voltage_i, polarity,
+# ah_counter, temp1, temp2 (NaN — нет), errors_raw, revers (-1 — нет)
+_RECORD = struct.Struct("<HHHdddffhIffHh")
+SLOT_SIZE = 64
+assert _SEQ.size + _RECORD.size <= SLOT_SIZE
+
+# flags
+F_VALID = 1 << 0          # опрос удался, поля измерений заполнены
+F_LOST = 1 << 1           # прибор исчерпал бюджет сбоев
+# для Optional[bool]-катушек: бит «известно» и бит значения
+_COIL_FIELDS = ("device_on", "inverter_on", "control_locked", "control_external")
+_COIL_KNOWN = {name: 1 << (2 + 2 * i) for i, name in enumerate(_COIL_FIELDS)}
+_COIL_VALUE = {name: 1 << (3 + 2 * i) for i, name in enumerate(_COIL_FIELDS)}
+
+# Сэмпл для читателя: (unit_id, Measurements | None — опрос не удался, подряд сбоев, потерян)
+Sample = Tuple[int, Optional[Measurements], int, bool]
+
+
+def ring_size(nslots: int) -> int:
+    """Сколько байт разделяемой памяти нужно кольцу на nslots записей."""
+    return _HEADER_SIZE + int(nslots) * SLOT_SIZE
+
+
+def init_ring(buf, nslots: int):
+    """Разметить пустое кольцо (делает владелец памяти до запуска писателя)."""
+    _HEADER.pack_into(buf, 0, _MAGIC, _VERSION, SLOT_SIZE, int(nslots), 0, 0)
+    buf[_HEADER_SIZE:ring_size(nslots)] = bytes(int(nslots) * SLOT_SIZE)
+
+
+def attach(name: str) -> shared_memory.SharedMemory:
+    """
+    Подключиться к уже созданному сегменту. Дочерние процессы multiprocessing делят
+    resource_tracker с родителем, поэтому повторная регистрация имени безвредна,
+    а удаляет сегмент только владелец (unlink в родителе).
+    """
+    return shared_memory.SharedMemory(name=name, create=False)
+
+
+def _header(buf) -> Tuple[int, int]:
+    magic, version, slot_size, nslots, _res, _seq = _HEADER.unpack_from(buf, 0)
+    if magic != _MAGIC or version != _VERSION or slot_size != SLOT_SIZE or nslots <= 0:
+        raise ValueError("Разделяемая память не содержит кольца измерений")
+    return nslots, slot_size
+
+
+class RingWriter:
+    """Писатель кольца (процесс линии). Никогда не ждёт читателя — старые записи затираются."""
+    def __init__(self, buf):
+        self.buf = buf
+        self.nslots, _ = _header(buf)
+        self.seq = struct.unpack_from("<Q", buf, _WRITE_SEQ_OFFSET)[0]
+
+    def write(self, unit_id: int, meas: Optional[Measurements], failures: int = 0, lost: bool = False):
+        i = self.seq
+        off = _HEADER_SIZE + (i % self.nslots) * SLOT_SIZE
+        flags = F_LOST if lost else 0
+        if meas is None:
+            fields = (0.0, 0.0, 0.0, 0.0, 0.0, 0, 0, math.nan, math.nan, 0, -1)
+        else:
+            flags |= F_VALID
+            for name in _COIL_FIELDS:
+                v = getattr(meas, name, None)
+                if v is not None:
+                    flags |= _COIL_KNOWN[name]
+                    if v:
+                        flags |= _COIL_VALUE[name]
+            fields = (
+                float(meas.timestamp), float(meas.current), float(meas.voltage),
+                float(meas.current_i), float(meas.voltage_i),
+                int(meas.polarity), int(meas.ah_counter) & 0xFFFFFFFF,
+                math.nan if meas.temp1 is None else float(meas.temp1),
+                math.nan if meas.temp2 is None else float(meas.temp2),
+                int(meas.errors_raw) & 0xFFFF,
+                -1 if meas.revers is None else int(meas.revers),
+            )
+        _SEQ.pack_into(self.buf, off, (2 * i + 1) & 0xFFFFFFFF)
+        _RECORD.pack_into(self.buf, off + _SEQ.size, int(unit_id) & 0xFFFF, flags,
+                          min(int(failures), 0xFFFF), *fields)
+        _SEQ.pack_into(self.buf, off, (2 * i + 2) & 0xFFFFFFFF)
+        self.seq = i + 1
+        struct.pack_into("<Q", self.buf, _WRITE_SEQ_OFFSET, self.seq)
+
+
+class RingReader:
+    """
+    Читатель кольца (GUI-поток). Разбирает записи прямо из memoryview сегмента — без pickle
+    и без копий всего буфера. Если писатель обогнал на круг, пропущенное считается в dropped.
+    """
+    def __init__(self, buf):
+        self.buf = buf
+        self.nslots, _ = _header(buf)
+        # начинаем с текущего конца: старые записи не интересны
+        self.pos = struct.unpack_from("<Q", buf, _WRITE_SEQ_OFFSET)[0]
+        self.dropped = 0
+
+    def read_new(self) -> List[Sample]:
+        buf = self.buf
+        end = struct.unpack_from("<Q", buf, _WRITE_SEQ_OFFSET)[0]
+        if end - self.pos > self.nslots:
+            self.dropped += end - self.pos - self.nslots
+            self.pos = end - self.nslots
+        out: List[Sample] = []
+        for i in range(self.pos, end):
+            off = _HEADER_SIZE + (i % self.nslots) * SLOT_SIZE
+            want = (2 * i + 2) & 0xFFFFFFFF
+            if _SEQ.unpack_from(buf, off)[0] != want:
+                self.dropped += 1
+                continue
+            rec = _RECORD.unpack_from(buf, off + _SEQ.size)
+            if _SEQ.unpack_from(buf, off)[0] != want:
+                # писатель успел затереть слот, пока мы читали
+                self.dropped += 1
+                continue
+            out.append(self._sample(rec))
+        self.pos = end
+        return out
+
+    @staticmethod
+    def _sample(rec) -> Sample:
+        (unit, flags, failures, ts, curr, volt, curr_i, volt_i, pol, ah,
+         t1, t2, err, revers) = rec
+        lost = bool(flags & F_LOST)
+        if not flags & F_VALID:
+            return unit, None, failures, lost
+        meas = Measurements(
+            current=curr,
+            voltage=volt,
+            current_i=curr_i,
+            voltage_i=volt_i,
+            polarity=pol,
+            ah_counter=ah,
+            temp1=None if math.isnan(t1) else t1,
+            temp2=None if math.isnan(t2) else t2,
+            errors_raw=err,
+            error_overheat=bool((err >> ErrorBits.OVERHEAT) & 1),
+            error_mains=bool((err >> ErrorBits.MAINS_MONITOR) & 1),
+            revers=None if revers < 0 else revers,
+            timestamp=ts,
+        )
+        for name in _COIL_FIELDS:
+            if flags & _COIL_KNOWN[name]:
+                setattr(meas, name, bool(flags & _COIL_VALUE[name]))
+        return unit, meas, failures, lost
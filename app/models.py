@@ -9,7 +9,7 @@ class Profile(Base):
     __tablename__ = "profiles"
     id = Column(Integer, primary_key=True)
     name = Column(String(100), unique=True, nullable=False)
-    conn_type = Column(String(10), nullable=False)  # "rtu" or "wifi"
+    conn_type = Column(String(16), nullable=False)  # "RTU" | "TCP" | "RTU_OVER_TCP" | "UDP"
     settings = Column(Text, nullable=False)         # JSON dump of dict
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
 
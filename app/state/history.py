@@ -0,0 +1,159 @@
+"""
+История измерений источника — кольцевой буфер по столбцам на массивах NumPy.
+Вместо объекта Measurements на отсчёт (~1 КБ с упакованными полями) — 41 байт в
+преаллоцированных столбцах; добавление O(1), окна — виды без копирования.
+"""
+
+from __future__ import annotations
+
+import math
+import time
+from typing import Optional, Dict
+
+import numpy as np
+
+# Ёмкость по умолчанию: 65536 отсчётов — около 1,8 часа при 10 Гц, ~5 МБ на источник
+DEFAULT_CAPACITY = 1 << 16
+
+# Столбцы: имя -> dtype. temp1/temp2 — NaN, если датчик не прочитался
+COLUMNS = (
+    ("t", np.float64),          # time.time() отсчёта
+    ("current", np.float32),
+    ("voltage", np.float32),
+    ("current_i", np.float32),  # уставки
+    ("voltage_i", np.float32),
+    ("ah_counter", np.uint32),
+    ("temp1", np.float32),
+    ("temp2", np.float32),
+    ("errors", np.uint16),      # errors_raw
+    ("polarity", np.int8),
+    ("flags", np.uint16),       # FLAG_* ниже
+)
+
+# Столбец flags: состояния катушек, признаки «катушка прочитана» и биты ошибок
+FLAG_DEVICE_ON = 1 << 0
+FLAG_INVERTER_ON = 1 << 1
+FLAG_CONTROL_LOCKED = 1 << 2
+FLAG_CONTROL_EXTERNAL = 1 << 3
+FLAG_KNOWN_SHIFT = 4            # бит (FLAG_x << 4) — значение катушки x известно
+FLAG_OVERHEAT = 1 << 8
+FLAG_MAINS = 1 << 9
+
+_COIL_FLAGS = (
+    ("device_on", FLAG_DEVICE_ON),
+    ("inverter_on", FLAG_INVERTER_ON),
+    ("control_locked", FLAG_CONTROL_LOCKED),
+    ("control_external", FLAG_CONTROL_EXTERNAL),
+)
+
+
+def pack_flags(meas) -> int:
+    """Столбец flags из Measurements (катушки, признаки «прочитана», биты ошибок)."""
+    f = 0
+    for name, bit in _COIL_FLAGS:
+        v = getattr(meas, name, None)
+        if v is not None:
+            f |= bit << FLAG_KNOWN_SHIFT
+            if v:
+                f |= bit
+    if getattr(meas, "error_overheat", False):
+        f |= FLAG_OVERHEAT
+    if getattr(meas, "error_mains", False):
+        f |= FLAG_MAINS
+    return f
+
+
+def _temp(v) -> float:
+    return math.nan if v is None else float(v)
+
+
+class MeasurementHistory:
+    """
+    Кольцо фиксированной ёмкости, столбец на поле. Каждый столбец выделен вдвое длиннее
+    ёмкости, и отсчёт пишется дважды — в позицию i и i + capacity. Поэтому последние n
+    отсчётов (n <= capacity) всегда лежат подряд, и окно — срез без копирования, даже
+    когда кольцо перешло через край.
+    Виды, которые возвращают last()/since()/between(), указывают в само кольцо: через
+    capacity - n добавлений их начало перезапишется; нужно хранить дольше — .copy().
+    Не потокобезопасен — пишет и читает GUI-поток (AppStore).
+    """
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self.capacity = max(2, int(capacity))
+        self._cols: Dict[str, np.ndarray] = {
+            name: np.zeros(2 * self.capacity, dtype=dt) for name, dt in COLUMNS
+        }
+        self._order = tuple(self._cols[name] for name, _dt in COLUMNS)
+        self._pos = 0        # куда пойдёт следующий отсчёт (0..capacity-1)
+        self._size = 0       # сколько отсчётов в кольце
+        self.appended = 0    # сколько отсчётов добавлено всего
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def nbytes(self) -> int:
+        return sum(c.nbytes for c in self._order)
+
+    def append(self, meas, t: Optional[float] = None):
+        """Добавить отсчёт Measurements; t — время (по умолчанию meas.timestamp или time.time())."""
+        if t is None:
+            t = getattr(meas, "timestamp", 0.0) or time.time()
+        row = (
+            t,
+            meas.current,
+            meas.voltage,
+            meas.current_i,
+            meas.voltage_i,
+            meas.ah_counter,
+            _temp(meas.temp1),
+            _temp(meas.temp2),
+            meas.errors_raw,
+            meas.polarity,
+            pack_flags(meas),
+        )
+        i = self._pos
+        j = i + self.capacity
+        for col, v in zip(self._order, row):
+            col[i] = v
+            col[j] = v
+        self._pos = i + 1 if i + 1 < self.capacity else 0
+        if self._size < self.capacity:
+            self._size += 1
+        self.appended += 1
+
+    # ---------- окна ----------
+    def _span(self, n: int) -> slice:
+        """Срез двойного столбца с последними n отсчётами (от старых к новым)."""
+        n = max(0, min(int(n), self._size))
+        end = self._pos + self.capacity
+        return slice(end - n, end)
+
+    def column(self, name: str, n: Optional[int] = None) -> np.ndarray:
+        """Последние n (по умолчанию все) значений столбца — вид без копирования."""
+        return self._cols[name][self._span(self._size if n is None else n)]
+
+    def last(self, n: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """Последние n отсчётов всеми столбцами — виды без копирования."""
+        span = self._span(self._size if n is None else n)
+        return {name: col[span] for name, col in self._cols.items()}
+
+    def between(self, t0: float, t1: Optional[float] = None) -> Dict[str, np.ndarray]:
+        """Отсчёты с t0 <= t <= t1 (t1=None — до последнего); поиск по времени — бинарный."""
+        ts = self.column("t")
+        lo = int(np.searchsorted(ts, t0, side="left"))
+        hi = len(ts) if t1 is None else int(np.searchsorted(ts, t1, side="right"))
+        base = self._span(self._size).start
+        span = slice(base + lo, base + max(lo, hi))
+        return {name: col[span] for name, col in self._cols.items()}
+
+    def since(self, t0: float) -> Dict[str, np.ndarray]:
+        return self.between(t0, None)
+
+    def latest_time(self) -> Optional[float]:
+        if not self._size:
+            return None
+        return float(self._cols["t"][self._pos + self.capacity - 1])
+
+    def clear(self):
+        self._pos = 0
+        self._size = 0
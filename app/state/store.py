@@ -1,5 +1,11 @@
 # app/state/store.py
-from PySide6.QtCore import QObject, Signal
+from PySide6.QtCore import QObject, Signal, QTimer
+
+from app.modbus.connection_service import LINK_OK, LINK_DEGRADED, LINK_LOST, LINK_RESTORED
+from app.state.history import MeasurementHistory, DEFAULT_CAPACITY
+
+# id основного источника (ConnectionService контроллера) в истории измерений
+MAIN_SOURCE = "main"
 
 class AppStore(QObject):
     """
@@ -9,20 +15,109 @@ class AppStore(QObject):
     connectionChanged = Signal(bool)
     errorText = Signal(str)
     measurementsChanged = Signal(object)
+    linkChanged = Signal(object)   # качество связи: dict со state/failures/reconnects (см. ConnectionService)
+    # парк источников (FleetPoller): (source_id, ...)
+    sourceMeasurementsChanged = Signal(str, object)
+    sourceLinkChanged = Signal(str, object)
 
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, history_capacity: int = DEFAULT_CAPACITY):
         super().__init__(parent)
         self.connected = False
         self.meas = None
+        self.link = None
+        self.sources = {}       # source_id -> последние Measurements
+        self.source_links = {}  # source_id -> последнее событие качества связи
+        # кольца процессов опроса (BusProcessPool): bus_id -> RingReader
+        self._rings = {}
+        self._ring_timer = None
+        # история измерений: source_id -> MeasurementHistory (основной источник — MAIN_SOURCE)
+        self.history = {}
+        self.history_capacity = max(2, int(history_capacity))
 
     def set_connected(self, value: bool):
         if self.connected != value:
             self.connected = value
+            if not value:
+                # следующее подключение может быть к другому прибору или профилю (те же
+                # MAIN_SOURCE и str(unit_id)) — его история начинается с чистого листа
+                self.clear_history()
             self.connectionChanged.emit(value)
 
     def set_error(self, msg: str):
         self.errorText.emit(msg)
 
+    def set_link(self, info):
+        self.link = info
+        self.linkChanged.emit(info)
+
     def set_measurements(self, meas):
         self.meas = meas
+        self._record(MAIN_SOURCE, meas)
         self.measurementsChanged.emit(meas)
+
+    def set_source_measurements(self, source_id: str, meas):
+        self.sources[source_id] = meas
+        self._record(source_id, meas)
+        self.sourceMeasurementsChanged.emit(source_id, meas)
+
+    # ---------- история ----------
+    def history_for(self, source_id: str = MAIN_SOURCE):
+        """MeasurementHistory источника или None, если от него ещё не было ни одного отсчёта."""
+        return self.history.get(source_id)
+
+    def clear_history(self):
+        self.history.clear()
+
+    def _record(self, source_id: str, meas):
+        if meas is None:
+            return
+        h = self.history.get(source_id)
+        if h is None:
+            h = self.history[source_id] = MeasurementHistory(self.history_capacity)
+        try:
+            h.append(meas)
+        except Exception as e:
+            print(f"[Store] history {source_id}: {e}")
+
+    def set_source_link(self, source_id: str, info):
+        self.source_links[source_id] = info
+        self.sourceLinkChanged.emit(source_id, info)
+
+    # ---------- кольца процессов опроса ----------
+    def attach_ring(self, bus_id: str, reader, interval_ms: int = 50):
+        """Забирать измерения линии bus_id из разделяемой памяти каждые interval_ms (GUI-поток)."""
+        self._rings[bus_id] = reader
+        if self._ring_timer is None:
+            self._ring_timer = QTimer(self)
+            self._ring_timer.timeout.connect(self._drain_rings)
+        self._ring_timer.setInterval(max(10, int(interval_ms)))
+        if not self._ring_timer.isActive():
+            self._ring_timer.start()
+
+    def detach_ring(self, bus_id: str):
+        self._rings.pop(bus_id, None)
+        if not self._rings and self._ring_timer is not None:
+            self._ring_timer.stop()
+
+    def _drain_rings(self):
+        for bus_id, reader in list(self._rings.items()):
+            try:
+                samples = reader.read_new()
+            except Exception as e:
+                print(f"[Store] ring {bus_id}: {e}")
+                continue
+            # GUI нужно только последнее состояние прибора за тик
+            latest = {}
+            for unit_id, meas, failures, lost in samples:
+                latest[unit_id] = (meas, failures, lost)
+            for unit_id, (meas, failures, lost) in latest.items():
+                sid = f"{bus_id}:{unit_id}"
+                prev = (self.source_links.get(sid) or {}).get("state")
+                if meas is not None:
+                    if prev in (LINK_DEGRADED, LINK_LOST):
+                        self.set_source_link(sid, {"state": LINK_RESTORED if prev == LINK_LOST else LINK_OK})
+                    self.set_source_measurements(sid, meas)
+                else:
+                    state = LINK_LOST if lost else LINK_DEGRADED
+                    if state != prev:
+                        self.set_source_link(sid, {"state": state, "failures": failures})
@@ -0,0 +1,588 @@
+# app/telemetry.py
+"""
+Журнал измерений (телеметрия) — отдельная SQLite-БД в режиме WAL.
+Отсчёты копятся в ограниченной очереди и пишутся фоновым потоком пачками (executemany)
+раз в flush_ms — ни поток опроса, ни GUI-поток диск не ждут.
+Вместе с сырыми отсчётами тот же поток ведёт свёртки (min/max/среднее/последнее за 1 с,
+10 с, 1 мин, 10 мин и 1 ч) и по расписанию удаляет то, что старше горизонта хранения своего уровня.
+Запрос диапазона (query) сам выбирает самый грубый уровень, которого хватает на пиксель.
+"""
+from __future__ import annotations
+
+import atexit
+import math
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional, Dict, List, Callable, Any, Iterable, Tuple
+
+import numpy as np
+
+from resources import TELEMETRY_DB_PATH
+from app.state.history import pack_flags
+
+# Как часто фоновый поток сбрасывает накопленное в БД
+FLUSH_MS = 500
+# Предел очереди (отсчётов): дальше новые отсчёты отбрасываются и считаются в dropped.
+# 50 источников × 10 Гц — 500 отсчётов/с, т.е. запас на ~3 минуты остановки диска.
+MAX_PENDING = 100_000
+
+# Уровни свёртки: длина корзины, с. 0 — сырые отсчёты (таблица samples).
+# Промежуточные 10 с и 10 мин держат соседние уровни не дальше 10× друг от друга:
+# decimate() тогда читает не больше ~10 строк на пиксель при любом масштабе.
+RAW = 0
+ROLLUP_TIERS = (1, 10, 60, 600, 3600)
+# Сколько хранится каждый уровень, с (None — бессрочно). Сырые 10 Гц — ~35 МБ/сутки на источник
+RETENTION_S: Dict[int, Optional[float]] = {
+    RAW: 7 * 86400,
+    1: 31 * 86400,
+    10: 92 * 86400,
+    60: 400 * 86400,
+    600: 3 * 366 * 86400,
+    3600: None,
+}
+# Как часто поток записи чистит устаревшее
+RETENTION_EVERY_S = 600
+
+# Столбцы отсчёта в порядке строки очереди (после имени источника)
+SAMPLE_COLUMNS = ("t", "current", "voltage", "current_i", "voltage_i", "polarity",
+                  "ah_counter", "temp1", "temp2", "errors", "flags")
+# Что сворачивается: по каждому полю — min, max, sum, cnt (непустых), last
+ROLLUP_FIELDS = ("current", "voltage", "current_i", "voltage_i", "temp1", "temp2", "ah_counter")
+_AGG = ("min", "max", "sum", "cnt", "last")
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS sources (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL UNIQUE              -- профиль/адрес и unit id прибора
+    )
+    """,
+    # кластеризована по (source_id, t): чтение диапазона одного источника — последовательное
+    """
+    CREATE TABLE IF NOT EXISTS samples (
+        source_id INTEGER NOT NULL,
+        t REAL NOT NULL,                       -- time.time() отсчёта
+        current REAL,
+        voltage REAL,
+        current_i REAL,
+        voltage_i REAL,
+        polarity INTEGER,
+        ah_counter INTEGER,
+        temp1 REAL,
+        temp2 REAL,
+        errors INTEGER,                        -- errors_raw
+        flags INTEGER,                         -- app.state.history.FLAG_*
+        PRIMARY KEY (source_id, t)
+    ) WITHOUT ROWID
+    """,
+    # свёртки всех уровней: корзина [bucket, bucket + tier)
+    """
+    CREATE TABLE IF NOT EXISTS rollups (
+        source_id INTEGER NOT NULL,
+        tier INTEGER NOT NULL,                 -- длина корзины, с (ROLLUP_TIERS)
+        bucket REAL NOT NULL,                  -- начало корзины
+        n INTEGER NOT NULL,                    -- отсчётов в корзине
+        t_last REAL NOT NULL,                  -- время последнего из них
+        %s,
+        PRIMARY KEY (source_id, tier, bucket)
+    ) WITHOUT ROWID
+    """ % ",\n        ".join(f"{f}_{a} REAL" for f in ROLLUP_FIELDS for a in _AGG),
+)
+
+_INSERT = "INSERT OR IGNORE INTO samples(source_id, %s) VALUES (?, %s)" % (
+    ", ".join(SAMPLE_COLUMNS), ", ".join("?" * len(SAMPLE_COLUMNS)))
+
+
+def _build_upsert() -> str:
+    """
+    Слияние свёрток пачки с уже записанными корзинами (корзина могла начаться в прошлой пачке).
+    В SET все выражения видят старую строку; min()/max() с NULL в SQLite дают NULL,
+    поэтому пустые (cnt = 0) стороны обходятся явно.
+    """
+    cols = ["source_id", "tier", "bucket", "n", "t_last"] + [f"{f}_{a}" for f in ROLLUP_FIELDS for a in _AGG]
+    sets = ["n = n + excluded.n", "t_last = max(t_last, excluded.t_last)"]
+    for f in ROLLUP_FIELDS:
+        c = f"{f}_cnt"
+        for a in ("min", "max"):
+            col = f"{f}_{a}"
+            sets.append(f"{col} = CASE WHEN {c} = 0 THEN excluded.{col} WHEN excluded.{c} = 0 THEN {col} "
+                        f"ELSE {a}({col}, excluded.{col}) END")
+        sets.append(f"{f}_sum = {f}_sum + excluded.{f}_sum")
+        sets.append(f"{c} = {c} + excluded.{c}")
+        sets.append(f"{f}_last = CASE WHEN excluded.{c} > 0 AND ({c} = 0 OR excluded.t_last >= t_last) "
+                    f"THEN excluded.{f}_last ELSE {f}_last END")
+    return ("INSERT INTO rollups(%s) VALUES (%s) ON CONFLICT(source_id, tier, bucket) DO UPDATE SET %s"
+            % (", ".join(cols), ", ".join("?" * len(cols)), ", ".join(sets)))
+
+
+_UPSERT = _build_upsert()
+
+# позиции сворачиваемых полей в строке очереди (0 — имя источника)
+_FIELD_IDX = tuple(1 + SAMPLE_COLUMNS.index(f) for f in ROLLUP_FIELDS)
+
+
+def connect(path: Optional[str] = None, readonly: bool = False) -> sqlite3.Connection:
+    """Соединение с БД телеметрии: WAL (читатели не мешают писателю), synchronous=NORMAL."""
+    path = path or TELEMETRY_DB_PATH
+    if not readonly:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    # в WAL NORMAL не теряет данных при падении приложения, только при отключении питания
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=2000")
+    if not readonly:
+        for sql in _SCHEMA:
+            conn.execute(sql)
+        conn.commit()
+    return conn
+
+
+def _row(meas) -> tuple:
+    t1 = meas.temp1
+    t2 = meas.temp2
+    return (
+        getattr(meas, "timestamp", 0.0) or time.time(),
+        meas.current, meas.voltage, meas.current_i, meas.voltage_i,
+        meas.polarity, meas.ah_counter,
+        None if t1 is None or math.isnan(t1) else t1,
+        None if t2 is None or math.isnan(t2) else t2,
+        meas.errors_raw, pack_flags(meas),
+    )
+
+
+# ---------- свёртки ----------
+# Свёртка корзины в памяти — список [n, t_last, затем по полю: min, max, sum, cnt, last]
+
+def _new_agg() -> list:
+    return [0, 0.0] + [None, None, 0.0, 0, None] * len(ROLLUP_FIELDS)
+
+
+def rollup_rows(rows: Iterable[tuple], tier: int) -> Dict[Tuple[Any, float], list]:
+    """Строки очереди (источник, t, ...) -> {(источник, начало корзины): свёртка}."""
+    out: Dict[Tuple[Any, float], list] = {}
+    idx = _FIELD_IDX
+    for r in rows:
+        t = r[1]
+        key = (r[0], t - t % tier)
+        a = out.get(key)
+        if a is None:
+            a = out[key] = _new_agg()
+        a[0] += 1
+        newer = t >= a[1]
+        if newer:
+            a[1] = t
+        o = 2
+        for i in idx:
+            v = r[i]
+            if v is not None:
+                if a[o + 3]:
+                    if v < a[o]:
+                        a[o] = v
+                    if v > a[o + 1]:
+                        a[o + 1] = v
+                    a[o + 2] += v
+                    a[o + 3] += 1
+                    if newer:
+                        a[o + 4] = v
+                else:
+                    a[o] = a[o + 1] = a[o + 4] = v
+                    a[o + 2] = v
+                    a[o + 3] = 1
+            o += 5
+    return out
+
+
+def _merge(a: list, b: list):
+    """Добавить свёртку b к a (по правилам _UPSERT)."""
+    newer = b[1] >= a[1]
+    a[0] += b[0]
+    if newer:
+        a[1] = b[1]
+    for o in range(2, len(a), 5):
+        if not b[o + 3]:
+            continue
+        if not a[o + 3]:
+            a[o:o + 5] = b[o:o + 5]
+            continue
+        if b[o] < a[o]:
+            a[o] = b[o]
+        if b[o + 1] > a[o + 1]:
+            a[o + 1] = b[o + 1]
+        a[o + 2] += b[o + 2]
+        a[o + 3] += b[o + 3]
+        if newer:
+            a[o + 4] = b[o + 4]
+
+
+def coarsen(aggs: Dict[Tuple[Any, float], list], tier: int) -> Dict[Tuple[Any, float], list]:
+    """Свёртки мелкого уровня -> свёртки уровня tier (каскад по ROLLUP_TIERS)."""
+    out: Dict[Tuple[Any, float], list] = {}
+    for (src, bucket), b in aggs.items():
+        key = (src, bucket - bucket % tier)
+        a = out.get(key)
+        if a is None:
+            out[key] = list(b)
+        else:
+            _merge(a, b)
+    return out
+
+
+# ---------- запросы ----------
+
+def pick_tier(t0: float, t1: float, pixels: Optional[int] = None, now: Optional[float] = None,
+              retention: Optional[Dict[int, Optional[float]]] = None) -> int:
+    """
+    Уровень для диапазона [t0, t1] на pixels точек: самый грубый, чья корзина не длиннее
+    пикселя (секунд на пиксель), но не удалённый к моменту t0 — иначе грубее, пока данные есть.
+    """
+    retention = RETENTION_S if retention is None else retention
+    tiers = (RAW,) + ROLLUP_TIERS
+    tier = RAW
+    if pixels:
+        per_px = max(0.0, float(t1) - float(t0)) / max(1, int(pixels))
+        for b in ROLLUP_TIERS:
+            if b <= per_px:
+                tier = b
+    age = (time.time() if now is None else now) - float(t0)
+    i = tiers.index(tier)
+    while i + 1 < len(tiers) and retention.get(tiers[i]) is not None and age > retention[tiers[i]]:
+        i += 1
+    return tiers[i]
+
+
+def list_sources(conn: Optional[sqlite3.Connection] = None) -> List[str]:
+    own = conn is None
+    conn = conn or connect(readonly=True)
+    try:
+        return [r[0] for r in conn.execute("SELECT name FROM sources ORDER BY name")]
+    finally:
+        if own:
+            conn.close()
+
+
+def query(source: str, t0: float, t1: float, pixels: Optional[int] = None,
+          fields: Iterable[str] = ROLLUP_FIELDS, tier: Optional[int] = None,
+          conn: Optional[sqlite3.Connection] = None) -> Dict[str, Any]:
+    """
+    Отсчёты источника за [t0, t1] столбцами NumPy (NaN — нет значения):
+    {"tier": уровень, "t": время, "<поле>_min"/"_max"/"_mean"/"_last": ...}.
+    Уровень — pick_tier() по pixels (или явно tier). Для сырых отсчётов min = max = mean = last
+    (один и тот же массив); для свёрток t — начало корзины.
+    """
+    fields = tuple(fields)
+    for f in fields:
+        if f not in ROLLUP_FIELDS:
+            raise ValueError(f"unknown telemetry field: {f}")
+    if tier is None:
+        tier = pick_tier(t0, t1, pixels)
+    own = conn is None
+    conn = conn or connect(readonly=True)
+    try:
+        row = conn.execute("SELECT id FROM sources WHERE name = ?", (source,)).fetchone()
+        rows = []
+        if row is not None:
+            sid = row[0]
+            if tier == RAW:
+                cols = ", ".join(("t",) + fields)
+                rows = conn.execute(f"SELECT {cols} FROM samples WHERE source_id = ? AND t >= ? AND t <= ? "
+                                    f"ORDER BY t", (sid, t0, t1)).fetchall()
+            else:
+                cols = ", ".join(["bucket"] + [f"{f}_{a}" for f in fields for a in ("min", "max", "sum", "cnt", "last")])
+                # корзина, начавшаяся до t0, тоже попадает в диапазон
+                rows = conn.execute(f"SELECT {cols} FROM rollups WHERE source_id = ? AND tier = ? "
+                                    f"AND bucket > ? AND bucket <= ? ORDER BY bucket",
+                                    (sid, tier, t0 - tier, t1)).fetchall()
+    finally:
+        if own:
+            conn.close()
+
+    out: Dict[str, Any] = {"tier": tier}
+    cols = list(zip(*rows)) if rows else [()] * (1 + (len(fields) if tier == RAW else 5 * len(fields)))
+    out["t"] = np.array(cols[0], dtype=np.float64)
+    if tier == RAW:
+        for k, f in enumerate(fields):
+            v = np.array(cols[1 + k], dtype=np.float64)
+            out[f"{f}_min"] = out[f"{f}_max"] = out[f"{f}_mean"] = out[f"{f}_last"] = v
+    else:
+        for k, f in enumerate(fields):
+            o = 1 + 5 * k
+            out[f"{f}_min"] = np.array(cols[o], dtype=np.float64)
+            out[f"{f}_max"] = np.array(cols[o + 1], dtype=np.float64)
+            cnt = np.array(cols[o + 3], dtype=np.float64)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                out[f"{f}_mean"] = np.where(cnt > 0, np.array(cols[o + 2], dtype=np.float64) / cnt, np.nan)
+            out[f"{f}_last"] = np.array(cols[o + 4], dtype=np.float64)
+    return out
+
+
+def decimate(source: str, t0: float, t1: float, pixels: int,
+             envelope: Iterable[str] = ROLLUP_FIELDS, means: Iterable[str] = (),
+             conn: Optional[sqlite3.Connection] = None) -> Dict[str, Any]:
+    """
+    Диапазон [t0, t1], прорежённый до pixels столбцов прямо в SQLite: уровень — pick_tier(),
+    затем GROUP BY по столбцу пикселя. Наружу уходит не больше pixels строк независимо от
+    длины диапазона. envelope — поля с огибающей ("<поле>_min"/"_max" на столбец),
+    means — поля только со средним ("<поле>_mean"): каждый агрегат в GROUP BY стоит времени,
+    уставкам и температурам огибающая не нужна.
+    Плюс "tier", "px" — номер столбца и "t" — время первого отсчёта/корзины в столбце.
+    """
+    envelope = tuple(envelope)
+    means = tuple(means)
+    for f in envelope + means:
+        if f not in ROLLUP_FIELDS:
+            raise ValueError(f"unknown telemetry field: {f}")
+    pixels = max(1, int(pixels))
+    t0 = float(t0)
+    t1 = max(float(t1), t0 + 1e-3)
+    per_px = (t1 - t0) / pixels
+    tier = pick_tier(t0, t1, pixels)
+    if tier == RAW:
+        aggs = [f"min({f}), max({f})" for f in envelope] + [f"avg({f})" for f in means]
+        sql = "SELECT CAST((t - ?) / ? AS INTEGER) AS px, min(t), %s FROM samples " \
+              "WHERE source_id = ? AND t >= ? AND t < ? GROUP BY px ORDER BY px"
+        lo = t0
+    else:
+        aggs = [f"min({f}_min), max({f}_max)" for f in envelope] + \
+               [f"sum({f}_sum) / nullif(sum({f}_cnt), 0)" for f in means]
+        sql = "SELECT CAST((bucket - ?) / ? AS INTEGER) AS px, min(bucket), %s FROM rollups " \
+              f"WHERE source_id = ? AND tier = {int(tier)} AND bucket >= ? AND bucket < ? GROUP BY px ORDER BY px"
+        lo = t0 - t0 % tier
+    sql = sql % ", ".join(aggs)
+    own = conn is None
+    conn = conn or connect(readonly=True)
+    try:
+        row = conn.execute("SELECT id FROM sources WHERE name = ?", (source,)).fetchone()
+        rows = [] if row is None else conn.execute(sql, (t0, per_px, row[0], lo, t1)).fetchall()
+    finally:
+        if own:
+            conn.close()
+
+    cols = list(zip(*rows)) if rows else [()] * (2 + 2 * len(envelope) + len(means))
+    out: Dict[str, Any] = {
+        "tier": tier,
+        "px": np.clip(np.array(cols[0], dtype=np.int64), 0, pixels - 1),
+        "t": np.array(cols[1], dtype=np.float64),
+    }
+    o = 2
+    for f in envelope:
+        out[f"{f}_min"] = np.array(cols[o], dtype=np.float64)
+        out[f"{f}_max"] = np.array(cols[o + 1], dtype=np.float64)
+        o += 2
+    for f in means:
+        out[f"{f}_mean"] = np.array(cols[o], dtype=np.float64)
+        o += 1
+    return out
+
+
+class TelemetryWriter:
+    """
+    Фоновая запись отсчётов в БД телеметрии.
+    submit() вызывается из потока опроса (listener ConnectionService): строка собирается
+    сразу, в очередь кладётся под коротким lock — без ожидания диска. Поток записи раз в
+    flush_ms забирает всю очередь и пишет её одной транзакцией (executemany).
+    Очередь ограничена max_pending: если диск не успевает, новые отсчёты отбрасываются
+    и считаются в dropped — опрос приборов от этого не тормозит.
+    В той же транзакции пачка сворачивается по ROLLUP_TIERS (каскадом: сырые -> 1 с -> 10 с
+    -> ... -> 1 ч) и сливается с корзинами в БД; раз в RETENTION_EVERY_S удаляется устаревшее.
+    """
+    def __init__(self, path: Optional[str] = None, flush_ms: int = FLUSH_MS, max_pending: int = MAX_PENDING,
+                 retention: Optional[Dict[int, Optional[float]]] = None):
+        self.path = path or TELEMETRY_DB_PATH
+        self.flush_s = max(10, int(flush_ms)) / 1000.0
+        self.max_pending = max(1, int(max_pending))
+        self.retention = dict(RETENTION_S if retention is None else retention)
+        self._mx = threading.Lock()
+        self._pending: List[tuple] = []
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._source_ids: Dict[str, int] = {}
+        # статистика
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.errors = 0
+        self.last_batch_ms = 0.0
+        self.purged = 0
+        self._next_retention = 0.0
+
+    # ---------- жизненный цикл ----------
+    def start(self):
+        """Запустить поток записи (повторный вызов ничего не делает)."""
+        with self._mx:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="telemetry-writer", daemon=True)
+            self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self, timeout: float = 3.0):
+        """Остановить поток, дописав очередь."""
+        thread = self._thread
+        if thread is None:
+            return
+        self._stop.set()
+        self._wake.set()
+        thread.join(timeout)
+        self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    # ---------- приём отсчётов ----------
+    def submit(self, source: str, meas):
+        if meas is None:
+            return
+        try:
+            row = (source,) + _row(meas)
+        except Exception as e:
+            print(f"[Telemetry] bad sample from {source}: {e}")
+            return
+        with self._mx:
+            if len(self._pending) >= self.max_pending:
+                self.dropped += 1
+                return
+            self._pending.append(row)
+
+    def listener(self, source: str) -> Callable[[Any], None]:
+        """fn(meas) для ConnectionService.add_listener — пишет отсчёты под именем source."""
+        return lambda meas: self.submit(source, meas)
+
+    def flush(self):
+        """Разбудить поток записи, не дожидаясь flush_ms."""
+        self._wake.set()
+
+    def stats(self) -> dict:
+        with self._mx:
+            pending = len(self._pending)
+        return {
+            "path": self.path,
+            "running": self.running,
+            "pending": pending,
+            "written": self.written,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "errors": self.errors,
+            "last_batch_ms": round(self.last_batch_ms, 2),
+            "purged": self.purged,
+        }
+
+    # ---------- поток записи ----------
+    def _run(self):
+        try:
+            conn = connect(self.path)
+        except Exception as e:
+            print(f"[Telemetry] cannot open {self.path}: {e}")
+            return
+        print(f"[Telemetry] writing to {self.path}")
+        try:
+            while not self._stop.is_set():
+                self._wake.wait(self.flush_s)
+                self._wake.clear()
+                self._write_pending(conn)
+                if time.monotonic() >= self._next_retention:
+                    self._next_retention = time.monotonic() + RETENTION_EVERY_S
+                    self._apply_retention(conn)
+            self._write_pending(conn)
+        finally:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def _source_id(self, conn: sqlite3.Connection, name: str) -> int:
+        sid = self._source_ids.get(name)
+        if sid is None:
+            conn.execute("INSERT OR IGNORE INTO sources(name) VALUES (?)", (name,))
+            sid = conn.execute("SELECT id FROM sources WHERE name = ?", (name,)).fetchone()[0]
+            self._source_ids[name] = sid
+        return sid
+
+    def _write_pending(self, conn: sqlite3.Connection):
+        with self._mx:
+            batch, self._pending = self._pending, []
+        if not batch:
+            return
+        t0 = time.perf_counter()
+        try:
+            with conn:   # одна транзакция на пачку
+                ids = {name: self._source_id(conn, name) for name in {r[0] for r in batch}}
+                batch = self._new_rows(conn, ids, batch)
+                conn.executemany(_INSERT, [(ids[r[0]],) + r[1:] for r in batch])
+                aggs = rollup_rows(batch, ROLLUP_TIERS[0])
+                for k, tier in enumerate(ROLLUP_TIERS):
+                    if k:
+                        aggs = coarsen(aggs, tier)
+                    conn.executemany(_UPSERT, [(ids[src], tier, bucket, *a) for (src, bucket), a in aggs.items()])
+        except sqlite3.Error as e:
+            # пачка потеряна, но следующая попробует снова (диск мог освободиться)
+            self.errors += 1
+            self.dropped += len(batch)
+            print(f"[Telemetry] write failed ({len(batch)} samples): {e}")
+            return
+        self.written += len(batch)
+        self.batches += 1
+        self.last_batch_ms = (time.perf_counter() - t0) * 1000.0
+
+    @staticmethod
+    def _new_rows(conn: sqlite3.Connection, ids: Dict[str, int], batch: List[tuple]) -> List[tuple]:
+        """
+        Строки пачки, которых ещё нет в samples: отсчёт с повторной меткой (группы опроса
+        делят дедлайн, сетка начинается заново после переподключения) в свёртки не попадает,
+        иначе уровни разошлись бы с сырыми данными. Побеждает первый отсчёт с этой меткой.
+        """
+        seen = set()
+        span: Dict[str, List[float]] = {}
+        rows = []
+        for r in batch:
+            key = (r[0], r[1])
+            if key in seen:
+                continue
+            seen.add(key)
+            rows.append(r)
+            s = span.get(r[0])
+            if s is None:
+                span[r[0]] = [r[1], r[1]]
+            elif r[1] < s[0]:
+                s[0] = r[1]
+            elif r[1] > s[1]:
+                s[1] = r[1]
+        stored = set()
+        for name, (lo, hi) in span.items():
+            # по первичному ключу (source_id, t) — обычно пустой диапазон
+            for (t,) in conn.execute("SELECT t FROM samples WHERE source_id = ? AND t BETWEEN ? AND ?",
+                                     (ids[name], lo, hi)):
+                stored.add((name, t))
+        if stored:
+            rows = [r for r in rows if (r[0], r[1]) not in stored]
+        return rows
+
+    def _apply_retention(self, conn: sqlite3.Connection, now: Optional[float] = None):
+        """Удалить сырые отсчёты и корзины старше горизонта своего уровня — по источнику за транзакцию."""
+        now = time.time() if now is None else now
+        try:
+            sids = [r[0] for r in conn.execute("SELECT id FROM sources")]
+            for sid in sids:
+                with conn:
+                    for tier, keep in self.retention.items():
+                        if keep is None:
+                            continue
+                        if tier == RAW:
+                            cur = conn.execute("DELETE FROM samples WHERE source_id = ? AND t < ?",
+                                               (sid, now - keep))
+                        else:
+                            cur = conn.execute("DELETE FROM rollups WHERE source_id = ? AND tier = ? AND bucket < ?",
+                                               (sid, tier, now - keep - tier))
+                        self.purged += max(0, cur.rowcount)
+        except sqlite3.Error as e:
+            self.errors += 1
+            print(f"[Telemetry] retention failed: {e}")
+
+
+# Общий журнал процесса
+WRITER = TelemetryWriter()
@@ -21,11 +21,12 @@ HOME_SCREEN = {
 CONNECTION_SCREEN = {
     "title": "Выберите интерфейс связи с источником (RTU/TCP).",
     "hint": "RTU — через последовательный порт, Wi-Fi — Modbus TCP.",
-    "types": ["RTU", "Wi-Fi (TCP)"],
+    "types": ["RTU", "Wi-Fi (TCP)", "RTU поверх TCP", "Modbus UDP"],
     "back_btn": "Назад",
     "next_btn": "Далее",
     # Подсказка к селектору типа (если решишь добавить иконку-подсказку)
-    "type_tooltip": "Выберите протокол соединения: RTU (через COM-порт/USB-UART адаптер) или Modbus TCP по сети.",
+    "type_tooltip": "Выберите протокол соединения: RTU (через COM-порт/USB-UART адаптер), Modbus TCP по сети, "
+                    "RTU поверх TCP (преобразователь «COM-порт по сети» без конвертации протокола) или Modbus UDP.",
 }
 
 # Экран настроек подключения
@@ -49,13 +50,39 @@ TOOLTIPS_RTU = {
     "parity": "Чётность: N — нет контроля, E — even (чётная), O — odd (нечётная). Должна соответствовать устройству.",
     "stopbits": "Стоп-биты: 1 (чаще всего), 1.5 или 2 — по требованиям устройства/линии.",
     "unit_id": "Адрес ведомого (slave/unit id) в сети Modbus RTU. Обычно целое число 1…247.",
+    "unit_ids": "Другие приборы на той же линии RS-485, например «2-5, 8». Порт открывается один раз, "
+                "приборы опрашиваются по очереди. Пусто — только основной (unit_id).",
+    "bus_ports": "Другие линии RS-485 на своих портах, например «COM5: 1-4; COM6: 2, 7» (без адресов — unit_id). "
+                 "Каждую линию опрашивает отдельный процесс с теми же скоростью и чётностью; показания видны "
+                 "в журнале (окно трендов), команды уходят только основному прибору.",
+    "rtu_transport": "pymodbus — стандартный транспорт. lean — облегчённый: готовые кадры и CRC по таблице, "
+                     "меньше нагрузки на CPU и пауз между запросами на скоростях 115200 и выше.",
+    "timeout_min_ms": "Нижняя граница таймаута ответа, мс. Таймаут подстраивается под реальное время ответа "
+                      "прибора; граница не даёт ему стать меньше времени передачи кадра на медленной скорости.",
+    "timeout_max_ms": "Верхняя граница таймаута ответа, мс. С неё начинается подключение, пока время ответа "
+                      "ещё не измерено; до неё растёт таймаут после потерянных кадров.",
+    "device_model": "Модель прибора — карта его регистров. Кроме встроенной rectifier, модели берутся "
+                    "из JSON-файлов в папке device_profiles рядом с базой профилей.",
 }
 
 # Подсказки TCP
 TOOLTIPS_TCP = {
     "host": "IP-адрес или DNS-имя устройства Modbus TCP. Пример: 192.168.1.100",
-    "port": "TCP-порт сервера Modbus (обычно 502).",
+    "port": "Сетевой порт устройства: Modbus TCP/UDP — обычно 502; RTU поверх TCP — порт из настроек "
+            "преобразователя интерфейсов (часто 4001).",
     "unit_id": "Unit ID для TCP (некоторые устройства требуют). Если не уверены — оставьте 1.",
+    "unit_ids": "Другие приборы за тем же шлюзом, например «2-5, 8». Modbus TCP — все опрашиваются "
+                "в одном потоке (asyncio) по отдельному соединению, шлюз должен принимать несколько "
+                "клиентов. RTU поверх TCP и UDP — по очереди через то же соединение. "
+                "Пусто — только основной (unit_id).",
+    "in_flight": "Сколько запросов отправлять, не дожидаясь ответов (1…16). 1 — обычный режим; "
+                 "2–4 ускоряют опрос по Wi-Fi, если устройство/шлюз поддерживает конвейер Modbus TCP.",
+    "timeout_min_ms": "Нижняя граница таймаута ответа, мс. Таймаут подстраивается под реальное время ответа "
+                      "устройства (как RTO в TCP) и не опускается ниже этого значения.",
+    "timeout_max_ms": "Верхняя граница таймаута ответа, мс. С неё начинается подключение, пока время ответа "
+                      "ещё не измерено; до неё растёт таймаут после потерянных кадров.",
+    "device_model": "Модель прибора — карта его регистров. Кроме встроенной rectifier, модели берутся "
+                    "из JSON-файлов в папке device_profiles рядом с базой профилей.",
 }
 
 # Сообщения о профилях
@@ -1,12 +1,7 @@
+import multiprocessing
 import sys
 import time
 
-from PySide6.QtWidgets import QApplication
-from PySide6.QtCore import QTimer, Qt, QPropertyAnimation, QEasingCurve
-from PySide6.QtGui import QPalette, QColor
-from app.gui.main_window import MainWindow
-from app.gui.splash import SplashScreen
-from app.db import init_db
 import logging
 
 # Уменьшаем логирование pymodbus (часто печатает повторяющиеся сообщения при отсутствии ответа)
@@ -14,6 +9,15 @@ logging.getLogger('pymodbus').setLevel(logging.WARNING)
 
 
 def main():
+    # GUI импортируем здесь, а не на уровне модуля: процессы опроса линий (spawn) заново
+    # исполняют этот файл как __mp_main__, и PySide6 им не нужен
+    from PySide6.QtWidgets import QApplication
+    from PySide6.QtCore import QTimer, QPropertyAnimation, QEasingCurve
+    from PySide6.QtGui import QPalette, QColor
+    from app.gui.main_window import MainWindow
+    from app.gui.splash import SplashScreen
+    from app.db import init_db
+
     app = QApplication(sys.argv)
 
     # 1. Устанавливаем стиль Fusion
@@ -95,4 +99,6 @@ def main():
 
 
 if __name__ == "__main__":
+    # процессы опроса линий (BusProcessPool) стартуют через spawn — нужно для собранного exe
+    multiprocessing.freeze_support()
     main()
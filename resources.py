@@ -33,17 +33,55 @@ ICONS_DIR = os.path.join(ASSETS_DIR, "icons")
 # БД хранится в постоянной папке (в .exe) или в корне (в разработке)
 DB_PATH = os.environ.get("PC_DB_PATH", str(_get_persistent_dir() / "profiles.db"))
 
+# Журнал измерений (телеметрия) — отдельная БД, пишется фоновым потоком
+TELEMETRY_DB_PATH = os.environ.get("PC_TELEMETRY_DB_PATH", str(_get_persistent_dir() / "telemetry.db"))
+
+# Профили моделей приборов (карты регистров) — по JSON-файлу на модель
+DEVICE_PROFILES_DIR = os.environ.get("PC_DEVICE_PROFILES_DIR", str(_get_persistent_dir() / "device_profiles"))
+
 # === Настройки по умолчанию ===
 DEFAULT_RTU = {
     "port": "COM3",
     "baudrate": "9600",
     "parity": "N",
     "stopbits": "1",
-    "unit_id": "1"
+    "unit_id": "1",
+    "unit_ids": "",
+    "bus_ports": "",
+    "rtu_transport": "pymodbus",
+    "timeout_min_ms": "50",
+    "timeout_max_ms": "2000",
+    "device_model": "rectifier"
 }
 
 DEFAULT_WIFI = {
     "host": "192.168.1.100",
     "port": "502",
-    "unit_id": "1"
+    "unit_id": "1",
+    "unit_ids": "",
+    "in_flight": "1",
+    "timeout_min_ms": "50",
+    "timeout_max_ms": "2000",
+    "device_model": "rectifier"
+}
+
+# RTU поверх TCP: преобразователь интерфейсов (device server), порт — из его настроек
+DEFAULT_RTU_OVER_TCP = {
+    "host": "192.168.1.200",
+    "port": "4001",
+    "unit_id": "1",
+    "unit_ids": "",
+    "timeout_min_ms": "50",
+    "timeout_max_ms": "2000",
+    "device_model": "rectifier"
+}
+
+DEFAULT_UDP = {
+    "host": "192.168.1.100",
+    "port": "502",
+    "unit_id": "1",
+    "unit_ids": "",
+    "timeout_min_ms": "50",
+    "timeout_max_ms": "2000",
+    "device_model": "rectifier"
 }
\ No newline at end of file
@@ -0,0 +1,137 @@
+"""
+Микро-бенчмарк RTU-транспорта: LeanRtuClient против ModbusSerialClient (pymodbus)
+на имитации прибора в памяти — меряется только цена кадрирования/разбора на стороне ПК.
+
+    python tools/bench_rtu.py [--n 2000] [--baud 115200]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import struct
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.modbus.driver import SourceDriver          # noqa: E402
+from app.modbus.lean_rtu import LeanRtuClient, crc16  # noqa: E402
+
+
+def _crc16_bitwise(data) -> int:
+    crc = 0xFFFF
+    for b in data:
+        crc ^= b
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0xA001 if crc & 1 else crc >> 1
+    return crc
+
+
+class FakeSerial:
+    """Порт с «прибором» на другом конце: ответ готов сразу после write()."""
+    def __init__(self, baudrate: int = 115200):
+        self.baudrate = baudrate
+        self.timeout = 1.0
+        self.is_open = True
+        self._out = bytearray()
+
+    # --- прибор ---
+    def _respond(self, req: bytes) -> bytes:
+        unit, fc, addr, arg = struct.unpack_from(">BBHH", req, 0)
+        if fc in (3, 4):
+            body = struct.pack(">BBB", unit, fc, 2 * arg) + struct.pack(f">{arg}H", *((addr + i) & 0xFFFF for i in range(arg)))
+        elif fc == 1:
+            nbytes = (arg + 7) // 8
+            body = struct.pack(">BBB", unit, fc, nbytes) + bytes([0b10101] * nbytes)
+        else:
+            body = bytes(req[:6])
+        return body + struct.pack("<H", crc16(body))
+
+    # --- интерфейс serial.Serial ---
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._out += self._respond(data)
+        return len(data)
+
+    def read(self, size: int = 1) -> bytes:
+        chunk = bytes(self._out[:size])
+        del self._out[:size]
+        return chunk
+
+    def readinto(self, buf) -> int:
+        n = min(len(buf), len(self._out))
+        buf[:n] = self._out[:n]
+        del self._out[:n]
+        return n
+
+    @property
+    def in_waiting(self) -> int:
+        return len(self._out)
+
+    def reset_input_buffer(self):
+        self._out.clear()
+
+    def reset_output_buffer(self):
+        pass
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.is_open = False
+
+    def open(self):
+        self.is_open = True
+
+
+def _bench(label: str, driver: SourceDriver, n: int):
+    driver.read_snapshot()  # прогрев: подбор схемы адресации
+    cpu0, wall0 = time.process_time(), time.perf_counter()
+    ok = 0
+    for _ in range(n):
+        ok += driver.read_snapshot() is not None
+    cpu, wall = time.process_time() - cpu0, time.perf_counter() - wall0
+    tx = 2 * n
+    print(f"{label:<11} {ok}/{n} ok   CPU {cpu / tx * 1e6:8.1f} µs/транзакция   "
+          f"wall {wall / tx * 1e3:6.3f} мс/транзакция")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=2000)
+    ap.add_argument("--baud", type=int, default=115200)
+    args = ap.parse_args()
+
+    frame = bytes(range(256)) * 1
+    reps = 2000
+    t = time.perf_counter()
+    for _ in range(reps):
+        _crc16_bitwise(frame)
+    bitwise = time.perf_counter() - t
+    t = time.perf_counter()
+    for _ in range(reps):
+        crc16(frame)
+    table = time.perf_counter() - t
+    print(f"CRC16 256 байт: побитно {bitwise / reps * 1e6:.1f} µs, по таблице {table / reps * 1e6:.1f} µs")
+
+    lean = LeanRtuClient("bench", baudrate=args.baud, port_factory=lambda: FakeSerial(args.baud))
+    lean.connect()
+    _bench("lean", SourceDriver(lean), args.n)
+    # Прибор в памяти отвечает мгновенно. Без паузы t3.5 видна только цена кадрирования на ПК —
+    # с pymodbus сравнивать строку «lean» выше: на 115200 бод lean выдерживает t3.5 = 1.75 мс
+    # и по wall-времени медленнее (~1.96 против ~1.3 мс на транзакцию), выигрыш — только по CPU.
+    lean.silence = 0.0
+    _bench("lean-nogap", SourceDriver(lean), args.n)
+
+    try:
+        from pymodbus.client import ModbusSerialClient
+        client = ModbusSerialClient(port="loop://", baudrate=args.baud, timeout=1.0)
+        # порт подменяем до первого запроса: connect() увидит открытый socket и ничего не откроет
+        client.socket = FakeSerial(args.baud)
+        _bench("pymodbus", SourceDriver(client), args.n)
+    except Exception as e:
+        print(f"pymodbus    пропущен: {e}")
+
+
+if __name__ == "__main__":
+    main()